@@ -0,0 +1,7 @@
+"""性能基准测试
+
+用合成的笔记本（1千、1万、10万条笔记）测量各项操作的耗时，结果写入JSON并可与基线比较：
+    python -m benchmarks.run --sizes 1000,10000 --output bench.json --baseline baseline.json
+启动耗时预算检查（导入耗时、延迟加载的模块、首次绘制耗时）：
+    python -m benchmarks.startup
+"""
@@ -0,0 +1,297 @@
+"""性能基准测试运行器
+
+用法（在项目根目录下）：
+    python -m benchmarks.run                                   # 1千/1万/10万条笔记
+    python -m benchmarks.run --sizes 1000 --output bench.json
+    python -m benchmarks.run --output bench.json --baseline baseline.json   # 与基线比较
+    python -m benchmarks.run --output baseline.json --save-baseline         # 只保存结果作为基线
+
+有指标比基线慢超过阈值时以返回码1退出，便于在提交前发现性能退化。
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from config import g_config
+from benchmarks.synthetic import generate_notebook
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# 默认重复次数（耗时较长的项目在下方单独指定）
+DEFAULT_REPEAT = 5
+# 中位数比基线慢超过该比例视为退化
+DEFAULT_THRESHOLD = 1.25
+# 基线耗时低于该值（秒）时不判断退化（计时噪声大于差异）
+MIN_COMPARABLE_SECONDS = 0.005
+RESULT_VERSION = 1
+
+
+def measure(func: Callable[[], object], repeat: int = DEFAULT_REPEAT,
+            setup: Optional[Callable[[], None]] = None) -> Dict:
+    """多次执行func并统计耗时（setup不计入耗时）"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "runs": repeat
+    }
+
+
+def configure_notebook(root_dir: Path, cache_dir: Path) -> None:
+    """将全局配置原地指向合成笔记本（各模块共享同一个g_config对象）"""
+    g_config.update({
+        "root_dir": root_dir,
+        "data_file": root_dir / "data.json",
+        "export_file": root_dir / "export.md",
+        "all_export_file": root_dir / "allExport.md",
+        "sharded_export": False,
+        "export_shard_dir": root_dir / "allExport",
+        "storage_backend": "json",
+        "search_index_file": cache_dir / "search_index.json",
+        "pending_push_file": cache_dir / "pending_push.json",
+        "git_enabled": False,
+        "chem_eq_enabled": False,
+        "watcher_enabled": False,
+    })
+    # 搜索索引单例按配置创建，切换笔记本后需要重新创建
+    import search_index
+    search_index._search_index = None
+
+
+def bench_store(results: Dict, repeat: int) -> None:
+    """笔记列表读取与复习筛选"""
+    from note_store import NoteStore, get_note_store
+    from utils import filter_notes
+
+    data_file = g_config["data_file"]
+    results["load_note_store"] = measure(lambda: NoteStore(data_file).get_note_list(), repeat)
+
+    store = get_note_store()
+    results["get_note_list"] = measure(store.get_note_list, repeat)
+
+    notes = store.get_note_list()
+    now = time.time()
+    target_days = g_config["target_days"]
+    results["filter_notes"] = measure(lambda: filter_notes(notes, now, target_days), repeat)
+    results["due_notes"] = measure(lambda: store.due_notes(now, target_days), repeat)
+    # 状态栏计数：增量维护后只读取计数器
+    from note_stats import NoteStats
+    stats = NoteStats(store)
+    stats.due_today(now)
+    results["status_bar_counts"] = measure(lambda: (stats.total, stats.due_today(now)), repeat)
+    # 新增/删除一条笔记后读取排序列表（排序结果增量维护，不重新排序）
+    results["get_note_list_after_change"] = measure(store.get_note_list, repeat, setup=_toggle_note(store))
+
+    # 复习预测：未来90天（numpy向量化与纯Python实现）
+    from review_forecast import forecast_due_counts, forecast_store, note_days, numpy_available
+    from review_index import day_number
+    today = day_number(now)
+    days = note_days(notes)
+    results["forecast_store_90d"] = measure(lambda: forecast_store(store, today, 90, target_days), repeat)
+    results["forecast_python_90d"] = measure(
+        lambda: forecast_due_counts(days, today, 90, target_days, use_numpy=False), repeat)
+    if numpy_available():
+        results["forecast_numpy_90d"] = measure(lambda: forecast_due_counts(days, today, 90, target_days), repeat)
+
+
+def _toggle_note(store) -> Callable[[], None]:
+    """返回交替新增/删除同一条基准测试笔记的函数"""
+    def toggle():
+        if store.find_note("基准测试", "增量刷新") is None:
+            store.add_note("基准测试", "增量刷新")
+        else:
+            store.remove_note("基准测试", "增量刷新")
+    return toggle
+
+
+def bench_export(results: Dict, repeat: int) -> None:
+    """导出列表文件"""
+    from note_store import get_note_store
+    from operation import write_notelist_operation, write_sharded_notelist_operation, flush_export_operation
+
+    notes = get_note_store().get_note_list()
+    all_export_file = g_config["all_export_file"]
+    results["write_notelist_operation"] = measure(
+        lambda: write_notelist_operation(notes, all_export_file, "全部"), repeat)
+    # 分片导出：首次写入全部分片，之后一条笔记变化时只重写一个分片
+    results["write_sharded_notelist_full"] = measure(
+        lambda: write_sharded_notelist_operation(notes), 1,
+        setup=lambda: shutil.rmtree(g_config["export_shard_dir"], ignore_errors=True))
+    toggled = [notes, notes[1:]]
+    results["write_sharded_notelist_one_changed"] = measure(
+        lambda: write_sharded_notelist_operation(toggled[0]), repeat, setup=lambda: toggled.reverse())
+    # after_modify_operation(False) 只提交导出请求，实际开销在调度器执行的导出中，因此同步刷新计时
+    results["after_modify_operation"] = measure(flush_export_operation, repeat)
+
+
+def bench_html(results: Dict, root_dir: Path, repeat: int) -> None:
+    """HTML构建：全量、无变化增量、修改一篇后增量"""
+    from utils import convert_md_to_html
+
+    workers = g_config["render_workers"]
+    results["convert_md_to_html_full"] = measure(
+        lambda: convert_md_to_html(root_dir, full_rebuild=True, workers=workers), 1)
+    results["convert_md_to_html_noop"] = measure(
+        lambda: convert_md_to_html(root_dir, workers=workers), repeat)
+
+    md_file = next(root_dir.glob("*/*.md"))
+
+    def touch_one():
+        with open(md_file, "a", encoding="utf-8") as f:
+            f.write("- 补充\n")
+
+    results["convert_md_to_html_one_changed"] = measure(
+        lambda: convert_md_to_html(root_dir, workers=workers), repeat, setup=touch_one)
+
+
+def bench_ui(results: Dict, repeat: int) -> None:
+    """无窗口显示地刷新笔记列表（没有图形环境时跳过）"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        results["rebuild_note_list"] = {"skipped": f"无法创建Tk窗口：{e}"}
+        return
+    try:
+        root.withdraw()
+        from note_tkinter import NoteManagerApp
+        app = NoteManagerApp(root)
+
+        def rebuild():
+            app.rebuild_note_list()
+            root.update_idletasks()
+
+        def refresh():
+            app.refresh_note_list()
+            root.update_idletasks()
+
+        results["rebuild_note_list"] = measure(rebuild, repeat)
+        # 一条笔记变化后的增量刷新
+        results["refresh_note_list_one_changed"] = measure(refresh, repeat, setup=_toggle_note(app.note_store))
+    finally:
+        root.destroy()
+
+
+def run_size(size: int, work_dir: Path, repeat: int, skip_html: bool) -> Dict:
+    """生成指定规模的笔记本并运行全部基准"""
+    root_dir = work_dir / f"notes_{size}" / "answers"
+    start = time.perf_counter()
+    generate_notebook(root_dir, size, seed=size)
+    print(f"[{size}] 生成合成笔记本：{time.perf_counter() - start:.2f}s", flush=True)
+    configure_notebook(root_dir, work_dir / f"notes_{size}" / ".cache")
+
+    results: Dict = {}
+    bench_store(results, repeat)
+    bench_export(results, repeat)
+    if skip_html:
+        results["convert_md_to_html_full"] = {"skipped": "--skip-html"}
+    else:
+        bench_html(results, root_dir, repeat)
+    bench_ui(results, repeat)
+
+    from note_store import get_note_store
+    get_note_store().close()
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """与基线比较，返回退化项描述"""
+    regressions = []
+    for size, metrics in current["results"].items():
+        base_metrics = baseline.get("results", {}).get(size, {})
+        for name, result in metrics.items():
+            base = base_metrics.get(name)
+            if "median_s" not in result or not base or "median_s" not in base:
+                continue
+            if base["median_s"] < MIN_COMPARABLE_SECONDS:
+                continue
+            ratio = result["median_s"] / base["median_s"]
+            result["baseline_median_s"] = base["median_s"]
+            result["ratio"] = ratio
+            if ratio > threshold:
+                regressions.append(f"[{size}] {name}: {base['median_s']:.4f}s -> {result['median_s']:.4f}s (x{ratio:.2f})")
+    return regressions
+
+
+def print_results(results: Dict) -> None:
+    for size, metrics in results.items():
+        print(f"\n== {size} 条笔记 ==")
+        for name, result in metrics.items():
+            if "skipped" in result:
+                print(f"  {name:<34} 跳过（{result['skipped']}）")
+                continue
+            line = f"  {name:<34} {result['median_s'] * 1000:>10.2f} ms"
+            if "ratio" in result:
+                line += f"   基线 {result['baseline_median_s'] * 1000:.2f} ms (x{result['ratio']:.2f})"
+            print(line)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="笔记工具性能基准测试")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="笔记数量，逗号分隔（默认 1000,10000,100000）")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项重复次数")
+    parser.add_argument("--output", type=Path, help="结果JSON文件")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线JSON文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="中位数超过基线的该倍数视为退化（默认1.25）")
+    parser.add_argument("--save-baseline", action="store_true", help="不比较，只保存结果（配合--output）")
+    parser.add_argument("--skip-html", action="store_true", help="跳过HTML构建（10万条时耗时较长）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的合成笔记本")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    work_dir = Path(tempfile.mkdtemp(prefix="note_bench_"))
+    report = {
+        "version": RESULT_VERSION,
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "render_workers": g_config["render_workers"],
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": {}
+    }
+    try:
+        for size in sizes:
+            report["results"][str(size)] = run_size(size, work_dir, args.repeat, args.skip_html)
+    finally:
+        if args.keep:
+            print(f"合成笔记本保留在：{work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+
+    print_results(report["results"])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        print("\n性能退化：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
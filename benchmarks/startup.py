@@ -0,0 +1,152 @@
+"""启动耗时预算检查
+
+在新的解释器进程中测量：
+    1. import note_tkinter 的耗时，并检查可选/较重的模块没有在导入时被加载；
+    2. （有图形环境时）从创建窗口到首次绘制完成的耗时，使用1万条笔记的合成笔记本，
+       首次绘制不应等待笔记加载。
+超出预算时以返回码1退出：
+    python -m benchmarks.startup [--output startup.json]
+"""
+
+import argparse
+import json
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# 预算（秒）
+IMPORT_BUDGET_SECONDS = 0.3
+FIRST_PAINT_BUDGET_SECONDS = 0.5
+# 首次绘制测量使用的笔记数
+FIRST_PAINT_NOTE_COUNT = 10000
+DEFAULT_REPEAT = 5
+
+# 导入 note_tkinter 时不应加载的模块（首次使用时才导入）
+LAZY_MODULES = [
+    "markdown", "git_operation", "chem_equation", "subprocess", "tkinter.messagebox",
+    "multiprocessing", "concurrent.futures", "logging", "watchdog", "sqlite3", "numpy",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import note_tkinter
+elapsed = time.perf_counter() - start
+from config import g_config
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [name for name in %r if name in sys.modules],
+    "config_loaded": g_config.loaded
+}))
+"""
+
+PAINT_SCRIPT = """
+import json, sys, time
+from pathlib import Path
+start = time.perf_counter()
+import tkinter as tk
+from config import g_config
+root_dir = Path(sys.argv[1])
+g_config.update({
+    "root_dir": root_dir,
+    "data_file": root_dir / "data.json",
+    "export_file": root_dir / "export.md",
+    "all_export_file": root_dir / "allExport.md",
+    "storage_backend": "json",
+    "search_index_file": root_dir.parent / ".cache" / "search_index.json",
+    "pending_push_file": root_dir.parent / ".cache" / "pending_push.json",
+    "git_enabled": False,
+    "chem_eq_enabled": False,
+    "watcher_enabled": False,
+})
+from note_tkinter import NoteManagerApp
+root = tk.Tk()
+app = NoteManagerApp(root)
+root.update()
+paint = time.perf_counter() - start
+print(json.dumps({"seconds": paint}))
+root.destroy()
+"""
+
+
+def _run_child(script: str, *args: str) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        cwd=PROJECT_DIR, capture_output=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "子进程失败")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_import(repeat: int) -> Dict:
+    """测量导入耗时并检查延迟加载的模块"""
+    samples = [_run_child(IMPORT_SCRIPT % (LAZY_MODULES,)) for _ in range(repeat)]
+    median = statistics.median(sample["seconds"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    problems = []
+    if median > IMPORT_BUDGET_SECONDS:
+        problems.append(f"导入耗时 {median:.3f}s 超出预算 {IMPORT_BUDGET_SECONDS}s")
+    if loaded:
+        problems.append(f"导入时加载了应延迟加载的模块：{', '.join(loaded)}")
+    if any(sample["config_loaded"] for sample in samples):
+        problems.append("导入时读取了config.ini")
+    return {"median_s": median, "budget_s": IMPORT_BUDGET_SECONDS, "loaded": loaded, "problems": problems}
+
+
+def check_first_paint(repeat: int) -> Dict:
+    """测量首次绘制耗时（没有图形环境时跳过）"""
+    from benchmarks.synthetic import generate_notebook
+
+    work_dir = Path(tempfile.mkdtemp(prefix="note_startup_"))
+    try:
+        root_dir = work_dir / "answers"
+        generate_notebook(root_dir, FIRST_PAINT_NOTE_COUNT)
+        try:
+            samples = [_run_child(PAINT_SCRIPT, str(root_dir))["seconds"] for _ in range(repeat)]
+        except RuntimeError as e:
+            return {"skipped": f"无法创建Tk窗口：{e}", "problems": []}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    median = statistics.median(samples)
+    problems = []
+    if median > FIRST_PAINT_BUDGET_SECONDS:
+        problems.append(f"首次绘制耗时 {median:.3f}s 超出预算 {FIRST_PAINT_BUDGET_SECONDS}s")
+    return {"median_s": median, "budget_s": FIRST_PAINT_BUDGET_SECONDS, "problems": problems}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="启动耗时预算检查")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项重复次数")
+    parser.add_argument("--output", type=Path, help="结果JSON文件")
+    args = parser.parse_args(argv)
+
+    results = {"import": check_import(args.repeat), "first_paint": check_first_paint(args.repeat)}
+    problems = []
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"  {name:<12} 跳过（{result['skipped']}）")
+        else:
+            print(f"  {name:<12} {result['median_s'] * 1000:>8.1f} ms（预算 {result['budget_s'] * 1000:.0f} ms）")
+        problems.extend(result["problems"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if problems:
+        print("\n超出启动预算：")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""合成笔记本生成
+
+生成与真实笔记本结构一致的 answers/ 目录：<科目>/<内容>.md、科目下的 assets/*.png 以及 data.json。
+"""
+
+import json
+import random
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+SUBJECTS = ["历史", "地理", "政治", "化学", "物理", "生物", "语文", "数学", "英语"]
+
+TITLE_WORDS = [
+    "时期", "制度", "改革", "战争", "文明", "发展", "结构", "原理", "反应", "定律",
+    "方程", "函数", "细胞", "遗传", "气候", "地形", "经济", "文化", "思想", "运动",
+    "统一", "民族", "国家", "社会", "变革", "起源", "巩固", "开放", "探索", "建立",
+]
+
+BODY_PHRASES = [
+    "背景：", "过程：", "意义：", "影响：", "原因：", "结论：", "特点：", "性质：",
+    "中央集权制度不断加强", "生产力水平显著提高", "对后世产生了深远影响",
+    "反应前后元素种类不变", "能量守恒", "自然环境与人类活动相互作用",
+    "实事求是", "改革开放", "和平与发展是时代主题", "质量守恒定律",
+]
+
+# 每个科目生成的图片数
+PNG_PER_SUBJECT = 5
+
+
+def make_png(width: int, height: int, seed: int) -> bytes:
+    """生成一张简单渐变的RGB PNG图片"""
+    rows = []
+    for y in range(height):
+        row = bytearray([0])  # 每行的过滤类型
+        for x in range(width):
+            row.extend(((x * 7 + seed) % 256, (y * 5 + seed) % 256, (x + y + seed) % 256))
+        rows.append(bytes(row))
+    raw = b"".join(rows)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def make_title(rng: random.Random, index: int) -> str:
+    """生成笔记标题（带序号保证唯一）"""
+    words = rng.sample(TITLE_WORDS, 3)
+    return f"{words[0]}{words[1]}与{words[2]}{index}"
+
+
+def make_body(rng: random.Random, title: str, subject: str) -> str:
+    """生成带标题、列表、表格和图片引用的笔记内容"""
+    lines = [f"## {title}", ""]
+    for _ in range(rng.randint(2, 4)):
+        lines.append(f"#### {rng.choice(TITLE_WORDS)}{rng.choice(TITLE_WORDS)}")
+        for _ in range(rng.randint(2, 5)):
+            lines.append(f"- {rng.choice(BODY_PHRASES)}{rng.choice(BODY_PHRASES)}")
+        lines.append("")
+    if rng.random() < 0.3:
+        lines.extend(["| 项目 | 内容 |", "| --- | --- |"])
+        for _ in range(3):
+            lines.append(f"| {rng.choice(TITLE_WORDS)} | {rng.choice(BODY_PHRASES)} |")
+        lines.append("")
+    if rng.random() < 0.2:
+        lines.append(f"![{subject}](assets/{subject}{rng.randrange(PNG_PER_SUBJECT)}.png){{: width=\"300\"}}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_notebook(root_dir: Path, note_count: int, seed: int = 0, days_span: int = 365) -> List[Dict]:
+    """在root_dir下生成合成笔记本，返回笔记列表
+
+    Args:
+        root_dir: 笔记根目录（相当于 answers/）
+        note_count: 笔记数量
+        seed: 随机种子，相同参数生成相同内容
+        days_span: 笔记时间戳分布在最近多少天内
+    """
+    rng = random.Random(seed)
+    root_dir.mkdir(parents=True, exist_ok=True)
+    now = int(time.time())
+
+    for subject in SUBJECTS:
+        assets_dir = root_dir / subject / "assets"
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(PNG_PER_SUBJECT):
+            (assets_dir / f"{subject}{i}.png").write_bytes(make_png(32, 16, seed + i))
+
+    notes = []
+    for index in range(note_count):
+        subject = rng.choice(SUBJECTS)
+        title = make_title(rng, index)
+        with open(root_dir / subject / f"{title}.md", "w", encoding="utf-8") as f:
+            f.write(make_body(rng, title, subject))
+        notes.append({
+            "content": title,
+            "subject": subject,
+            "timestamp": now - rng.randrange(days_span * 86400)
+        })
+
+    with open(root_dir / "data.json", "w", encoding="utf-8") as f:
+        json.dump({"last_subject": notes[-1]["subject"] if notes else "", "note_list": notes},
+                  f, ensure_ascii=False, indent=4)
+    return notes
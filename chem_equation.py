@@ -1,9 +1,13 @@
 import os
+import queue
 import subprocess
 from tkinter import Toplevel, ttk
 import tkinter as tk
 from pathlib import Path
 from error_handler import show_warning, show_error, show_info
+from tracing import span, run_subprocess
+from pending_changes import record_changes
+from chem_render import ChemRenderJob, chem_assets_dir, record_rendered
 
 # 尝试从config导入配置，如果失败则使用默认配置
 try:
@@ -12,9 +16,14 @@ except ImportError:
     # 默认配置
     g_config = {
         "root_dir": Path(__file__).parent / "answers",
-        "chem_eq_enabled": True
+        "chem_eq_enabled": True,
+        "chem_render_workers": 0,
+        "chem_combined_render": False
     }
 
+# 批量渲染进度的轮询间隔（毫秒）
+RENDER_POLL_INTERVAL_MS = 100
+
 class ChemEquationManager:
     """化学方程式转图片管理类"""
     def __init__(self):
@@ -47,6 +56,10 @@ class ChemEquationManager:
 
         # 核心创建逻辑
         def create_tex():
+            with span("chem_equation.create_tex"):
+                _create_tex()
+
+        def _create_tex():
             filename = filename_var.get().strip()
             if not filename:
                 show_warning("输入错误", "文件名不能为空！")
@@ -82,7 +95,7 @@ class ChemEquationManager:
 
             # 打开文件编辑
             try:
-                subprocess.run(f'start /wait "" "{tex_path}"', shell=True, check=True)
+                run_subprocess(f'start /wait "" "{tex_path}"', shell=True, check=True)
             except Exception as e:
                 show_error("编辑失败", f"打开文件失败：{e}")
                 eq_window.destroy()
@@ -90,7 +103,7 @@ class ChemEquationManager:
 
             # 执行转换（texpng 命令）
             try:
-                subprocess.run(
+                run_subprocess(
                     ['texpng', f'{filename}.tex'],
                     check=True,
                     capture_output=True,
@@ -103,6 +116,8 @@ class ChemEquationManager:
                 eq_window.destroy()
                 return
 
+            record_changes([tex_path, assets_dir / f"{filename}.png"])
+            record_rendered(tex_path)
             show_info("成功", f"转换成功！\n图片路径：{assets_dir / f'{filename}.png'}")
             eq_window.destroy()
 
@@ -111,6 +126,65 @@ class ChemEquationManager:
         # 取消按钮
         ttk.Button(eq_window, text="取消", command=eq_window.destroy).pack(padx=10, pady=10)
 
+    def batch_render_equations(self, force: bool = False, render_command=None) -> ChemRenderJob:
+        """在后台渲染源文件有修改或还没有图片的.tex，显示进度对话框
+
+        Args:
+            force: 忽略哈希清单，全部重新渲染
+            render_command: 渲染命令（默认为 texpng）
+        """
+        job = ChemRenderJob(chem_assets_dir(self.root_dir), render_command,
+                            g_config["chem_render_workers"], force, g_config["chem_combined_render"])
+        self._show_render_dialog(job)
+        job.start()
+        return job
+
+    def _show_render_dialog(self, job: ChemRenderJob) -> None:
+        """显示批量渲染进度对话框，通过after轮询工作线程的消息"""
+        dialog = Toplevel()
+        dialog.title("批量渲染化学方程式")
+        dialog.geometry("450x160")
+        dialog.transient()
+        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        stage_var = tk.StringVar(value="正在检查需要渲染的文件…")
+        ttk.Label(dialog, textvariable=stage_var).pack(padx=10, pady=(15, 5), anchor=tk.W)
+        progress_bar = ttk.Progressbar(dialog, mode="determinate", maximum=100)
+        progress_bar.pack(padx=10, pady=5, fill=tk.X)
+        detail_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=detail_var, foreground="gray").pack(padx=10, pady=5, anchor=tk.W)
+
+        cancel_btn = ttk.Button(dialog, text="取消", command=lambda: (job.cancel(), cancel_btn.state(["disabled"])))
+        cancel_btn.pack(padx=10, pady=5)
+
+        def poll():
+            try:
+                while True:
+                    message = job.messages.get_nowait()
+                    if message[0] == "progress":
+                        _, done, total, name = message
+                        stage_var.set(f"正在渲染 {done}/{total}")
+                        progress_bar["value"] = done / total * 100
+                        detail_var.set(name)
+                    elif message[0] == "done":
+                        dialog.grab_release()
+                        dialog.destroy()
+                        self._on_render_finished(message[1])
+                        return
+            except queue.Empty:
+                pass
+            dialog.after(RENDER_POLL_INTERVAL_MS, poll)
+
+        dialog.after(RENDER_POLL_INTERVAL_MS, poll)
+
+    def _on_render_finished(self, result) -> None:
+        """主线程中显示批量渲染结果"""
+        if result.errors:
+            show_warning("部分渲染失败", result.summary())
+        else:
+            show_info("渲染完成", result.summary())
+
 if __name__ == "__main__":
     # 独立运行时的入口点
     root = tk.Tk()
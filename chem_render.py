@@ -0,0 +1,410 @@
+"""化学方程式批量渲染模块
+
+扫描 化学/assets/*.tex，跳过源文件哈希与清单（assets/.chem_manifest.json）记录一致且PNG存在的文件，
+其余文件并行调用渲染命令（默认为 texpng）生成同名PNG。不依赖tkinter，可在工作线程或命令行中使用。
+渲染命令可以替换（例如测试时用不需要TeX环境的替身）。
+
+开启合并渲染时，导言区相同的方程式放进同一个多页 standalone 文档只编译一次，
+再按页拆分并根据页码与文件名的对应表写回各自的PNG；合并编译失败时回退到逐个渲染。
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from tracing import run_subprocess, traced
+from pending_changes import record_changes
+
+CHEM_MANIFEST_NAME = ".chem_manifest.json"
+# 清单格式变化时递增，使旧清单失效
+CHEM_MANIFEST_VERSION = 1
+
+# 渲染命令：参数为 .tex 文件路径，在同目录生成同名 .png，失败时抛出异常
+RenderCommand = Callable[[Path], None]
+# 进度回调：(已完成数, 待渲染总数, 文件名)
+ProgressCallback = Callable[[int, int, str], None]
+# 合并渲染的编译命令：参数为 .tex 文件路径，在同目录生成同名 .pdf
+CompileCommand = Callable[[Path], None]
+# 合并渲染的拆页命令：参数为 (.pdf 文件路径, 输出前缀)，每页生成 <前缀>-<页码>.png
+SplitCommand = Callable[[Path, Path], None]
+
+# 合并文档中每个方程式所在的环境（每个环境输出为一页）
+COMBINED_ENV = "chemeq"
+# 拆页时的分辨率
+COMBINED_DPI = 300
+
+
+def chem_assets_dir(root_dir: Path) -> Path:
+    """化学方程式图片目录"""
+    return root_dir / "化学" / "assets"
+
+
+def texpng_command(tex_path: Path) -> None:
+    """默认渲染命令：在.tex所在目录运行 texpng"""
+    run_subprocess(
+        ['texpng', tex_path.name],
+        check=True,
+        capture_output=True,
+        cwd=tex_path.parent,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+
+def source_digest(tex_path: Path) -> str:
+    """.tex源文件内容的SHA-1"""
+    return hashlib.sha1(tex_path.read_bytes()).hexdigest()
+
+
+def describe_error(error: Exception) -> str:
+    """渲染失败的说明（子进程失败时取其输出的最后几行）"""
+    if isinstance(error, subprocess.CalledProcessError):
+        output = (error.stderr or error.output or "").strip()
+        lines = output.splitlines()[-5:]
+        return "\n".join(lines) if lines else f"返回码 {error.returncode}"
+    if isinstance(error, FileNotFoundError):
+        return f"找不到渲染命令：{error.filename or error}"
+    return str(error)
+
+
+@dataclass
+class ChemRenderResult:
+    """批量渲染结果"""
+    rendered: List[str] = field(default_factory=list)
+    skipped: int = 0
+    # 通过合并渲染生成的文件数
+    combined: int = 0
+    # 文件名 -> 失败原因
+    errors: Dict[str, str] = field(default_factory=dict)
+    cancelled: bool = False
+
+    def summary(self) -> str:
+        msg = f"渲染 {len(self.rendered)} 个，跳过未修改的 {self.skipped} 个"
+        if self.combined:
+            msg += f"（其中 {self.combined} 个合并渲染）"
+        if self.errors:
+            msg += f"，{len(self.errors)} 个失败：\n" + "\n".join(
+                f"- {name}：{reason}" for name, reason in sorted(self.errors.items())
+            )
+        if self.cancelled:
+            msg += "\n（已取消，其余文件未渲染）"
+        return msg
+
+
+class ChemManifest:
+    """记录每个.tex生成PNG时的源文件哈希"""
+    def __init__(self, assets_dir: Path):
+        self.path = assets_dir / CHEM_MANIFEST_NAME
+        self.files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CHEM_MANIFEST_VERSION:
+                self.files = dict(data.get("files", {}))
+        except (OSError, ValueError):
+            self.files = {}
+
+    def save(self) -> None:
+        """原子写入清单"""
+        with self._lock:
+            data = {"version": CHEM_MANIFEST_VERSION, "files": self.files}
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def is_current(self, tex_path: Path, digest: str) -> bool:
+        """PNG存在且由内容相同的源文件生成"""
+        return self.files.get(tex_path.name) == digest and tex_path.with_suffix(".png").exists()
+
+    def mark_rendered(self, tex_path: Path, digest: str) -> None:
+        with self._lock:
+            self.files[tex_path.name] = digest
+
+
+def find_pending(assets_dir: Path, manifest: ChemManifest, force: bool = False) -> Tuple[List[Tuple[Path, str]], int]:
+    """找出需要渲染的.tex文件
+
+    Returns:
+        ([(源文件, 源文件哈希)], 跳过的文件数)
+    """
+    pending = []
+    skipped = 0
+    for tex_path in sorted(assets_dir.glob("*.tex")):
+        digest = source_digest(tex_path)
+        if not force and manifest.is_current(tex_path, digest):
+            skipped += 1
+        else:
+            pending.append((tex_path, digest))
+    return pending, skipped
+
+
+def record_rendered(tex_path: Path) -> None:
+    """单个方程式渲染成功后更新清单，批量渲染时不再重复渲染"""
+    manifest = ChemManifest(tex_path.parent)
+    manifest.mark_rendered(tex_path, source_digest(tex_path))
+    manifest.save()
+
+
+# ==================== 合并渲染 ====================
+
+_DOCUMENT_RE = re.compile(r"^(?P<preamble>.*?)\\begin\{document\}(?P<body>.*)\\end\{document\}", re.S)
+_CLASS_RE = re.compile(r"\\documentclass(?:\[(?P<options>[^\]]*)\])?\{standalone\}")
+
+
+def split_source(text: str) -> Optional[Tuple[str, str]]:
+    """把单个方程式源文件拆成 (导言区, 正文)；不是 standalone 文档时返回None"""
+    match = _DOCUMENT_RE.match(text)
+    if not match or not _CLASS_RE.search(match.group("preamble")):
+        return None
+    return match.group("preamble").strip(), match.group("body").strip()
+
+
+def build_combined_document(preamble: str, bodies: List[str]) -> str:
+    """生成多页 standalone 文档：第i个方程式在第i页"""
+    def add_multi(match: re.Match) -> str:
+        options = [option for option in (match.group("options") or "").split(",") if option.strip()]
+        options.append(f"multi={COMBINED_ENV}")
+        return f"\\documentclass[{','.join(options)}]{{standalone}}"
+
+    lines = [
+        _CLASS_RE.sub(add_multi, preamble, count=1),
+        f"\\newenvironment{{{COMBINED_ENV}}}{{}}{{}}",
+        "\\begin{document}",
+    ]
+    for body in bodies:
+        lines.extend([f"\\begin{{{COMBINED_ENV}}}", body, f"\\end{{{COMBINED_ENV}}}"])
+    lines.append("\\end{document}")
+    return "\n".join(lines) + "\n"
+
+
+def latex_command(tex_path: Path) -> None:
+    """默认编译命令：xelatex（ctex需要）"""
+    run_subprocess(
+        ['xelatex', '-interaction=nonstopmode', '-halt-on-error', tex_path.name],
+        check=True,
+        capture_output=True,
+        cwd=tex_path.parent,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+
+def pdf_split_command(pdf_path: Path, out_prefix: Path) -> None:
+    """默认拆页命令：pdftoppm 把每页转为 <前缀>-<页码>.png"""
+    run_subprocess(
+        ['pdftoppm', '-png', '-r', str(COMBINED_DPI), pdf_path.name, out_prefix.name],
+        check=True,
+        capture_output=True,
+        cwd=pdf_path.parent,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+
+def _page_number(png_path: Path, prefix: str) -> Optional[int]:
+    # pdftoppm 按总页数补零（page-1.png 或 page-01.png）
+    suffix = png_path.stem[len(prefix) + 1:]
+    return int(suffix) if suffix.isdigit() else None
+
+
+@traced()
+def render_combined(tex_paths: List[Path], preamble: str, bodies: List[str],
+                    compile_command: CompileCommand = None, split_command: SplitCommand = None) -> None:
+    """把导言区相同的一组方程式合并编译一次，再按页写回各自的PNG
+
+    Raises:
+        编译或拆页失败、页数与方程式数不一致时抛出异常（此时不写入任何PNG）
+    """
+    compile_command = compile_command or latex_command
+    split_command = split_command or pdf_split_command
+    # 页码 -> 文件名 的对应表：第i页对应第i个源文件
+    page_names = {page: tex_path.with_suffix(".png").name for page, tex_path in enumerate(tex_paths, start=1)}
+
+    with tempfile.TemporaryDirectory(prefix="chem_render_") as build_dir:
+        build_dir = Path(build_dir)
+        tex_file = build_dir / "combined.tex"
+        tex_file.write_text(build_combined_document(preamble, bodies), encoding="utf-8")
+        compile_command(tex_file)
+        split_command(tex_file.with_suffix(".pdf"), build_dir / "page")
+
+        pages = {}
+        for png_path in build_dir.glob("page-*.png"):
+            number = _page_number(png_path, "page")
+            if number is not None:
+                pages[number] = png_path
+        if sorted(pages) != sorted(page_names):
+            raise RuntimeError(f"合并文档输出 {len(pages)} 页，应为 {len(page_names)} 页")
+
+        assets_dir = tex_paths[0].parent
+        for number, name in page_names.items():
+            shutil.move(str(pages[number]), str(assets_dir / name))
+
+
+def _group_by_preamble(pending: List[Tuple[Path, str]]) -> Tuple[Dict[str, List[Tuple[Path, str, str]]], List[Tuple[Path, str]]]:
+    """按导言区分组，返回 ({导言区: [(源文件, 哈希, 正文)]}, 无法合并的文件)
+
+    读取失败或不是UTF-8编码的文件也归入无法合并的文件，由逐个渲染报告错误。
+    """
+    groups: Dict[str, List[Tuple[Path, str, str]]] = {}
+    single = []
+    for tex_path, digest in pending:
+        try:
+            parts = split_source(tex_path.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError):
+            parts = None
+        if parts is None:
+            single.append((tex_path, digest))
+        else:
+            groups.setdefault(parts[0], []).append((tex_path, digest, parts[1]))
+    return groups, single
+
+
+@traced()
+def render_equations(assets_dir: Path, render_command: RenderCommand = None, workers: int = 0,
+                     force: bool = False, on_progress: ProgressCallback = None,
+                     cancel_event: Optional[threading.Event] = None, combined: bool = False,
+                     compile_command: CompileCommand = None, split_command: SplitCommand = None) -> ChemRenderResult:
+    """批量渲染化学方程式
+
+    Args:
+        assets_dir: .tex所在目录
+        render_command: 渲染命令，默认为 texpng
+        workers: 同时运行的渲染进程数，0表示使用CPU核数
+        force: 忽略清单，全部重新渲染
+        on_progress: 进度回调（在工作线程中调用）
+        cancel_event: 设置后不再开始新的渲染
+        combined: 先尝试合并渲染，失败的组回退到逐个渲染
+        compile_command: 合并渲染的编译命令，默认为 xelatex
+        split_command: 合并渲染的拆页命令，默认为 pdftoppm
+
+    Returns:
+        渲染结果（失败的文件及原因收集在 errors 中，不抛出异常）
+    """
+    render_command = render_command or texpng_command
+    result = ChemRenderResult()
+    if not assets_dir.exists():
+        return result
+
+    manifest = ChemManifest(assets_dir)
+    pending, result.skipped = find_pending(assets_dir, manifest, force)
+    if not pending:
+        return result
+
+    total = len(pending)
+    done = 0
+
+    def report(name: str) -> None:
+        nonlocal done
+        done += 1
+        if on_progress:
+            on_progress(done, total, name)
+
+    if combined and len(pending) > 1:
+        groups, pending = _group_by_preamble(pending)
+        for preamble, group in groups.items():
+            if len(group) == 1 or (cancel_event is not None and cancel_event.is_set()):
+                pending.extend((tex_path, digest) for tex_path, digest, _ in group)
+                continue
+            try:
+                render_combined([item[0] for item in group], preamble, [item[2] for item in group],
+                                compile_command, split_command)
+            except Exception:
+                # 有方程式无法编译时整组回退到逐个渲染，由逐个渲染报告具体是哪个文件失败
+                pending.extend((tex_path, digest) for tex_path, digest, _ in group)
+                continue
+            for tex_path, digest, _ in group:
+                manifest.mark_rendered(tex_path, digest)
+                result.rendered.append(tex_path.name)
+                result.combined += 1
+                report(tex_path.name)
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending)))
+
+    def render_one(tex_path: Path, digest: str) -> None:
+        if cancel_event is not None and cancel_event.is_set():
+            raise _Skipped()
+        render_command(tex_path)
+        if not tex_path.with_suffix(".png").exists():
+            raise RuntimeError(f"渲染命令没有生成 {tex_path.with_suffix('.png').name}")
+        manifest.mark_rendered(tex_path, digest)
+
+    # 每个渲染本身是外部进程，线程只负责等待，线程数即同时运行的渲染进程数
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chem-render") as executor:
+        futures = {executor.submit(render_one, tex_path, digest): tex_path for tex_path, digest in pending}
+        for future in as_completed(futures):
+            tex_path = futures[future]
+            try:
+                future.result()
+                result.rendered.append(tex_path.name)
+            except _Skipped:
+                result.cancelled = True
+            except Exception as e:
+                result.errors[tex_path.name] = describe_error(e)
+            report(tex_path.name)
+
+    if result.rendered:
+        manifest.save()
+        record_changes(assets_dir / name for tex_name in result.rendered
+                       for name in (tex_name, Path(tex_name).with_suffix(".png").name))
+    return result
+
+
+class _Skipped(Exception):
+    """取消后未开始的渲染"""
+
+
+class ChemRenderJob:
+    """在工作线程中执行的批量渲染
+
+    工作线程只通过消息队列报告进度，界面由主线程轮询队列后更新：
+    ("progress", 已完成数, 待渲染总数, 文件名) 与 ("done", ChemRenderResult)。
+    """
+    def __init__(self, assets_dir: Path, render_command: RenderCommand = None, workers: int = 0,
+                 force: bool = False, combined: bool = False):
+        self.assets_dir = assets_dir
+        self.render_command = render_command
+        self.workers = workers
+        self.force = force
+        self.combined = combined
+        self.messages: "queue.Queue[tuple]" = queue.Queue()
+        self.result: Optional[ChemRenderResult] = None
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chem-render", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def cancel(self) -> None:
+        """请求取消：正在运行的渲染完成后不再开始新的渲染"""
+        self._cancel_event.set()
+
+    def _run(self) -> None:
+        try:
+            self.result = render_equations(
+                self.assets_dir, self.render_command, self.workers, self.force,
+                on_progress=lambda done, total, name: self.messages.put(("progress", done, total, name)),
+                cancel_event=self._cancel_event,
+                combined=self.combined
+            )
+        except Exception as e:
+            self.result = ChemRenderResult(errors={self.assets_dir.name: str(e)})
+        self.messages.put(("done", self.result))
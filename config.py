@@ -12,21 +12,113 @@ DEFAULT_CONFIG = {
         'root_dir': './answers',
         'data_file': 'data.json',
         'export_file': 'export.md',
-        'all_export_file': 'allExport.md'
+        'all_export_file': 'allExport.md',
+        'html_dir': 'html'
     },
     'ReviewSchedule': {'target_days': '0,1,2,4,7,15,30,60,120,240'},
     'Git': {
         'git_enabled': 'no',
         'git_remote': 'origin',
-        'git_branch': 'main'
+        'git_branch': 'main',
+        'git_timeout': '300',
+        'pending_file': './.cache/pending_push.json'
     },
     'ChemEq': {
-        'chem_eq_enabled': 'no'
+        'chem_eq_enabled': 'no',
+        'render_workers': '0',
+        'combined_render': 'no'
+    },
+    'Render': {
+        'render_workers': '1'
+    },
+    'Storage': {
+        'backend': 'json',
+        'sqlite_file': 'data.sqlite3'
+    },
+    'Search': {
+        'index_file': './.cache/search_index.json'
+    },
+    'Watcher': {
+        'watcher_enabled': 'no',
+        'poll_interval': '1.0'
+    },
+    'Export': {
+        'sharded': 'no',
+        'shard_dir': 'allExport',
+        'index_page_size': '50'
+    },
+    'Tracing': {
+        'tracing_enabled': 'no',
+        'log_file': './.cache/trace.jsonl',
+        'max_bytes': '1048576',
+        'backup_count': '3'
     }
 }
 
-# 全局配置变量（整个项目共用）
-g_config = {}
+class LazyConfig(dict):
+    """首次读取时才加载config.ini的配置字典
+
+    各模块在导入时只拿到同一个对象的引用，不会因导入而读取配置文件。
+    """
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            load_config()
+
+    def __getitem__(self, key):
+        self._ensure_loaded()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._ensure_loaded()
+        super().__setitem__(key, value)
+
+    def __contains__(self, key):
+        self._ensure_loaded()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._ensure_loaded()
+        return super().__iter__()
+
+    def __len__(self):
+        self._ensure_loaded()
+        return super().__len__()
+
+    def __repr__(self):
+        self._ensure_loaded()
+        return super().__repr__()
+
+    def get(self, key, default=None):
+        self._ensure_loaded()
+        return super().get(key, default)
+
+    def keys(self):
+        self._ensure_loaded()
+        return super().keys()
+
+    def values(self):
+        self._ensure_loaded()
+        return super().values()
+
+    def items(self):
+        self._ensure_loaded()
+        return super().items()
+
+    def copy(self):
+        self._ensure_loaded()
+        return dict(super().items())
+
+    def update(self, *args, **kwargs):
+        self._ensure_loaded()
+        super().update(*args, **kwargs)
+
+
+# 全局配置变量（整个项目共用，首次读取时加载）
+g_config = LazyConfig()
 
 def create_default_config():
     """创建默认配置文件"""
@@ -41,9 +133,7 @@ def create_default_config():
         conf.write(f)
 
 def load_config():
-    """加载配置文件，全局只需调用一次"""
-    global g_config
-    
+    """加载（或重新加载）配置文件，结果原地写入g_config"""
     # 如果配置文件不存在，创建默认配置
     if not CONFIG_FILE.exists():
         create_default_config()
@@ -53,17 +143,36 @@ def load_config():
     target_days_str = conf.get('ReviewSchedule', 'target_days')
     root_dir = Path(__file__).parent / conf.get("Paths", "root_dir")
 
-    g_config = {
+    values = {
         "root_dir": root_dir,
         "data_file": root_dir / conf.get('Paths', 'data_file'),
         "export_file": root_dir / conf.get('Paths', 'export_file'),
         "all_export_file": root_dir / conf.get('Paths', 'all_export_file'),
+        "html_dir": root_dir / conf.get('Paths', 'html_dir', fallback='html'),
         "target_days": [int(day.strip()) for day in target_days_str.split(',')],
         "git_enabled": conf.getboolean("Git", "git_enabled"),
         "git_remote": conf.get("Git", "git_remote"),
         "git_branch": conf.get("Git", "git_branch"),
+        "git_timeout": conf.getfloat("Git", "git_timeout", fallback=300),
+        "pending_push_file": Path(__file__).parent / conf.get("Git", "pending_file", fallback="./.cache/pending_push.json"),
         "chem_eq_enabled": conf.getboolean("ChemEq", "chem_eq_enabled"),
+        "chem_render_workers": conf.getint("ChemEq", "render_workers", fallback=0),
+        "chem_combined_render": conf.getboolean("ChemEq", "combined_render", fallback=False),
+        "render_workers": conf.getint("Render", "render_workers", fallback=1),
+        "storage_backend": conf.get("Storage", "backend", fallback="json").strip().lower(),
+        "sqlite_file": root_dir / conf.get("Storage", "sqlite_file", fallback="data.sqlite3"),
+        "search_index_file": Path(__file__).parent / conf.get("Search", "index_file", fallback="./.cache/search_index.json"),
+        "watcher_enabled": conf.getboolean("Watcher", "watcher_enabled", fallback=False),
+        "watcher_poll_interval": conf.getfloat("Watcher", "poll_interval", fallback=1.0),
+        "sharded_export": conf.getboolean("Export", "sharded", fallback=False),
+        "export_shard_dir": root_dir / conf.get("Export", "shard_dir", fallback="allExport"),
+        "export_index_page_size": conf.getint("Export", "index_page_size", fallback=50),
+        "tracing_enabled": conf.getboolean("Tracing", "tracing_enabled", fallback=False),
+        "trace_log_file": Path(__file__).parent / conf.get("Tracing", "log_file", fallback="./.cache/trace.jsonl"),
+        "trace_max_bytes": conf.getint("Tracing", "max_bytes", fallback=1048576),
+        "trace_backup_count": conf.getint("Tracing", "backup_count", fallback=3),
     }
-
-# 程序启动时自动加载一次
-load_config()
+    # 先标记为已加载，避免写入时再次触发加载
+    g_config.loaded = True
+    dict.clear(g_config)
+    dict.update(g_config, values)
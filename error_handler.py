@@ -1,9 +1,62 @@
 """错误处理模块
 
-封装所有的消息框函数，提供统一的错误处理接口
+封装所有的消息框函数，提供统一的错误处理接口。
+无界面模式（命令行）下消息输出到标准错误，不导入tkinter。
+后台线程不能弹出消息框：在线程中用 collect_messages() 收集消息，交给主线程用 show_message() 显示。
 """
 
-from tkinter.messagebox import askyesno, showinfo, showwarning, showerror
+import sys
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# 是否为无界面模式
+_headless = False
+# 各线程正在收集的消息列表（未收集时为None）
+_collector = threading.local()
+
+
+def set_headless(headless: bool = True) -> None:
+    """切换无界面模式：消息输出到标准错误，确认对话框一律视为"否"
+    
+    Args:
+        headless: 是否为无界面模式
+    """
+    global _headless
+    _headless = headless
+
+
+def _print_message(level: str, title: str, message: str) -> None:
+    print(f"[{level}] {title}：{message}", file=sys.stderr)
+
+
+@contextmanager
+def collect_messages():
+    """在当前线程中收集 show_error/show_warning/show_info 的消息而不显示
+
+    产生一个列表，元素为 (级别, 标题, 消息)，级别为 "error"/"warning"/"info"。
+    """
+    messages: List[Tuple[str, str, str]] = []
+    previous = getattr(_collector, "messages", None)
+    _collector.messages = messages
+    try:
+        yield messages
+    finally:
+        _collector.messages = previous
+
+
+def _collect(level: str, title: str, message: str) -> bool:
+    """当前线程正在收集消息时记录下来并返回True"""
+    messages = getattr(_collector, "messages", None)
+    if messages is None:
+        return False
+    messages.append((level, title, message))
+    return True
+
+
+def show_message(level: str, title: str, message: str) -> None:
+    """按级别显示一条消息（用于显示 collect_messages 收集的消息）"""
+    {"error": show_error, "warning": show_warning}.get(level, show_info)(title, message)
 
 
 def show_error(title: str, message: str) -> None:
@@ -13,6 +66,12 @@ def show_error(title: str, message: str) -> None:
         title: 错误标题
         message: 错误消息
     """
+    if _collect("error", title, message):
+        return
+    if _headless:
+        _print_message("错误", title, message)
+        return
+    from tkinter.messagebox import showerror
     showerror(title, message)
 
 
@@ -23,6 +82,12 @@ def show_warning(title: str, message: str) -> None:
         title: 警告标题
         message: 警告消息
     """
+    if _collect("warning", title, message):
+        return
+    if _headless:
+        _print_message("警告", title, message)
+        return
+    from tkinter.messagebox import showwarning
     showwarning(title, message)
 
 
@@ -33,6 +98,12 @@ def show_info(title: str, message: str) -> None:
         title: 提示标题
         message: 提示消息
     """
+    if _collect("info", title, message):
+        return
+    if _headless:
+        _print_message("提示", title, message)
+        return
+    from tkinter.messagebox import showinfo
     showinfo(title, message)
 
 
@@ -46,6 +117,10 @@ def ask_yes_no(title: str, message: str) -> bool:
     Returns:
         bool: 用户是否选择了"是"
     """
+    if _headless:
+        _print_message("确认", title, f"{message}（无界面模式，视为否）")
+        return False
+    from tkinter.messagebox import askyesno
     return askyesno(title, message)
 
 
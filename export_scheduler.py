@@ -0,0 +1,68 @@
+"""导出调度模块
+
+将 export.md / allExport.md 的重新生成变为计划任务：防抖窗口内的多次请求
+合并为一次，在后台线程中执行；需要保证导出文件是最新时调用 flush() 同步执行。
+"""
+
+import threading
+from typing import Callable, Optional
+
+# 默认防抖窗口（秒）
+EXPORT_DEBOUNCE_SECONDS = 1.0
+
+
+class ExportScheduler:
+    """导出调度类（防抖 + 后台执行 + 同步刷新）"""
+    def __init__(self, export_func: Callable[[], None], debounce: float = EXPORT_DEBOUNCE_SECONDS):
+        self.export_func = export_func
+        self.debounce = debounce
+        self._timer: Optional[threading.Timer] = None
+        self._pending = False
+        self._lock = threading.Lock()
+        # 保证同一时间只有一次导出在执行
+        self._run_lock = threading.Lock()
+        self.on_error: Optional[Callable[[Exception], None]] = None
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未执行的导出请求"""
+        return self._pending
+
+    def request(self) -> None:
+        """请求导出：在防抖窗口结束后于后台线程执行，窗口内的后续请求会合并"""
+        with self._lock:
+            self._pending = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._run_pending)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """取消计划中的导出并立即同步执行一次"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = False
+        with self._run_lock:
+            self.export_func()
+
+    def flush_if_pending(self) -> None:
+        """有尚未执行的导出请求时同步执行"""
+        if self._pending:
+            self.flush()
+
+    def _run_pending(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            self._pending = False
+            self._timer = None
+        with self._run_lock:
+            try:
+                self.export_func()
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(e)
@@ -1,11 +1,260 @@
 from config import g_config
+import queue
+import re
 import subprocess
+import threading
 import time
-from tkinter import Toplevel, ttk
-import tkinter as tk
+from pathlib import Path
+from typing import Callable, List, Optional
 from utils import convert_md_to_html
-from operation import after_modify_operation
+from operation import flush_export_operation
+from note_store import get_note_store
 from error_handler import show_warning, show_info, show_error
+from tracing import run_subprocess, span, subprocess_span, traced
+from pending_changes import get_pending_changes
+
+# 推送流程的各个阶段：(阶段标识, 显示名称)
+PUSH_STAGES = [
+    ("export", "导出笔记列表"),
+    ("render", "转换Markdown到HTML"),
+    ("add", "git add"),
+    ("commit", "git commit"),
+    ("push", "git push"),
+]
+
+# git push --progress 输出的进度行，例如 "Writing objects:  45% (9/20)"
+PUSH_PROGRESS_PATTERN = re.compile(r"^\s*([A-Za-z][A-Za-z ]*):\s+(\d+)%")
+
+# 进度对话框轮询工作线程消息的间隔（毫秒）
+PUSH_POLL_INTERVAL_MS = 100
+
+# 暂存方式：只暂存待推送记录中的路径 / 深度同步（git add -A）/ 不暂存
+STAGE_CHANGED = "changed"
+STAGE_ALL = "all"
+STAGE_NONE = "none"
+
+
+class PushCancelled(Exception):
+    """推送被用户取消"""
+
+
+class PushTimeout(Exception):
+    """Git命令执行超时"""
+
+
+class PushJob:
+    """在工作线程中执行的推送流程
+
+    工作线程只通过消息队列报告进度，所有界面操作都由主线程轮询队列后完成：
+    ("progress", 阶段名称, 总体百分比, 详情)、("warning", 标题, 提示信息) 与 ("done", 是否成功, 提示信息)。
+    """
+    def __init__(self, root_dir: Path, commit_msg: str, remote: str, branch: str,
+                 force_push: bool, stage_mode: str, convert_html: bool, timeout: float):
+        self.root_dir = root_dir
+        self.commit_msg = commit_msg
+        self.remote = remote
+        self.branch = branch
+        self.force_push = force_push
+        self.stage_mode = stage_mode
+        self.convert_html = convert_html
+        self.timeout = timeout
+
+        self.messages: "queue.Queue[tuple]" = queue.Queue()
+        self.success: Optional[bool] = None
+        self._cancel_event = threading.Event()
+        self._process: Optional[subprocess.Popen] = None
+        self._process_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="git-push", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def cancel(self) -> None:
+        """请求取消：终止当前Git命令，并在下一阶段开始前停止"""
+        self._cancel_event.set()
+        with self._process_lock:
+            if self._process and self._process.poll() is None:
+                self._process.kill()
+
+    # ==================== 工作线程 ====================
+
+    def _report(self, stage_index: int, fraction: float = 0.0, detail: str = "") -> None:
+        percent = (stage_index + fraction) / len(PUSH_STAGES) * 100
+        self.messages.put(("progress", PUSH_STAGES[stage_index][1], percent, detail))
+
+    def _check_cancel(self) -> None:
+        if self._cancel_event.is_set():
+            raise PushCancelled()
+
+    @traced()
+    def _run(self) -> None:
+        try:
+            self._check_cancel()
+            self._report(0)
+            # 同步导出，保证发布的导出文件不是过期的
+            with span("push.export"):
+                flush_export_operation()
+
+            if self.convert_html:
+                self._check_cancel()
+                self._report(1)
+                with span("push.render"):
+                    convert_md_to_html(self.root_dir, workers=g_config["render_workers"],
+                                       on_warning=lambda text: self.messages.put(("warning", "读取失败", text)))
+
+            # 导出和HTML构建登记的路径都已写入，取快照；推送成功后只清除快照中的路径
+            pending = get_pending_changes()
+            snapshot = pending.snapshot()
+
+            # Git add（记录不可信时无法确定修改范围，改为深度同步）
+            stage_mode = self.stage_mode
+            if stage_mode == STAGE_CHANGED and pending.has_changes() is None:
+                stage_mode = STAGE_ALL
+            if stage_mode == STAGE_ALL:
+                self._check_cancel()
+                self._report(2, detail="深度同步")
+                self._run_git(['git', 'add', '-A'])
+            elif stage_mode == STAGE_CHANGED:
+                self._check_cancel()
+                self._report(2, detail=f"{len(snapshot)} 个路径")
+                self._stage_paths(sorted(snapshot))
+
+            # Git commit
+            self._check_cancel()
+            self._report(3)
+            self._run_git(['git', 'commit', '-m', self.commit_msg])
+
+            # Git push
+            self._check_cancel()
+            self._report(4)
+            push_cmd = ['git', 'push', '--progress', self.remote, self.branch]
+            if self.force_push:
+                push_cmd.append('-f')
+            self._run_git(push_cmd, on_progress=lambda fraction, detail: self._report(4, fraction, detail))
+
+            # 未暂存时可能仍有未提交的修改，保留记录中的路径
+            pending.mark_pushed(snapshot if stage_mode != STAGE_NONE else {})
+            self._finish(True, "Git推送成功！")
+        except PushCancelled:
+            self._finish(False, "推送已取消")
+        except PushTimeout as e:
+            self._finish(False, f"Git操作超时：{e}")
+        except subprocess.CalledProcessError as e:
+            self._finish(False, f"Git操作失败：{e.stderr}")
+        except Exception as e:
+            self._finish(False, f"Git推送失败：{e}")
+
+    def _finish(self, success: bool, message: str) -> None:
+        self.success = success
+        self.messages.put(("done", success, message))
+
+    def _stage_paths(self, paths: List[str]) -> None:
+        """只暂存指定路径（相对于笔记根目录）：存在的用 git add，已删除的用 git rm --cached
+
+        路径经NUL分隔的pathspec文件从标准输入传给Git（--literal-pathspecs 关闭通配符），
+        不受命令行长度限制；被.gitignore忽略的路径先过滤掉，否则 git add 会报错。
+        """
+        existing = [path for path in paths if (self.root_dir / path).exists()]
+        existing_set = set(existing)
+        missing = [path for path in paths if path not in existing_set]
+
+        if existing:
+            ignored = set(self._ignored_paths(existing))
+            existing = [path for path in existing if path not in ignored]
+        if existing:
+            self._run_git(['git', '--literal-pathspecs', 'add', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                          input_text="\0".join(existing))
+        if missing:
+            self._check_cancel()
+            self._run_git(['git', '--literal-pathspecs', 'rm', '--cached', '--quiet', '--ignore-unmatch',
+                           '--pathspec-from-file=-', '--pathspec-file-nul'],
+                          input_text="\0".join(missing))
+
+    def _ignored_paths(self, paths: List[str]) -> List[str]:
+        """返回被.gitignore忽略的路径（git check-ignore 没有匹配时返回码为1）"""
+        result = run_subprocess(
+            ['git', 'check-ignore', '-z', '--stdin'],
+            input="\0".join(paths),
+            capture_output=True,
+            cwd=self.root_dir,
+            encoding='utf-8',
+            errors='replace',
+            timeout=self.timeout
+        )
+        if result.returncode not in (0, 1):
+            raise subprocess.CalledProcessError(result.returncode, ['git', 'check-ignore'], stderr=result.stderr)
+        return [path for path in result.stdout.split("\0") if path]
+
+    def _run_git(self, cmd: List[str],
+                 on_progress: Callable[[float, str], None] = None, input_text: str = None) -> None:
+        """执行Git命令并记录耗时"""
+        with subprocess_span(cmd):
+            self._run_git_process(cmd, on_progress, input_text)
+
+    def _run_git_process(self, cmd: List[str],
+                         on_progress: Callable[[float, str], None] = None, input_text: str = None) -> None:
+        """执行Git命令，逐行读取输出以解析进度，超时或取消时终止进程"""
+        with self._process_lock:
+            self._check_cancel()
+            self._process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE if input_text is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=self.root_dir,
+                encoding='utf-8',
+                errors='replace'
+            )
+        process = self._process
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(self.timeout, on_timeout)
+        timer.daemon = True
+        timer.start()
+
+        output_lines = []
+        line = ""
+        try:
+            # 先写完标准输入（pathspec文件），Git读完后才开始输出
+            if input_text is not None:
+                try:
+                    process.stdin.write(input_text)
+                    process.stdin.close()
+                except OSError:
+                    pass
+            # git的进度行以\r结尾，逐字符读取以便实时解析
+            while True:
+                char = process.stdout.read(1)
+                if not char or char in "\r\n":
+                    if line:
+                        output_lines.append(line)
+                        match = PUSH_PROGRESS_PATTERN.match(line)
+                        if match and on_progress:
+                            on_progress(int(match.group(2)) / 100, line.strip())
+                        line = ""
+                    if not char:
+                        break
+                else:
+                    line += char
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            with self._process_lock:
+                self._process = None
+
+        self._check_cancel()
+        if timed_out.is_set():
+            raise PushTimeout(f"{' '.join(cmd[:2])} 超过 {self.timeout:g} 秒未完成")
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr="\n".join(output_lines))
+
 
 class GitManager:
     """Git 操作管理类"""
@@ -14,17 +263,43 @@ class GitManager:
         self.git_remote = g_config["git_remote"]
         self.git_branch = g_config["git_branch"]
         self.git_enabled = g_config["git_enabled"]
+        self.git_timeout = g_config["git_timeout"]
+        self.push_job: Optional[PushJob] = None
+        self._push_callbacks: List[Callable[[bool], None]] = []
+
+    def is_pushing(self) -> bool:
+        """是否有正在进行的推送"""
+        return self.push_job is not None and self.push_job.success is None
 
-    def show_push_dialog(self, root=None):
-        """显示Git推送参数设置弹窗"""
+    def wait_for_push(self, on_done: Callable[[bool], None]) -> None:
+        """进行中的推送结束后回调on_done(是否成功)，没有推送时立即回调"""
+        if self.is_pushing():
+            self._push_callbacks.append(on_done)
+        else:
+            on_done(bool(self.push_job and self.push_job.success))
+
+    def show_push_dialog(self, root=None, on_done: Callable[[bool], None] = None):
+        """显示Git推送参数设置弹窗
+
+        Args:
+            root: 独立运行时的根窗口，弹窗关闭或推送结束后退出其主循环
+            on_done: 推送结束后的回调，参数为是否成功
+        """
         if not self.git_enabled:
             show_warning("Git未启用", "Git功能未在配置中启用！")
             return
+        if self.is_pushing():
+            show_warning("正在推送", "已有推送正在进行，请等待其完成！")
+            return
+
+        # 界面模块按需导入，命令行推送不依赖tkinter
+        import tkinter as tk
+        from tkinter import Toplevel, ttk
 
         # 创建弹窗
         dialog = Toplevel()
         dialog.title("Git推送设置")
-        dialog.geometry("450x370")
+        dialog.geometry("450x430")
         dialog.transient()
         dialog.grab_set()
 
@@ -37,7 +312,7 @@ class GitManager:
 
         # Commit消息输入
         ttk.Label(dialog, text="提交消息：").pack(padx=10, pady=(15, 5), anchor=tk.W)
-        commit_msg_var = tk.StringVar(value=f"自动提交：{time.strftime('%Y-%m-%d %H:%M:%S')}")
+        commit_msg_var = tk.StringVar(value=self.default_commit_msg())
         commit_msg_entry = ttk.Entry(dialog, textvariable=commit_msg_var, width=50)
         commit_msg_entry.pack(padx=10, pady=5, fill=tk.X)
         commit_msg_entry.focus()
@@ -61,8 +336,14 @@ class GitManager:
         force_push_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame, text="强制推送 (-f)", variable=force_push_var).pack(anchor=tk.W)
 
-        add_all_var = tk.BooleanVar(value=True)
-        ttk.Checkbutton(options_frame, text="添加所有更改 (git add -A)", variable=add_all_var).pack(anchor=tk.W)
+        # 默认只暂存记录的修改；深度同步会让Git重新扫描整个目录
+        stage_mode_var = tk.StringVar(value=STAGE_CHANGED)
+        for text, value in (
+            ("只添加记录的修改", STAGE_CHANGED),
+            ("深度同步：添加所有更改 (git add -A)", STAGE_ALL),
+            ("不添加（只提交已暂存的修改）", STAGE_NONE),
+        ):
+            ttk.Radiobutton(options_frame, text=text, variable=stage_mode_var, value=value).pack(anchor=tk.W)
 
         convert_html_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame, text="转换Markdown到HTML", variable=convert_html_var).pack(anchor=tk.W)
@@ -76,7 +357,7 @@ class GitManager:
             remote = remote_var.get().strip()
             branch = branch_var.get().strip()
             force_push = force_push_var.get()
-            add_all = add_all_var.get()
+            stage_mode = stage_mode_var.get()
             convert_html = convert_html_var.get()
 
             if not commit_msg:
@@ -90,109 +371,220 @@ class GitManager:
                 return
 
             dialog.destroy()
-            if root:
-                root.quit()
+
+            def after_push(success: bool):
+                if on_done:
+                    on_done(success)
+                if root:
+                    root.quit()
+
             self._execute_push(
                 commit_msg=commit_msg,
                 remote=remote,
                 branch=branch,
                 force_push=force_push,
-                add_all=add_all,
-                convert_html=convert_html
+                stage_mode=stage_mode,
+                convert_html=convert_html,
+                on_done=after_push
             )
 
         ttk.Button(btn_frame, text="推送", command=do_push).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="取消", command=lambda: [dialog.destroy(), root.quit() if root else None]).pack(side=tk.LEFT, padx=5)
 
-    def _execute_push(self, commit_msg: str, remote: str, branch: str, 
-                      force_push: bool, add_all: bool, convert_html: bool) -> bool:
-        """执行Git推送操作"""
-        try:
-            after_modify_operation(False)
-            # 转换MD到HTML
-            if convert_html:
-                convert_md_to_html(self.root_dir)
-            
-            # Git add
-            if add_all:
-                subprocess.run(
-                    ['git', 'add', '-A'], 
-                    check=True, 
-                    capture_output=True, 
-                    cwd=self.root_dir,
-                    encoding='utf-8',
-                    errors='replace'
-                )
-            
-            # Git commit
-            subprocess.run(
-                ['git', 'commit', '-m', commit_msg],
-                check=True,
-                capture_output=True,
-                cwd=self.root_dir,
-                encoding='utf-8',
-                errors='replace',
-                text=True
-            )
-            
-            # Git push
-            push_cmd = ['git', 'push', remote, branch]
-            if force_push:
-                push_cmd.append('-f')
-            
-            subprocess.run(
-                push_cmd,
-                check=True,
-                capture_output=True,
-                cwd=self.root_dir,
-                encoding='utf-8',
-                errors='replace',
-                text=True
-            )
-            
-            show_info("成功", "Git推送成功！")
-            return True
-        
-        except subprocess.CalledProcessError as e:
-            show_error("Git失败", f"Git操作失败：{e.stderr}")
-            return False
-        except Exception as e:
-            show_error("失败", f"Git推送失败：{e}")
-            return False
+    def default_commit_msg(self) -> str:
+        """默认提交消息"""
+        return f"自动提交：{time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+    @traced()
+    def run_push(self, commit_msg: str, remote: str = None, branch: str = None,
+                 force_push: bool = True, stage_mode: str = STAGE_CHANGED, convert_html: bool = True,
+                 on_progress: Callable[[str, float, str], None] = None) -> tuple[bool, str]:
+        """不显示界面、同步执行推送（命令行使用）
+
+        Args:
+            on_progress: 进度回调，参数为 (阶段名称, 总体百分比, 详情)
+
+        Returns:
+            (success, message): 是否成功及提示信息
+        """
+        if not self.git_enabled:
+            return False, "Git功能未在配置中启用！"
+        if self.is_pushing():
+            return False, "已有推送正在进行，请等待其完成！"
+        if not get_note_store().compact():
+            return False, "保存笔记数据失败"
+
+        job = PushJob(
+            self.root_dir, commit_msg, remote or self.git_remote, branch or self.git_branch,
+            force_push, stage_mode, convert_html, self.git_timeout
+        )
+        self.push_job = job
+        job.start()
+        while True:
+            message = job.messages.get()
+            if message[0] == "done":
+                return message[1], message[2]
+            if message[0] == "warning":
+                show_warning(message[1], message[2])
+            elif on_progress:
+                on_progress(*message[1:])
+
+    @traced()
+    def _execute_push(self, commit_msg: str, remote: str, branch: str,
+                      force_push: bool, stage_mode: str, convert_html: bool,
+                      on_done: Callable[[bool], None] = None) -> PushJob:
+        """在工作线程中执行Git推送操作，并显示进度对话框"""
+        # 确保修改日志已压缩回data.json再导出和提交
+        get_note_store().compact()
+
+        job = PushJob(
+            self.root_dir, commit_msg, remote, branch,
+            force_push, stage_mode, convert_html, self.git_timeout
+        )
+        self.push_job = job
+        if on_done:
+            self._push_callbacks.append(on_done)
+        self._show_progress_dialog(job)
+        job.start()
+        return job
+
+    def _show_progress_dialog(self, job: PushJob) -> None:
+        """显示推送进度对话框，通过after轮询工作线程的消息"""
+        import tkinter as tk
+        from tkinter import Toplevel, ttk
+
+        dialog = Toplevel()
+        dialog.title("Git推送中")
+        dialog.geometry("450x160")
+        dialog.transient()
+        dialog.grab_set()
+        # 推送期间关闭按钮等同于取消
+        dialog.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        stage_var = tk.StringVar(value="准备中…")
+        ttk.Label(dialog, textvariable=stage_var).pack(padx=10, pady=(15, 5), anchor=tk.W)
+        progress_bar = ttk.Progressbar(dialog, mode="determinate", maximum=100)
+        progress_bar.pack(padx=10, pady=5, fill=tk.X)
+        detail_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=detail_var, foreground="gray").pack(padx=10, pady=5, anchor=tk.W)
+
+        cancel_btn = ttk.Button(dialog, text="取消", command=lambda: (job.cancel(), cancel_btn.state(["disabled"])))
+        cancel_btn.pack(padx=10, pady=5)
+
+        def poll():
+            try:
+                while True:
+                    message = job.messages.get_nowait()
+                    if message[0] == "progress":
+                        _, stage, percent, detail = message
+                        stage_var.set(stage)
+                        progress_bar["value"] = percent
+                        detail_var.set(detail)
+                    elif message[0] == "warning":
+                        show_warning(message[1], message[2])
+                    elif message[0] == "done":
+                        _, success, text = message
+                        dialog.grab_release()
+                        dialog.destroy()
+                        self._on_push_finished(success, text)
+                        return
+            except queue.Empty:
+                pass
+            dialog.after(PUSH_POLL_INTERVAL_MS, poll)
+
+        dialog.after(PUSH_POLL_INTERVAL_MS, poll)
+
+    def _on_push_finished(self, success: bool, message: str) -> None:
+        """主线程中处理推送结果并执行等待中的回调"""
+        if success:
+            show_info("成功", message)
+        elif message == "推送已取消":
+            show_info("提示", message)
+        else:
+            show_error("Git失败", message)
+
+        callbacks, self._push_callbacks = self._push_callbacks, []
+        for callback in callbacks:
+            callback(success)
 
     def has_unpushed_changes(self) -> bool:
-        """检查是否有未推送的修改"""
+        """检查是否有未推送的修改
+
+        优先根据待推送修改记录直接判断；记录不可信（首次运行或记录丢失）时才运行Git检查。
+        """
         if not self.git_enabled:
             return False
-        
+
+        known = get_pending_changes().has_changes()
+        if known is not None:
+            return known
         try:
-            # 检查是否有未提交的修改
-            result = subprocess.run(
-                ['git', 'status', '--porcelain'],
-                capture_output=True,
-                cwd=self.root_dir,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            if result.stdout.strip():
-                return True
-            
-            # 检查是否有未推送的提交
-            result = subprocess.run(
-                ['git', 'log', f'{self.git_remote}/{self.git_branch}..HEAD'],
+            return self.verify_pending_changes()
+        except Exception:
+            return False
+
+    def verify_pending_changes(self) -> bool:
+        """运行Git检查核对待推送修改记录，返回是否有未推送的修改"""
+        pending = get_pending_changes()
+        snapshot = pending.snapshot()
+        git_paths, unpushed_commits = self._git_state()
+        pending.apply_git_state(snapshot, git_paths, unpushed_commits)
+        return bool(git_paths) or unpushed_commits
+
+    def verify_pending_changes_in_background(self) -> None:
+        """在后台线程中核对待推送修改记录（例如在应用外执行过Git操作后）"""
+        if not self.git_enabled:
+            return
+
+        def verify():
+            try:
+                self.verify_pending_changes()
+            except Exception:
+                pass
+
+        threading.Thread(target=verify, name="git-verify", daemon=True).start()
+
+    def _git_state(self) -> tuple[List[str], bool]:
+        """Git工作区中有修改的路径（相对于笔记根目录）及是否有未推送的提交"""
+        def git(*args: str, check: bool = True) -> str:
+            result = run_subprocess(
+                ['git', *args],
                 capture_output=True,
                 cwd=self.root_dir,
                 encoding='utf-8',
                 errors='replace'
             )
-            
-            return bool(result.stdout.strip())
-        
-        except Exception:
-            return False
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, args, stderr=result.stderr)
+            return result.stdout
+
+        # git status 输出相对于仓库根目录的路径，需要去掉笔记根目录在仓库中的前缀
+        prefix = git('rev-parse', '--show-prefix').strip()
+        paths = []
+        entries = git('status', '--porcelain', '-z', '--untracked-files=all').split('\0')
+        index = 0
+        while index < len(entries):
+            entry = entries[index]
+            index += 1
+            if len(entry) < 4:
+                continue
+            status, path = entry[:2], entry[3:]
+            candidates = [path]
+            # 重命名和复制的下一项是原路径
+            if status[0] in "RC" and index < len(entries):
+                candidates.append(entries[index])
+                index += 1
+            for candidate in candidates:
+                if candidate.startswith(prefix):
+                    paths.append(candidate[len(prefix):])
+
+        # 检查是否有未推送的提交（远程分支不存在时视为没有）
+        unpushed = git('log', '--oneline', f'{self.git_remote}/{self.git_branch}..HEAD', check=False).strip()
+        return paths, bool(unpushed)
 
 if __name__ == "__main__":
+    import tkinter as tk
+
     # 独立运行时的入口点
     root = tk.Tk()
     root.withdraw()  # 隐藏主窗口
@@ -0,0 +1,111 @@
+"""HTML渲染模块
+
+单个MD文件的读取与渲染，不依赖tkinter，可在进程池的子进程中使用。
+每个进程复用同一个 markdown.Markdown 实例，渲染前调用 reset()。
+markdown 在首次渲染时才导入，不影响程序启动。
+"""
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import markdown
+
+# 当前进程复用的Markdown实例
+_md: Optional["markdown.Markdown"] = None
+
+
+def get_markdown() -> "markdown.Markdown":
+    """获取当前进程复用的Markdown实例"""
+    global _md
+    if _md is None:
+        import markdown
+        _md = markdown.Markdown(extensions=[
+                'markdown.extensions.tables',
+                'markdown.extensions.attr_list'
+        ])
+    return _md
+
+
+def init_worker() -> None:
+    """进程池初始化函数：预先创建Markdown实例"""
+    get_markdown()
+
+
+def read_md_content(md_file_path: Path) -> tuple[str, str]:
+    """尝试不同编码读取MD文件
+
+    Returns:
+        (content, warning): 文件内容（全部失败时为替代内容）及读取失败的提示信息
+    """
+    encodings = ['utf-8', 'gbk', 'latin1', 'iso-8859-1']
+    md_content = None
+    warning = ""
+
+    for encoding in encodings:
+        try:
+            with open(md_file_path, 'r', encoding=encoding) as md_file:
+                md_content = md_file.read()
+            break  # 成功读取则跳出循环
+        except UnicodeDecodeError:
+            continue  # 尝试下一个编码
+        except Exception as e:
+            warning = f"无法读取文件 {md_file_path}：{e}"
+            md_content = None
+            break
+
+    # 如果所有编码都失败，使用替代内容
+    if md_content is None:
+        md_content = f"无法读取文件：{md_file_path}"
+    return md_content, warning
+
+
+def render_html_page(md_content: str, file: str, listing: bool = None) -> str:
+    """将MD内容渲染为完整的HTML页面
+
+    Args:
+        md_content: MD内容
+        file: 源文件名
+        listing: 是否为导出的笔记列表页（链接改指向HTML，不加返回链接）；默认只有export.md是
+    """
+    if listing is None:
+        listing = file == "export.md"
+    md = get_markdown()
+    md.reset()
+    html_content = md.convert(md_content)
+    if listing:
+        html_content = html_content.replace(".md\">",".html\">")
+    else:
+        html_content = html_content+f"<a href=\"javascript:history.back(-1)\">返回</a>"
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{Path(file).stem}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 20px; }}
+        h1, h2, h3, h4, h5, h6 {{ color: #333; }}
+        a {{ color: #0366d6; text-decoration: none; font-size: 20px;}}
+        img {{ margin:0; padding: 0; transform: translateY(-15px); text-align: center;}}
+        a:hover {{ text-decoration: underline; }}
+        ul, ol {{ padding-left: 20px; }}
+        code {{ background-color: #f6f8fa; padding: 2px 4px; border-radius: 3px; }}
+        pre {{ background-color: #f6f8fa; padding: 10px; border-radius: 3px; overflow: auto; }}
+        pre code {{ background-color: transparent; padding: 0; }}
+        table,th,td {{text-align: left; border: #333 1px solid; padding: 5px;}}
+        table {{border-collapse: collapse;}}
+    </style>
+</head>
+<body>
+{html_content}
+</body>
+</html>"""
+
+
+def render_md_file(src_path: Path, out_path: Path, listing: bool = None) -> str:
+    """读取、渲染并写出单个MD文件，返回读取失败的提示信息（无则为空字符串）"""
+    md_content, warning = read_md_content(src_path)
+    with open(out_path, 'w', encoding='utf-8') as html_file:
+        html_file.write(render_html_page(md_content, src_path.name, listing))
+    return warning
@@ -0,0 +1,205 @@
+"""
+笔记复习计划管理工具（命令行版）
+不依赖图形界面，可在计划任务或Git钩子中使用：
+    python -m note_cli export              重新生成export.md和allExport.md
+    python -m note_cli build-html [--full] 增量（或全量）转换MD到HTML
+    python -m note_cli push [-m 消息]       导出、转换HTML并推送到Git
+    python -m note_cli due [--date 日期]    列出需要复习的笔记
+    python -m note_cli stats               笔记统计
+    python -m note_cli chem [--force]      批量渲染化学方程式图片
+
+返回码：0 成功，1 操作失败，2 参数或配置错误。
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List
+from config import g_config
+from error_handler import set_headless
+from note_table import iter_note_fields
+from utils import check_config, convert_md_to_html, format_time
+
+# 返回码
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _parse_date(date_str: str) -> float:
+    """把 YYYY-MM-DD 转为当天中午的时间戳（避免时区导致落到相邻一天）"""
+    return time.mktime(time.strptime(date_str, "%Y-%m-%d")) + 12 * 3600
+
+
+# ==================== 子命令 ====================
+
+def cmd_export(args) -> int:
+    """重新生成导出文件"""
+    from operation import flush_export_operation
+    flush_export_operation()
+    print(g_config["export_file"])
+    print(g_config["all_export_file"])
+    return EXIT_OK
+
+
+def cmd_build_html(args) -> int:
+    """转换MD到HTML"""
+    workers = g_config["render_workers"] if args.workers is None else args.workers
+    start = time.perf_counter()
+    changed_paths = convert_md_to_html(g_config["root_dir"], full_rebuild=args.full, workers=workers)
+    if args.verbose:
+        for path in changed_paths:
+            print(path)
+    print(f"更新 {len(changed_paths)} 个输出文件，用时 {time.perf_counter() - start:.2f} 秒", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_push(args) -> int:
+    """导出、转换HTML并推送"""
+    from git_operation import GitManager, STAGE_ALL, STAGE_CHANGED, STAGE_NONE
+    manager = GitManager()
+    if not manager.git_enabled:
+        print("Git功能未在配置中启用！", file=sys.stderr)
+        return EXIT_USAGE
+
+    def on_progress(stage: str, percent: float, detail: str) -> None:
+        if not args.quiet:
+            print(f"[{percent:5.1f}%] {stage} {detail}".rstrip(), file=sys.stderr)
+
+    success, message = manager.run_push(
+        args.message or manager.default_commit_msg(),
+        remote=args.remote,
+        branch=args.branch,
+        force_push=args.force,
+        stage_mode=STAGE_NONE if args.no_add else STAGE_ALL if args.deep_sync else STAGE_CHANGED,
+        convert_html=not args.no_html,
+        on_progress=on_progress
+    )
+    print(message, file=sys.stdout if success else sys.stderr)
+    return EXIT_OK if success else EXIT_FAILED
+
+
+def cmd_due(args) -> int:
+    """列出指定日期需要复习的笔记"""
+    from note_store import get_note_store
+    target_timestamp = _parse_date(args.date) if args.date else time.time()
+    notes = get_note_store().due_notes(target_timestamp, g_config["target_days"])
+    if args.json:
+        print(json.dumps([dict(note) for note in notes], ensure_ascii=False, indent=2))
+    else:
+        for note in notes:
+            print(f"{note['subject']}\t{note['content']}\t{format_time(note['timestamp'], '%Y-%m-%d')}")
+    return EXIT_OK
+
+
+def cmd_stats(args) -> int:
+    """笔记统计：总数、今日需复习数及各科目笔记数"""
+    from note_store import get_note_store
+    store = get_note_store()
+    notes = store.get_note_list()
+    by_subject = {}
+    for subject, _, _ in iter_note_fields(notes):
+        by_subject[subject] = by_subject.get(subject, 0) + 1
+    stats = {
+        "total": len(notes),
+        "due_today": len(store.due_notes(time.time(), g_config["target_days"])),
+        "subjects": by_subject
+    }
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print(f"总笔记数：{stats['total']}")
+        print(f"今日需复习：{stats['due_today']}")
+        for subject, count in by_subject.items():
+            print(f"{subject}\t{count}")
+    return EXIT_OK
+
+
+def cmd_chem(args) -> int:
+    """批量渲染化学方程式（跳过源文件未修改的）"""
+    from chem_render import chem_assets_dir, render_equations
+    workers = g_config["chem_render_workers"] if args.workers is None else args.workers
+
+    def on_progress(done: int, total: int, name: str) -> None:
+        if not args.quiet:
+            print(f"[{done}/{total}] {name}", file=sys.stderr)
+
+    combined = g_config["chem_combined_render"] if args.combined is None else args.combined
+    result = render_equations(chem_assets_dir(g_config["root_dir"]), workers=workers,
+                              force=args.force, on_progress=on_progress, combined=combined)
+    print(result.summary(), file=sys.stderr if result.errors else sys.stdout)
+    return EXIT_FAILED if result.errors else EXIT_OK
+
+
+# ==================== 入口 ====================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="note_cli", description="艾宾浩斯笔记复习管理工具（命令行版）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="重新生成export.md和allExport.md")
+    export_parser.set_defaults(func=cmd_export)
+
+    html_parser = subparsers.add_parser("build-html", help="转换MD到HTML")
+    html_parser.add_argument("--full", action="store_true", help="清空HTML目录后全量重建")
+    html_parser.add_argument("--workers", type=int, help="渲染进程数（默认取config.ini，0为CPU核数）")
+    html_parser.add_argument("-v", "--verbose", action="store_true", help="列出更新的输出文件")
+    html_parser.set_defaults(func=cmd_build_html)
+
+    push_parser = subparsers.add_parser("push", help="导出、转换HTML并推送到Git")
+    push_parser.add_argument("-m", "--message", help="提交消息（默认为自动提交+当前时间）")
+    push_parser.add_argument("--remote", help="远程仓库（默认取config.ini）")
+    push_parser.add_argument("--branch", help="分支（默认取config.ini）")
+    push_parser.add_argument("-f", "--force", action="store_true", help="强制推送")
+    stage_group = push_parser.add_mutually_exclusive_group()
+    stage_group.add_argument("--deep-sync", action="store_true", help="深度同步：git add -A 添加所有更改（默认只添加记录的修改）")
+    stage_group.add_argument("--no-add", action="store_true", help="不添加，只提交已暂存的修改")
+    push_parser.add_argument("--no-html", action="store_true", help="不转换HTML")
+    push_parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+    push_parser.set_defaults(func=cmd_push)
+
+    due_parser = subparsers.add_parser("due", help="列出需要复习的笔记")
+    due_parser.add_argument("--date", help="日期 YYYY-MM-DD（默认今天）")
+    due_parser.add_argument("--json", action="store_true", help="以JSON输出")
+    due_parser.set_defaults(func=cmd_due)
+
+    stats_parser = subparsers.add_parser("stats", help="笔记统计")
+    stats_parser.add_argument("--json", action="store_true", help="以JSON输出")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    chem_parser = subparsers.add_parser("chem", help="批量渲染化学方程式图片")
+    chem_parser.add_argument("--force", action="store_true", help="忽略哈希清单，全部重新渲染")
+    chem_parser.add_argument("--workers", type=int, help="同时运行的渲染进程数（默认取config.ini，0为CPU核数）")
+    combined_group = chem_parser.add_mutually_exclusive_group()
+    combined_group.add_argument("--combined", action="store_true", default=None,
+                                help="合并为一个文档编译一次再按页拆分（默认取config.ini）")
+    combined_group.add_argument("--no-combined", dest="combined", action="store_false", help="逐个渲染")
+    chem_parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+    chem_parser.set_defaults(func=cmd_chem)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    set_headless(True)
+
+    if not check_config(g_config['root_dir'], g_config['target_days']):
+        print("目标天数配置无效，请检查 config.ini", file=sys.stderr)
+        return EXIT_USAGE
+    if args.command == "due" and args.date:
+        try:
+            _parse_date(args.date)
+        except ValueError:
+            print(f"日期格式错误：{args.date}（应为 YYYY-MM-DD）", file=sys.stderr)
+            return EXIT_USAGE
+
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"执行失败：{e}", file=sys.stderr)
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
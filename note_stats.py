@@ -0,0 +1,106 @@
+"""笔记统计模块
+
+状态栏显示的总笔记数、各科目笔记数和今日需复习数由 NoteStats 增量维护：
+它注册为笔记存储的监听函数，每次新增/更新/删除笔记只调整相应的计数，读取计数为O(1)。
+只有跨过零点（"今天"变化）或复习间隔 target_days 改变时才重新查询今日需复习的笔记；
+存储重新加载或整体替换后，在下次读取时整体重算。
+"""
+
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+from config import g_config
+from review_index import day_number
+
+
+class NoteStats:
+    """笔记统计聚合器（总数、各科目笔记数、今日需复习数）"""
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._total = 0
+        self._subject_counts: Dict[str, int] = {}
+        # 今日需复习的笔记（科目, 内容），以及计算时的天数编号和复习间隔
+        self._due_keys: Set[Tuple[str, str]] = set()
+        self._due_day: Optional[int] = None
+        self._due_offsets: FrozenSet[int] = frozenset()
+        # 需要整体重算（首次读取、存储重新加载或整体替换后）
+        self._stale = True
+        store.add_listener(self._on_note_changed)
+
+    def close(self) -> None:
+        """不再跟踪笔记变化"""
+        self.store.remove_listener(self._on_note_changed)
+
+    # ==================== 读取 ====================
+
+    @property
+    def total(self) -> int:
+        """笔记总数"""
+        with self._lock:
+            self._ensure_current()
+            return self._total
+
+    def subject_count(self, subject: str) -> int:
+        """指定科目的笔记数"""
+        with self._lock:
+            self._ensure_current()
+            return self._subject_counts.get(subject, 0)
+
+    def subject_counts(self) -> Dict[str, int]:
+        """各科目的笔记数"""
+        with self._lock:
+            self._ensure_current()
+            return dict(self._subject_counts)
+
+    def due_today(self, now: float = None) -> int:
+        """今日（now所在的一天）需要复习的笔记数"""
+        with self._lock:
+            self._ensure_current(now)
+            return len(self._due_keys)
+
+    # ==================== 维护 ====================
+
+    def _ensure_current(self, now: float = None) -> None:
+        """必要时重算：存储整体变化后重算全部计数，换日或复习间隔改变后重算今日需复习"""
+        if self._stale:
+            self._total = self.store.count_notes()
+            self._subject_counts = self.store.subject_counts()
+        day = day_number(time.time() if now is None else now)
+        offsets = frozenset(g_config['target_days'])
+        if self._stale or day != self._due_day or offsets != self._due_offsets:
+            due_notes = self.store.notes_due_on(day, sorted(offsets))
+            self._due_keys = {(note['subject'], note['content']) for note in due_notes}
+            self._due_day = day
+            self._due_offsets = offsets
+        self._stale = False
+
+    def _on_note_changed(self, op: str, subject: Optional[str], content: Optional[str]) -> None:
+        """笔记存储的变化通知：只调整受影响的计数"""
+        with self._lock:
+            if self._stale:
+                return
+            if op == "reset":
+                self._stale = True
+                return
+
+            key = (subject, content)
+            if op == "remove":
+                self._total -= 1
+                count = self._subject_counts.get(subject, 0) - 1
+                if count > 0:
+                    self._subject_counts[subject] = count
+                else:
+                    self._subject_counts.pop(subject, None)
+                self._due_keys.discard(key)
+                return
+
+            if op == "add":
+                # 存储只对原本不存在的笔记发出add通知
+                self._total += 1
+                self._subject_counts[subject] = self._subject_counts.get(subject, 0) + 1
+            note = self.store.find_note(subject, content)
+            if note is not None and self._due_day - day_number(note['timestamp']) in self._due_offsets:
+                self._due_keys.add(key)
+            else:
+                self._due_keys.discard(key)
@@ -0,0 +1,443 @@
+"""笔记数据存储模块
+
+进程内缓存 data.json 的解析结果（列式笔记表，见 note_table），启动时只解析一次。
+每次修改以一条记录追加到 data.journal.jsonl（追加后fsync），
+启动时先加载 data.json 快照再重放日志；日志积累到一定条数后在后台线程中
+压缩回 data.json（临时文件 + 原子替换），之后清空日志。
+每次修改后通知已注册的监听函数 listener(op, subject, content)，界面据此只更新变化的行：
+op 为 "add"/"touch"/"remove"；整体替换或重新加载时为 "reset"（subject、content 为 None）。
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from math import floor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from config import g_config
+from utils import load_data_json, save_data_json
+from review_index import ReviewIndex
+from note_table import NoteRow, NoteTable, NoteView
+from error_handler import collect_messages, show_error, show_message
+from tracing import traced
+from pending_changes import record_changes
+
+# 日志记录数达到该值时触发后台压缩
+JOURNAL_COMPACT_THRESHOLD = 200
+
+# 笔记变化监听函数：(op, subject, content)
+NoteChangeListener = Callable[[str, Optional[str], Optional[str]], None]
+
+
+def journal_path_for(data_file: Path) -> Path:
+    """data.json 对应的修改日志路径（data.journal.jsonl）"""
+    return data_file.with_name(f"{data_file.stem}.journal.jsonl")
+
+
+class NoteStore:
+    """笔记数据存储类（缓存 + 追加日志 + 后台压缩）"""
+    def __init__(self, data_file: Path):
+        self.data_file = data_file
+        self.journal_file = journal_path_for(data_file)
+        # 是否有尚未追加到日志的修改
+        self.dirty = False
+        self._loaded = False
+        self._table = NoteTable()
+        self._last_subject = ""
+        # 按科目排序的行号（增删笔记时二分插入/删除，表压缩或整体替换时失效；只改时间戳不影响顺序）
+        self._sorted_cache: Optional[array] = None
+        self._review_index = ReviewIndex(self._table)
+        self._batch_depth = 0
+        self._pending: List[Dict] = []
+        self._journal_count = 0
+        # 日志中间有无法解析的记录：修复日志并重新加载前不压缩、不清空日志
+        self._journal_damaged = False
+        self._lock = threading.RLock()
+        self._compact_thread: Optional[threading.Thread] = None
+        # 保证同一时间只有一次压缩在写data.json
+        self._compact_lock = threading.Lock()
+        # 后台压缩的错误处理函数 (级别, 标题, 消息)，None表示直接显示
+        self.on_error: Optional[Callable[[str, str, str], None]] = None
+        self._listeners: List[NoteChangeListener] = []
+
+    # ==================== 加载与持久化 ====================
+
+    def _ensure_loaded(self) -> None:
+        """首次访问时加载data.json"""
+        if not self._loaded:
+            # 后台加载与主线程首次访问可能同时发生，加锁后再次检查
+            with self._lock:
+                if not self._loaded:
+                    self.reload()
+
+    @traced()
+    def reload(self) -> None:
+        """丢弃缓存，从磁盘重新加载data.json快照并重放修改日志"""
+        with self._lock:
+            data = load_data_json(self.data_file)
+            self._table = NoteTable(data.get('note_list', []))
+            # 重放日志时会增量更新复习索引，因此先让索引指向新表
+            self._review_index.rebuild(self._table)
+            self._last_subject = data.get('last_subject', "")
+            self._sorted_cache = None
+            self._pending = []
+            self._journal_count = 0
+            self._journal_damaged = False
+            for record in self._read_journal():
+                self._apply(record)
+                self._journal_count += 1
+            self._loaded = True
+            self.dirty = False
+        self._notify("reset")
+
+    def _read_journal(self) -> List[Dict]:
+        """读取修改日志
+
+        只有最后一行可能是写入中途崩溃留下的不完整行：忽略并截掉它，之后追加的记录才能从新行开始。
+        中间的行无法解析时提示错误并跳过该行，在日志修复前不压缩也不清空日志，以免丢失记录。
+        """
+        if not self.journal_file.exists():
+            return []
+        records = []
+        damaged_lines = []
+        # 最后一条完整记录的结束位置
+        valid_size = 0
+        torn = False
+        try:
+            with open(self.journal_file, 'rb') as f:
+                lines = f.readlines()
+        except OSError as e:
+            show_error("读取失败", f"读取修改日志失败：{e}")
+            self._journal_damaged = True
+            return []
+        for number, line in enumerate(lines, start=1):
+            try:
+                records.append(json.loads(line.decode('utf-8')))
+            except ValueError:
+                if number == len(lines):
+                    torn = True
+                    break
+                damaged_lines.append(number)
+            valid_size += len(line)
+
+        if damaged_lines:
+            self._journal_damaged = True
+            show_error("读取失败", f"修改日志 {self.journal_file} 第 {', '.join(map(str, damaged_lines))} 行已损坏，"
+                                  "这些修改没有载入。修复或删除这些行并重新启动前，不会压缩修改日志。")
+        if torn:
+            try:
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(valid_size)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                show_error("保存失败", f"截掉修改日志中不完整的最后一行失败：{e}")
+                self._journal_damaged = True
+        return records
+
+    @traced()
+    def flush(self) -> bool:
+        """将尚未持久化的修改追加到日志（一次写入、一次fsync）"""
+        with self._lock:
+            if not self._pending:
+                self.dirty = False
+                return True
+            lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self._pending)
+            try:
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                show_error("保存失败", f"写入修改日志失败：{e}")
+                return False
+            self._journal_count += len(self._pending)
+            self._pending = []
+            self.dirty = False
+            need_compact = self._journal_count >= JOURNAL_COMPACT_THRESHOLD
+        if need_compact:
+            self.compact_in_background()
+        return True
+
+    @traced()
+    def compact(self) -> bool:
+        """将快照与日志合并写回data.json，然后清空日志
+
+        持锁时只取数据快照和当前日志记录数，data.json在锁外写入，压缩期间的读写不会被阻塞；
+        写入期间又有记录追加到日志时保留日志（重放日志是幂等的），留待下次压缩。
+        日志中间有损坏的记录时修改只追加到日志（已持久化），data.json和已有的日志记录保持原样。
+        """
+        with self._compact_lock:
+            with self._lock:
+                if not self.flush():
+                    return False
+                if self._journal_damaged:
+                    return True
+                if not self._journal_count and self.data_file.exists():
+                    return True
+                data = {"last_subject": self._last_subject, "note_list": self._table.to_dicts()}
+                journal_count = self._journal_count
+            if not save_data_json(self.data_file, data):
+                return False
+            with self._lock:
+                if self._journal_count != journal_count:
+                    return True
+                try:
+                    # 快照已包含日志中的全部修改，清空日志
+                    with open(self.journal_file, 'w', encoding='utf-8') as f:
+                        f.flush()
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    show_error("保存失败", f"清空修改日志失败：{e}")
+                    return False
+                self._journal_count = 0
+                return True
+
+    def compact_in_background(self) -> None:
+        """在后台线程中压缩日志（已有压缩在进行时不重复启动）"""
+        if self._compact_thread and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self._compact_in_thread, name="note-store-compact", daemon=True)
+        self._compact_thread.start()
+
+    def _compact_in_thread(self) -> None:
+        """后台压缩：错误消息交给 on_error（由界面转到主线程显示）"""
+        with collect_messages() as messages:
+            self.compact()
+        for level, title, message in messages:
+            (self.on_error or show_message)(level, title, message)
+
+    def close(self) -> bool:
+        """退出前调用：等待后台压缩结束并同步压缩一次"""
+        if self._compact_thread:
+            self._compact_thread.join()
+        return self.compact()
+
+    def persisted_paths(self) -> List[Path]:
+        """保存笔记数据的文件（修改后需要推送）"""
+        return [self.data_file, self.journal_file]
+
+    # ==================== 变化通知 ====================
+
+    def add_listener(self, listener: NoteChangeListener) -> None:
+        """注册笔记变化监听函数"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: NoteChangeListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, op: str, subject: str = None, content: str = None) -> None:
+        for listener in list(self._listeners):
+            listener(op, subject, content)
+
+    def _record(self, record: Dict) -> bool:
+        """应用一条修改并记录到日志，非批量模式下立即持久化"""
+        with self._lock:
+            self._apply(record)
+            self._pending.append(record)
+            self.dirty = True
+            record_changes(self.persisted_paths())
+            in_batch = self._batch_depth > 0
+        op = record["op"]
+        if op == "replace":
+            self._notify("reset")
+        elif op != "last_subject":
+            self._notify(op, record["subject"], record["content"])
+        return True if in_batch else self.flush()
+
+    def _apply(self, record: Dict) -> None:
+        """将一条修改记录应用到内存数据（加载时重放日志也使用此方法）"""
+        op = record["op"]
+        table = self._table
+        if op == "add":
+            row = table.find(record["subject"], record["content"])
+            if row is None:
+                row = table.add(record["subject"], record["content"], record["timestamp"])
+                self._review_index.add(row)
+                if self._sorted_cache is not None:
+                    self._sorted_cache = table.insert_sorted(self._sorted_cache, row)
+            else:
+                self._set_timestamp(row, record["timestamp"])
+        elif op == "touch":
+            row = table.find(record["subject"], record["content"])
+            if row is not None:
+                self._set_timestamp(row, record["timestamp"])
+        elif op == "remove":
+            row = table.find(record["subject"], record["content"])
+            if row is not None:
+                self._review_index.remove(row)
+                if self._sorted_cache is not None:
+                    self._sorted_cache = table.delete_sorted(self._sorted_cache, row)
+                table.remove(row)
+                if table.needs_compact():
+                    table.compact()
+                    self._review_index.rebuild()
+                    self._sorted_cache = None
+        elif op == "replace":
+            self._table = NoteTable(record["note_list"])
+            self._review_index.rebuild(self._table)
+            self._sorted_cache = None
+        elif op == "last_subject":
+            self._last_subject = record["subject"]
+
+    def _set_timestamp(self, row: int, timestamp: int) -> None:
+        old_timestamp = self._table.timestamps[row]
+        self._table.set_timestamp(row, timestamp)
+        self._review_index.move(row, old_timestamp)
+
+    @contextmanager
+    def batch(self):
+        """批量修改上下文：期间的所有修改只在退出时追加到日志一次"""
+        self._ensure_loaded()
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                outermost = not self._batch_depth
+            if outermost:
+                self.flush()
+
+    # ==================== 笔记读取 ====================
+
+    def get_note_list(self) -> NoteView:
+        """获取按科目排序的笔记（只读视图，元素为 NoteRow）"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._sorted_cache is None:
+                self._sorted_cache = self._table.sorted_rows()
+            return self._table.view(self._sorted_cache)
+
+    def notes_by_subject(self, subject: str) -> NoteView:
+        """获取指定科目的笔记"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._table.view(self._table.rows_of_subject(subject))
+
+    def subjects(self) -> List[str]:
+        """获取所有科目（已排序）"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._table.subjects()
+
+    def count_notes(self, subject: str = None) -> int:
+        """笔记总数（指定科目时为该科目的笔记数）"""
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._table) if subject is None else self._table.count_subject(subject)
+
+    def subject_counts(self) -> Dict[str, int]:
+        """各科目的笔记数"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._table.subject_counts()
+
+    def find_note(self, subject: str, content: str) -> Optional[NoteRow]:
+        """按科目和内容查找笔记"""
+        self._ensure_loaded()
+        with self._lock:
+            row = self._table.find(subject, content)
+            return None if row is None else self._table.row(row)
+
+    def due_notes(self, target_timestamp: float, target_days: List[int]) -> NoteView:
+        """目标时间戳当天需要复习的笔记（基于复习索引，无需遍历全部笔记）"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._review_index.due_at(target_timestamp, target_days)
+
+    def notes_due_on(self, day: int, target_days: List[int]) -> NoteView:
+        """第day天（timestamp // 86400）需要复习的笔记"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._review_index.due_on(day, target_days)
+
+    def day_counts(self) -> Dict[int, int]:
+        """每天（timestamp // 86400）创建/更新的笔记数，用于复习负荷预测"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._review_index.day_counts()
+
+    # ==================== 笔记修改 ====================
+
+    def update_note_list(self, notes: List[Dict]) -> bool:
+        """整体替换笔记列表"""
+        self._ensure_loaded()
+        return self._record({"op": "replace", "note_list": [dict(note) for note in notes]})
+
+    def add_note(self, subject: str, content: str, timestamp: int = None) -> NoteRow:
+        """新增笔记条目，已存在时返回原条目"""
+        note = self.find_note(subject, content)
+        if note is not None:
+            return note
+        self._record({
+            "op": "add",
+            "subject": subject,
+            "content": content,
+            "timestamp": floor(time.time()) if timestamp is None else timestamp
+        })
+        return self.find_note(subject, content)
+
+    def touch_note(self, subject: str, content: str, timestamp: int = None) -> bool:
+        """更新笔记时间戳，未找到条目时返回False"""
+        if self.find_note(subject, content) is None:
+            return False
+        self._record({
+            "op": "touch",
+            "subject": subject,
+            "content": content,
+            "timestamp": floor(time.time()) if timestamp is None else timestamp
+        })
+        return True
+
+    def remove_note(self, subject: str, content: str) -> bool:
+        """删除笔记条目，未找到条目时返回False"""
+        if self.find_note(subject, content) is None:
+            return False
+        self._record({"op": "remove", "subject": subject, "content": content})
+        return True
+
+    # ==================== 上次科目 ====================
+
+    def get_last_subject(self) -> str:
+        """获取上次使用的科目"""
+        self._ensure_loaded()
+        return self._last_subject
+
+    def set_last_subject(self, subject: str) -> bool:
+        """设置上次使用的科目"""
+        self._ensure_loaded()
+        if subject == self._last_subject:
+            return True
+        return self._record({"op": "last_subject", "subject": subject})
+
+
+# 进程内共享的存储实例（按数据文件区分）
+_stores: Dict[Path, NoteStore] = {}
+
+
+def get_note_store(data_file: Path = None):
+    """获取进程内共享的笔记存储实例
+
+    未指定数据文件（或指定的就是配置中的data.json）时，按 [Storage] backend
+    返回JSON存储或SQLite存储；两者接口一致。
+    """
+    if data_file is None or data_file == g_config["data_file"]:
+        if g_config["storage_backend"] == "sqlite":
+            from sqlite_store import SqliteNoteStore
+            data_file = g_config["sqlite_file"]
+            store_class = SqliteNoteStore
+        else:
+            data_file = g_config["data_file"]
+            store_class = NoteStore
+    else:
+        store_class = NoteStore
+    store = _stores.get(data_file)
+    if store is None:
+        store = _stores[data_file] = store_class(data_file)
+    return store
@@ -0,0 +1,299 @@
+"""笔记表模块
+
+列式保存笔记，代替每条笔记一个字典：
+    科目字符串只保存一次（科目表），每行只存科目编号（array('i')）；
+    时间戳保存在 array('q')；笔记内容（标题）保存在一个列表中。
+删除只做标记，空行积累到一定数量后整体压缩，行号始终保持笔记加入的先后顺序。
+排序、筛选和导出直接使用整数列；需要对象的代码通过 NoteView 按需生成 NoteRow，
+NoteRow 支持 note['subject'] 形式的访问，与原来的字典用法兼容。
+按科目排序的行号列表在增删笔记时二分查找插入/删除位置（insert_sorted/delete_sorted），无需整体重新排序。
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# 行视图的字段（与data.json中笔记条目的键一致）
+NOTE_FIELDS = ("content", "subject", "timestamp")
+# 空行数超过该值且超过总行数一半时压缩
+COMPACT_MIN_DEAD_ROWS = 1024
+
+SECONDS_PER_DAY = 86400
+
+
+class NoteRow:
+    """一行笔记（只读快照，支持字典式访问）
+
+    row_id 为生成该快照时的行号（不属于笔记字段），用于在视图中快速定位；-1 表示未知。
+    """
+    __slots__ = NOTE_FIELDS + ("row_id",)
+
+    def __init__(self, content: str, subject: str, timestamp: int, row_id: int = -1):
+        self.content = content
+        self.subject = subject
+        self.timestamp = timestamp
+        self.row_id = row_id
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return NOTE_FIELDS
+
+    def to_dict(self) -> Dict:
+        return {"content": self.content, "subject": self.subject, "timestamp": self.timestamp}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, NoteRow):
+            return (self.subject, self.content, self.timestamp) == (other.subject, other.content, other.timestamp)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"NoteRow(subject={self.subject!r}, content={self.content!r}, timestamp={self.timestamp})"
+
+
+class NoteView(Sequence):
+    """按行号列表查看笔记表的一部分（不复制数据，访问时才生成NoteRow）
+
+    视图引用创建时的列对象：表压缩时换用新的列对象，已有视图仍然有效；
+    时间戳的修改对视图可见，之后新增或删除的笔记不影响已有视图。
+    存储层返回的视图中的行都按 (科目, 行号) 排序，index() 据此二分查找。
+    """
+    __slots__ = ("_subject_names", "_subject_col", "_contents", "_timestamps", "_rows")
+
+    def __init__(self, table: "NoteTable", rows: array):
+        self._subject_names = table.subject_names
+        self._subject_col = table.subject_col
+        self._contents = table.contents
+        self._timestamps = table.timestamps
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            view = object.__new__(NoteView)
+            view._subject_names = self._subject_names
+            view._subject_col = self._subject_col
+            view._contents = self._contents
+            view._timestamps = self._timestamps
+            view._rows = self._rows[index]
+            return view
+        return self._row(self._rows[index])
+
+    def _row(self, row: int) -> NoteRow:
+        return NoteRow(self._contents[row], self._subject_names[self._subject_col[row]], self._timestamps[row], row)
+
+    def index(self, note, start: int = 0, stop: int = None) -> int:
+        """笔记在视图中的位置：带行号的 NoteRow 按 (科目, 行号) 二分查找，否则逐行比较"""
+        row = getattr(note, "row_id", -1)
+        rows = self._rows
+        if 0 <= row < len(self._contents) and not start and stop is None:
+            names, subject_col = self._subject_names, self._subject_col
+            position = bisect_left(rows, (note.subject, row), key=lambda r: (names[subject_col[r]], r))
+            if (position < len(rows) and rows[position] == row
+                    and self._contents[row] == note.content and names[subject_col[row]] == note.subject):
+                return position
+        return super().index(note, start, len(rows) if stop is None else stop)
+
+    def __iter__(self) -> Iterator[NoteRow]:
+        for row in self._rows:
+            yield self._row(row)
+
+    def iter_fields(self) -> Iterator[Tuple[str, str, int]]:
+        """逐行返回 (科目, 内容, 时间戳)，不创建行对象"""
+        names, subject_col, contents, timestamps = self._subject_names, self._subject_col, self._contents, self._timestamps
+        for row in self._rows:
+            yield names[subject_col[row]], contents[row], timestamps[row]
+
+    def filter_due(self, target_day: int, target_days: Iterable[int]) -> "NoteView":
+        """第target_day天需要复习的行（直接比较时间戳列）"""
+        offsets = set(target_days)
+        timestamps = self._timestamps
+        view = self[:0]
+        view._rows = array('q', (row for row in self._rows if target_day - timestamps[row] // SECONDS_PER_DAY in offsets))
+        return view
+
+    def to_dicts(self) -> List[Dict]:
+        return [{"content": content, "subject": subject, "timestamp": timestamp}
+                for subject, content, timestamp in self.iter_fields()]
+
+
+def iter_note_fields(notes) -> Iterator[Tuple[str, str, int]]:
+    """逐条返回 (科目, 内容, 时间戳)：NoteView直接读列，其他笔记列表按字典访问"""
+    if isinstance(notes, NoteView):
+        return notes.iter_fields()
+    return ((note['subject'], note['content'], note['timestamp']) for note in notes)
+
+
+class NoteTable:
+    """列式笔记表"""
+    def __init__(self, notes: Iterable[Dict] = ()):
+        # 科目编号 -> 科目（只增不减）
+        self.subject_names: List[str] = []
+        self._subject_ids: Dict[str, int] = {}
+        # 各列（下标为行号）
+        self.subject_col = array('i')
+        self.timestamps = array('q')
+        self.contents: List[str] = []
+        self.alive = bytearray()
+        # 科目编号 -> {内容: 行号}（只包含未删除的行）
+        self._rows_by_subject: Dict[int, Dict[str, int]] = {}
+        self._dead = 0
+        for note in notes:
+            self.add(note['subject'], note['content'], note['timestamp'])
+
+    def __len__(self) -> int:
+        return len(self.contents) - self._dead
+
+    # ==================== 查找 ====================
+
+    def intern_subject(self, subject: str) -> int:
+        """科目 -> 科目编号（新科目分配新编号）"""
+        subject_id = self._subject_ids.get(subject)
+        if subject_id is None:
+            subject_id = self._subject_ids[subject] = len(self.subject_names)
+            self.subject_names.append(subject)
+        return subject_id
+
+    def find(self, subject: str, content: str) -> Optional[int]:
+        """按科目和内容查找行号"""
+        subject_id = self._subject_ids.get(subject)
+        if subject_id is None:
+            return None
+        rows = self._rows_by_subject.get(subject_id)
+        return rows.get(content) if rows else None
+
+    def row(self, row: int) -> NoteRow:
+        return NoteRow(self.contents[row], self.subject_names[self.subject_col[row]], self.timestamps[row], row)
+
+    def subject_of(self, row: int) -> str:
+        return self.subject_names[self.subject_col[row]]
+
+    def count_subject(self, subject: str) -> int:
+        """指定科目的笔记数"""
+        subject_id = self._subject_ids.get(subject)
+        rows = self._rows_by_subject.get(subject_id) if subject_id is not None else None
+        return len(rows) if rows else 0
+
+    def subject_counts(self) -> Dict[str, int]:
+        """各科目的笔记数（只包含仍有笔记的科目）"""
+        return {self.subject_names[subject_id]: len(rows) for subject_id, rows in self._rows_by_subject.items() if rows}
+
+    def subjects(self) -> List[str]:
+        """仍有笔记的科目（已排序）"""
+        return sorted(self.subject_names[subject_id] for subject_id, rows in self._rows_by_subject.items() if rows)
+
+    def rows_of_subject(self, subject: str) -> array:
+        """指定科目的行号（按加入顺序）"""
+        subject_id = self._subject_ids.get(subject)
+        rows = self._rows_by_subject.get(subject_id) if subject_id is not None else None
+        return array('q', sorted(rows.values())) if rows else array('q')
+
+    # ==================== 修改 ====================
+
+    def add(self, subject: str, content: str, timestamp: int) -> int:
+        """新增一行（已存在时只更新时间戳），返回行号"""
+        subject_id = self.intern_subject(subject)
+        rows = self._rows_by_subject.setdefault(subject_id, {})
+        row = rows.get(content)
+        if row is not None:
+            self.timestamps[row] = int(timestamp)
+            return row
+        row = len(self.contents)
+        self.subject_col.append(subject_id)
+        self.timestamps.append(int(timestamp))
+        self.contents.append(content)
+        self.alive.append(1)
+        rows[content] = row
+        return row
+
+    def set_timestamp(self, row: int, timestamp: int) -> None:
+        self.timestamps[row] = int(timestamp)
+
+    def remove(self, row: int) -> None:
+        """删除一行（只做标记，由 needs_compact/compact 回收空行）"""
+        if not self.alive[row]:
+            return
+        self.alive[row] = 0
+        rows = self._rows_by_subject.get(self.subject_col[row])
+        if rows is not None:
+            rows.pop(self.contents[row], None)
+        self._dead += 1
+
+    def needs_compact(self) -> bool:
+        return self._dead >= COMPACT_MIN_DEAD_ROWS and self._dead * 2 > len(self.contents)
+
+    def compact(self) -> None:
+        """丢弃已删除的行（换用新的列对象，行号会变化，已有视图不受影响）"""
+        live = self.live_rows()
+        self.subject_col = array('i', (self.subject_col[row] for row in live))
+        self.timestamps = array('q', (self.timestamps[row] for row in live))
+        self.contents = [self.contents[row] for row in live]
+        self.alive = bytearray(b"\x01") * len(live)
+        self._rows_by_subject = {}
+        for row, (subject_id, content) in enumerate(zip(self.subject_col, self.contents)):
+            self._rows_by_subject.setdefault(subject_id, {})[content] = row
+        self._dead = 0
+
+    # ==================== 整体读取 ====================
+
+    def live_rows(self) -> array:
+        """未删除的行号（按加入顺序）"""
+        if not self._dead:
+            return array('q', range(len(self.contents)))
+        alive = self.alive
+        return array('q', (row for row in range(len(alive)) if alive[row]))
+
+    def sorted_rows(self) -> array:
+        """按科目排序的行号（同科目保持加入顺序）：按科目编号分桶后按科目名拼接，无需比较字符串"""
+        buckets: Dict[int, List[int]] = {}
+        subject_col, alive = self.subject_col, self.alive
+        for row in range(len(subject_col)):
+            if alive[row]:
+                buckets.setdefault(subject_col[row], []).append(row)
+        result = array('q')
+        for subject_id in sorted(buckets, key=self.subject_names.__getitem__):
+            result.extend(buckets[subject_id])
+        return result
+
+    def sort_key(self, row: int) -> Tuple[str, int]:
+        """行在按科目排序的列表中的排序键"""
+        return self.subject_names[self.subject_col[row]], row
+
+    def insert_sorted(self, rows: array, row: int) -> array:
+        """返回插入row后的有序行号列表（复制后插入，已有视图不受影响）"""
+        result = array('q', rows)
+        result.insert(bisect_left(rows, self.sort_key(row), key=self.sort_key), row)
+        return result
+
+    def delete_sorted(self, rows: array, row: int) -> array:
+        """返回删除row后的有序行号列表（须在压缩前调用，row的列数据仍然有效）"""
+        position = bisect_left(rows, self.sort_key(row), key=self.sort_key)
+        if position >= len(rows) or rows[position] != row:
+            return rows
+        result = array('q', rows)
+        del result[position]
+        return result
+
+    def view(self, rows: array) -> NoteView:
+        return NoteView(self, rows)
+
+    def to_dicts(self, rows: array = None) -> List[Dict]:
+        """转为笔记字典列表（写入data.json时使用）"""
+        return self.view(self.live_rows() if rows is None else rows).to_dicts()
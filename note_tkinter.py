@@ -4,20 +4,40 @@
 """
 
 import os
+import queue
+import threading
 import time
 import tkinter as tk
+from bisect import bisect_left
 from tkinter import ttk
-from typing import Any
+from typing import Any, List, Optional
 from placeHolder import PlaceholderEntry
+from virtual_tree import VirtualTreeview
 from utils import *
 from config import g_config
-from git_operation import GitManager
-from chem_equation import ChemEquationManager
+from note_store import get_note_store
+from note_stats import NoteStats
+from search_index import get_search_index
+from tracing import read_trace_log, summarize
+from review_forecast import DEFAULT_FORECAST_DAYS, forecast_store
+from review_index import day_number
 from operation import *
-from error_handler import show_error, show_warning, show_info, ask_yes_no, handle_operation_result
+from error_handler import collect_messages, show_error, show_warning, show_info, show_message, ask_yes_no, handle_operation_result
 
 
 
+# 主线程处理文件监视结果的间隔（毫秒）
+WATCHER_POLL_INTERVAL_MS = 500
+# 主线程检查后台加载笔记是否完成的间隔（毫秒）
+STARTUP_POLL_INTERVAL_MS = 20
+# 主线程显示后台线程错误的检查间隔（毫秒）
+BACKGROUND_ERROR_POLL_INTERVAL_MS = 500
+# 状态栏时钟的刷新间隔（毫秒）
+STATUS_CLOCK_INTERVAL_MS = 1000
+# 复习预测面板可选的天数
+FORECAST_DAY_CHOICES = (30, 60, 90)
+
+
 class NoteManagerApp:
     def __init__(self, root):
         self.root = root
@@ -38,21 +58,96 @@ class NoteManagerApp:
         # 确保data.json存在（使用新的工具函数）
         if not g_config["data_file"].exists():
             save_data_json(g_config["data_file"], {"note_list": [], "last_subject": ""})
+
+        # 进程内共享的笔记存储，data.json在后台线程中解析
+        self.note_store = get_note_store()
+        # 存储层通知的、尚未反映到笔记列表的变化（可能来自后台线程，刷新时在主线程取出）
+        self._note_changes: List[tuple] = []
+        # 筛选下拉菜单中的科目（不含"全部"），None表示需要整体重建
+        self._subject_values: Optional[List[str]] = None
+        self.note_store.add_listener(self._on_note_changed)
+        # 状态栏的各项计数（随笔记修改增量维护）
+        self.note_stats = NoteStats(self.note_store)
                 
-        # 初始化独立功能模块
-        self.git_manager = GitManager()
-        self.chem_eq_manager = ChemEquationManager()
+        # 初始化独立功能模块（未启用的功能不导入对应模块）
+        self.git_manager = None
+        if g_config['git_enabled']:
+            from git_operation import GitManager
+            self.git_manager = GitManager()
+        self.chem_eq_manager = None
+        if g_config['chem_eq_enabled']:
+            from chem_equation import ChemEquationManager
+            self.chem_eq_manager = ChemEquationManager()
 
-        # 初始化last_subject和当前筛选科目
-        self.last_subject = get_last_subject(g_config["data_file"])
+        # last_subject在笔记加载完成后更新；初始化当前筛选科目
+        self.last_subject = ""
         self.current_filter_subject = "全部"
+        self.search_index = get_search_index()
+        self.watcher = None
+        # 状态栏时钟的after任务（关闭窗口时取消）与状态栏计数所在的天数编号
+        self._clock_after_id = None
+        self._status_day = None
+
+        # 后台线程（计划导出、日志压缩等）不能直接弹出对话框，消息 (级别, 标题, 消息) 经队列交给主线程显示
+        self.background_errors = queue.Queue()
+        export_scheduler.on_error = lambda e: self.background_errors.put(
+            ("error", "导出失败", f"后台重新生成列表文件失败：{e}"))
+        self.note_store.on_error = lambda level, title, message: self.background_errors.put((level, title, message))
         
-        # 创建界面
+        # 创建界面，先显示窗口再在后台加载笔记
         self.create_ui()
+        self.root.after(BACKGROUND_ERROR_POLL_INTERVAL_MS, self.process_background_errors)
+        self.status_var.set("正在加载笔记…")
+        self._load_messages = []
+        self._load_thread = threading.Thread(target=self._load_notes, name="note-load", daemon=True)
+        self._load_thread.start()
+        self.root.after(STARTUP_POLL_INTERVAL_MS, self._finish_startup)
+
+    def _load_notes(self):
+        """后台线程：加载笔记，读取失败等消息留给 _finish_startup 在主线程中显示"""
+        with collect_messages() as messages:
+            try:
+                self.note_store.get_note_list()
+            except Exception as e:
+                messages.append(("error", "读取失败", f"加载笔记失败：{e}"))
+        self._load_messages = messages
+
+    def _finish_startup(self):
+        """后台加载完成后填充笔记列表，并启动搜索索引同步和文件监视"""
+        if self._load_thread.is_alive():
+            self.root.after(STARTUP_POLL_INTERVAL_MS, self._finish_startup)
+            return
+        for message in self._load_messages:
+            show_message(*message)
+
+        self.last_subject = self.note_store.get_last_subject()
+        entry = getattr(self, 'subject_placeholder_entry', None)
+        if self.last_subject and entry is not None and entry.winfo_exists() and self.root.focus_get() is not entry:
+            entry.set_placeholder(self.last_subject)
+
         # 初始化笔记列表
         self.refresh_note_list()
-        # 初始化状态信息
+        # 初始化状态信息，之后每秒刷新一次时钟
         self.update_status_bar()
+        self._clock_after_id = self.root.after(STATUS_CLOCK_INTERVAL_MS, self._tick_status_bar)
+        # 后台同步全文搜索索引（只读取有变化的笔记文件）
+        notes = self.note_store.get_note_list()
+        threading.Thread(target=self.search_index.refresh, args=(notes,), daemon=True).start()
+        # 后台用Git核对待推送修改记录（应用外可能执行过提交或推送）
+        if self.git_manager:
+            self.git_manager.verify_pending_changes_in_background()
+
+        # 监视应用外对笔记文件的修改；变化经队列交给主线程处理
+        if g_config['watcher_enabled']:
+            from note_watcher import NoteWatcher
+            self.watcher_changes = queue.Queue()
+            self.watcher = NoteWatcher(
+                g_config['root_dir'],
+                self.watcher_changes.put,
+                poll_interval=g_config['watcher_poll_interval']
+            )
+            self.watcher.start()
+            self.root.after(WATCHER_POLL_INTERVAL_MS, self.process_watcher_changes)
 
 
     def create_ui(self):
@@ -69,9 +164,14 @@ class NoteManagerApp:
         self.btn_delete_note = ttk.Button(self.top_frame, text="删除笔记", command=self.delete_note_handler)
         self.btn_delete_note.pack(side=tk.LEFT, padx=5)
 
+        self.btn_mark_reviewed = ttk.Button(self.top_frame, text="标记已复习", command=self.mark_reviewed_handler)
+        self.btn_mark_reviewed.pack(side=tk.LEFT, padx=5)
+
         if g_config['chem_eq_enabled']:
             self.btn_chem_eq = ttk.Button(self.top_frame, text="化学方程式转图片", command=self.chem_eq_manager.create_equation_tex)
             self.btn_chem_eq.pack(side=tk.LEFT, padx=5)
+            self.btn_chem_batch = ttk.Button(self.top_frame, text="批量渲染方程式", command=self.chem_eq_manager.batch_render_equations)
+            self.btn_chem_batch.pack(side=tk.LEFT, padx=5)
 
         self.btn_re_export = ttk.Button(self.top_frame, text="重新导出文件", command=self.re_export_handler)
         self.btn_re_export.pack(side=tk.LEFT, padx=5)
@@ -80,9 +180,16 @@ class NoteManagerApp:
             self.btn_git_push = ttk.Button(self.top_frame, text="推送到Git", command=self.git_manager.show_push_dialog)
             self.btn_git_push.pack(side=tk.LEFT, padx=5)
 
-        self.btn_refresh = ttk.Button(self.top_frame, text="刷新列表", command=self.refresh_note_list)
+        self.btn_refresh = ttk.Button(self.top_frame, text="刷新列表", command=self.reload_note_list)
         self.btn_refresh.pack(side=tk.LEFT, padx=5)
 
+        self.btn_forecast = ttk.Button(self.top_frame, text="复习预测", command=self.show_forecast_panel)
+        self.btn_forecast.pack(side=tk.LEFT, padx=5)
+
+        if g_config['tracing_enabled']:
+            self.btn_perf_stats = ttk.Button(self.top_frame, text="性能统计", command=self.show_perf_panel)
+            self.btn_perf_stats.pack(side=tk.LEFT, padx=5)
+
         # 2. 主内容区（左右分栏）
         self.main_frame = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -107,26 +214,26 @@ class NoteManagerApp:
         self.filter_combobox.bind("<<ComboboxSelected>>", 
             lambda event: (
                 setattr(self, 'current_filter_subject', self.filter_subject_var.get()),
-                self.refresh_note_list(),
+                self.rebuild_note_list(),
                 self.update_status_bar()
             )
         )
 
-        # 笔记列表Treeview
-        self.note_tree = ttk.Treeview(
+        # 全文搜索
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(self.filter_frame, textvariable=self.search_var, width=20)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda event: self.show_search_panel())
+        ttk.Button(self.filter_frame, text="搜索", command=self.show_search_panel).pack(side=tk.LEFT, padx=5)
+
+        # 笔记列表（虚拟化Treeview，只创建可见行；点击空白区域取消选择）
+        self.note_list = VirtualTreeview(
             self.left_frame,
             columns=("subject", "content", "timestamp"),
-            show="headings",
-            selectmode="extended"
-        )
-        
-        # 绑定点击事件，点击空白区域取消选择
-        self.note_tree.bind("<Button-1>", 
-            lambda event: (
-                (item := self.note_tree.identify_row(event.y)),
-                self.note_tree.selection_remove(self.note_tree.selection()) if not item else None
-            )
+            format_row=lambda note: (note['subject'], note['content'], format_time(note['timestamp'], '%Y-%m-%d %H:%M')),
+            row_key=lambda note: (note['subject'], note['content'])
         )
+        self.note_tree = self.note_list.tree
         self.note_tree.heading("subject", text="科目")
         self.note_tree.heading("content", text="笔记内容")
         self.note_tree.heading("timestamp", text="创建/更新时间")
@@ -134,15 +241,10 @@ class NoteManagerApp:
         self.note_tree.column("content", width=170)
         self.note_tree.column("timestamp", width=110)
 
-        # 列表滚动条
-        self.tree_scroll = ttk.Scrollbar(self.left_frame, orient=tk.VERTICAL, command=self.note_tree.yview)
-        self.note_tree.configure(yscrollcommand=self.tree_scroll.set)
-
         # 创建右键菜单
         self.create_context_menu()
 
-        self.note_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y, expand=False)
+        self.note_list.pack(fill=tk.BOTH, expand=True)
 
         # 右侧：功能面板（默认显示新建笔记面板）
         self.right_frame = ttk.Frame(self.main_frame, width=600)
@@ -162,10 +264,15 @@ class NoteManagerApp:
         # 显示新建笔记面板
         self.show_new_note_panel()
 
-        # 3. 底部状态栏
+        # 3. 底部状态栏（时钟单独显示，每秒刷新时不覆盖状态栏中的提示信息）
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(fill=tk.X, side=tk.BOTTOM, padx=5, pady=2)
+        self.clock_var = tk.StringVar(value=f"当前时间：{format_time()}")
+        self.clock_label = ttk.Label(status_frame, textvariable=self.clock_var, relief=tk.SUNKEN)
+        self.clock_label.pack(side=tk.RIGHT)
         self.status_var = tk.StringVar()
-        self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN)
-        self.status_bar.pack(fill=tk.X, side=tk.BOTTOM, padx=5, pady=2)
+        self.status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN)
+        self.status_bar.pack(fill=tk.X, side=tk.LEFT, expand=True)
 
     def create_context_menu(self):
         """创建右键菜单"""
@@ -181,9 +288,9 @@ class NoteManagerApp:
         self.context_menu.delete(0, tk.END)
         
         # 检查是否有选中的笔记
-        selected_items = self.note_tree.selection()
+        selected_notes = self.note_list.selected_rows()
         
-        if not selected_items:
+        if not selected_notes:
             # 未选中时的菜单
             self.context_menu.add_command(label="新建笔记", command=lambda:(
                 # 显示新建笔记面板
@@ -196,6 +303,7 @@ class NoteManagerApp:
         else:
             # 选中时的菜单
             self.context_menu.add_command(label="修改笔记", command=self.modify_note_handler)
+            self.context_menu.add_command(label="标记已复习", command=self.mark_reviewed_handler)
             self.context_menu.add_command(label="删除笔记", command=self.delete_note_handler)
         
         # 显示菜单
@@ -249,6 +357,180 @@ class NoteManagerApp:
         )
         tip_label.pack(anchor=tk.W, pady=5)
 
+    def show_search_panel(self):
+        """显示全文搜索结果面板"""
+        query = self.search_var.get().strip()
+        if not query:
+            show_warning("输入错误", "请输入搜索内容！")
+            return
+
+        start = time.perf_counter()
+        results = self.search_index.search(query)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # 清空容器
+        for widget in self.panel_container.winfo_children():
+            widget.destroy()
+
+        # 面板标题
+        title_label = ttk.Label(self.panel_container, text=f"搜索：{query}", font=("SimHei", 16))
+        title_label.pack(anchor=tk.W, pady=10)
+        ttk.Label(
+            self.panel_container,
+            text=f"共 {len(results)} 条结果（{elapsed_ms:.1f} 毫秒），双击打开笔记",
+            foreground="gray"
+        ).pack(anchor=tk.W, pady=5)
+
+        # 结果列表
+        result_tree = ttk.Treeview(
+            self.panel_container,
+            columns=("subject", "content", "snippet"),
+            show="headings",
+            selectmode="browse"
+        )
+        result_tree.heading("subject", text="科目")
+        result_tree.heading("content", text="笔记内容")
+        result_tree.heading("snippet", text="摘要")
+        result_tree.column("subject", width=80)
+        result_tree.column("content", width=160)
+        result_tree.column("snippet", width=320)
+        for result in results:
+            result_tree.insert("", tk.END, values=(result.subject, result.content, result.snippet))
+        result_tree.pack(fill=tk.BOTH, expand=True)
+
+        def open_result(event):
+            item = result_tree.identify_row(event.y)
+            if not item:
+                return
+            subject, content = result_tree.item(item, "values")[:2]
+            success, msg = open_file_with_editor(build_note_path(g_config['root_dir'], subject, content), wait=False)
+            if not success:
+                show_error("失败", msg)
+
+        result_tree.bind("<Double-1>", open_result)
+
+        ttk.Button(self.panel_container, text="返回新建笔记", command=self.show_new_note_panel).pack(pady=10)
+
+    def show_perf_panel(self):
+        """显示性能统计面板（按操作汇总追踪日志中的耗时）"""
+        summary = summarize(read_trace_log())
+
+        # 清空容器
+        for widget in self.panel_container.winfo_children():
+            widget.destroy()
+
+        # 面板标题
+        title_label = ttk.Label(self.panel_container, text="性能统计", font=("SimHei", 16))
+        title_label.pack(anchor=tk.W, pady=10)
+        ttk.Label(
+            self.panel_container,
+            text=f"共 {len(summary)} 项，按总耗时排序（日志：{g_config['trace_log_file']}）",
+            foreground="gray"
+        ).pack(anchor=tk.W, pady=5)
+
+        # 统计列表
+        stats_tree = ttk.Treeview(
+            self.panel_container,
+            columns=("name", "count", "p50", "p95", "max", "subprocess", "errors"),
+            show="headings",
+            selectmode="browse"
+        )
+        for column, text, width in (
+            ("name", "操作", 260), ("count", "次数", 50), ("p50", "p50(ms)", 70), ("p95", "p95(ms)", 70),
+            ("max", "最大(ms)", 70), ("subprocess", "子进程均值(ms)", 100), ("errors", "出错", 50)
+        ):
+            stats_tree.heading(column, text=text)
+            stats_tree.column(column, width=width, anchor=tk.W if column == "name" else tk.E)
+        for item in summary:
+            stats_tree.insert("", tk.END, values=(
+                item["name"], item["count"], f"{item['p50_ms']:.1f}", f"{item['p95_ms']:.1f}",
+                f"{item['max_ms']:.1f}", f"{item['subprocess_ms']:.1f}", item["errors"]
+            ))
+        stats_tree.pack(fill=tk.BOTH, expand=True)
+
+        btn_frame = ttk.Frame(self.panel_container)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="刷新", command=self.show_perf_panel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="返回新建笔记", command=self.show_new_note_panel).pack(side=tk.LEFT, padx=5)
+
+    def show_forecast_panel(self):
+        """显示复习预测面板（未来N天每天需要复习的笔记数柱状图）"""
+        # 清空容器
+        for widget in self.panel_container.winfo_children():
+            widget.destroy()
+
+        # 面板标题
+        title_label = ttk.Label(self.panel_container, text="复习预测", font=("SimHei", 16))
+        title_label.pack(anchor=tk.W, pady=10)
+
+        option_frame = ttk.Frame(self.panel_container)
+        option_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(option_frame, text="预测天数：").pack(side=tk.LEFT, padx=5)
+        days_var = tk.StringVar(value=str(getattr(self, 'forecast_days', DEFAULT_FORECAST_DAYS)))
+        days_combobox = ttk.Combobox(option_frame, textvariable=days_var, state="readonly", width=6,
+                                     values=FORECAST_DAY_CHOICES)
+        days_combobox.pack(side=tk.LEFT, padx=5)
+        summary_var = tk.StringVar()
+        ttk.Label(option_frame, textvariable=summary_var, foreground="gray").pack(side=tk.LEFT, padx=10)
+
+        canvas = tk.Canvas(self.panel_container, height=260, background="white", highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True, pady=5)
+        hover_var = tk.StringVar(value="将鼠标移到柱上查看日期与复习数")
+        ttk.Label(self.panel_container, textvariable=hover_var).pack(anchor=tk.W, pady=5)
+
+        forecast = []
+
+        def recompute(event=None):
+            self.forecast_days = int(days_var.get())
+            start_day = day_number(time.time())
+            forecast[:] = forecast_store(self.note_store, start_day, self.forecast_days, g_config['target_days'])
+            peak = max(forecast) if forecast else 0
+            summary_var.set(f"合计 {sum(forecast)} 次，日均 {sum(forecast) / len(forecast):.1f}，最多 {peak}")
+            redraw()
+
+        def redraw(event=None):
+            self._draw_forecast_chart(canvas, forecast, hover_var)
+
+        days_combobox.bind("<<ComboboxSelected>>", recompute)
+        canvas.bind("<Configure>", redraw)
+        recompute()
+
+        btn_frame = ttk.Frame(self.panel_container)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="刷新", command=recompute).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="返回新建笔记", command=self.show_new_note_panel).pack(side=tk.LEFT, padx=5)
+
+    def _draw_forecast_chart(self, canvas: tk.Canvas, forecast: list, hover_var: tk.StringVar):
+        """在画布上绘制复习预测柱状图（第一根为今天）"""
+        canvas.delete("all")
+        if not forecast:
+            return
+        width = max(canvas.winfo_width(), 200)
+        height = max(canvas.winfo_height(), 100)
+        left, right, top, bottom = 40, 10, 10, 20
+        peak = max(max(forecast), 1)
+        bar_width = (width - left - right) / len(forecast)
+        scale = (height - top - bottom) / peak
+
+        # 纵轴刻度：0、一半、最大值
+        for value in (0, peak // 2, peak):
+            y = height - bottom - value * scale
+            canvas.create_line(left, y, width - right, y, fill="#eeeeee")
+            canvas.create_text(left - 5, y, text=str(value), anchor=tk.E, fill="gray")
+
+        start_time = time.time()
+        for i, count in enumerate(forecast):
+            x0 = left + i * bar_width
+            x1 = x0 + max(bar_width - 1, 1)
+            y0 = height - bottom - count * scale
+            bar = canvas.create_rectangle(x0, y0, x1, height - bottom, width=0,
+                                          fill="#d9534f" if i == 0 else "#0366d6")
+            date_str = format_time(start_time + i * 86400, '%Y-%m-%d')
+            canvas.tag_bind(bar, "<Enter>", lambda event, d=date_str, c=count: hover_var.set(f"{d}：需复习 {c} 条"))
+            # 每7天标注一次日期
+            if i % 7 == 0:
+                canvas.create_text(x0, height - bottom + 2, text=date_str[5:], anchor=tk.NW, fill="gray")
+
     def create_note_handler(self):
         """创建笔记处理函数"""
         subject = self.subject_var.get().strip()
@@ -263,7 +545,7 @@ class NoteManagerApp:
                 # 更新placeholder
                 self.subject_placeholder_entry.set_placeholder(subject)
                 # 保存到data.json（使用新的工具函数）
-                if not set_last_subject(g_config["data_file"], subject):
+                if not self.note_store.set_last_subject(subject):
                     show_error("保存失败", "更新last_subject失败")
             
             self.refresh_note_list()
@@ -286,16 +568,20 @@ class NoteManagerApp:
     def modify_note_handler(self):
         """修改笔记处理函数"""
         # 选中校验
-        selected_items = self.note_tree.selection()
-        if not selected_items:
+        selected_notes = self.note_list.selected_rows()
+        if not selected_notes:
             show_warning("选择错误", "请先选中要修改的笔记！")
             return
 
+        # 选中多条笔记时批量标记为已复习
+        if len(selected_notes) > 1:
+            self.mark_reviewed_handler()
+            return
+
         # 获取选中数据
-        item = selected_items[0]
-        values = self.note_tree.item(item, "values")
-        subject = values[0]
-        content = values[1]
+        note = selected_notes[0]
+        subject = note['subject']
+        content = note['content']
 
         if not ask_yes_no("确认修改", f"是否要修改笔记：{subject}/{content}？"):
             return
@@ -315,110 +601,235 @@ class NoteManagerApp:
     def delete_note_handler(self):
         """删除笔记处理函数"""
         # 获取选中的笔记
-        selected_items = self.note_tree.selection()
-        if not selected_items:
+        selected_notes = self.note_list.selected_rows()
+        if not selected_notes:
             show_warning("选择错误", "请先选中要删除的笔记！")
             return
 
-        # 只处理第一个选中项
-        item = selected_items[0]
-        values = self.note_tree.item(item, "values")
-        subject = values[0]
-        content = values[1]
-
         # 二次确认
-        if not ask_yes_no("确认删除", f"确定要删除笔记：{subject}/{content}？此操作不可恢复！"):
-            return
-
-        success, msg = delete_note_operation(subject, content)
+        if len(selected_notes) > 1:
+            if not ask_yes_no("确认删除", f"确定要删除选中的 {len(selected_notes)} 条笔记？此操作不可恢复！"):
+                return
+            success, msg = batch_delete_notes_operation(
+                [(note['subject'], note['content']) for note in selected_notes]
+            )
+        else:
+            note = selected_notes[0]
+            subject = note['subject']
+            content = note['content']
+            if not ask_yes_no("确认删除", f"确定要删除笔记：{subject}/{content}？此操作不可恢复！"):
+                return
+            success, msg = delete_note_operation(subject, content)
 
         # 根据结果显示提示并刷新界面
         if success:
             # 刷新界面列表和状态栏
             self.refresh_note_list()
             self.update_status_bar()
-            show_info("成功", msg)
+            if "失败" in msg:
+                show_warning("部分失败", msg)
+            else:
+                show_info("成功", msg)
         else:
             if "未找到" in msg or "未在" in msg:
                 show_warning("警告", msg)
             else:
                 show_error("删除失败", msg)
 
+    def mark_reviewed_handler(self):
+        """将选中的笔记批量标记为已复习（更新时间戳）"""
+        selected_notes = self.note_list.selected_rows()
+        if not selected_notes:
+            show_warning("选择错误", "请先选中要标记的笔记！")
+            return
+
+        if not ask_yes_no("确认标记", f"是否将选中的 {len(selected_notes)} 条笔记标记为已复习（更新时间戳）？"):
+            return
+
+        success, msg = batch_touch_notes_operation(
+            [(note['subject'], note['content']) for note in selected_notes]
+        )
+
+        if success:
+            self.refresh_note_list()
+            self.update_status_bar()
+            if "失败" in msg:
+                show_warning("部分失败", msg)
+            else:
+                show_info("成功", msg)
+        else:
+            show_error("失败", msg)
+
     def re_export_handler(self):
         """重新导出文件处理函数"""
         try:
             after_modify_operation(True)
-            show_info("成功", f"已重新生成{g_config["export_file"]}和{g_config["all_export_file"]}文件！")
+            show_info("成功", f"已重新生成{g_config['export_file']}和{g_config['all_export_file']}文件！")
         except Exception as e:
             show_error("导出失败", f"重新导出文件失败：{e}")
 
+    def reload_note_list(self):
+        """从磁盘重新加载data.json并刷新列表"""
+        self.note_store.flush()
+        self.note_store.reload()
+        self.rebuild_note_list()
+        self.update_status_bar()
+
+    def _on_note_changed(self, op, subject, content):
+        """存储层的笔记变化通知：先记录下来，刷新列表时统一应用"""
+        self._note_changes.append((op, subject, content))
+
     def refresh_note_list(self):
-        """刷新笔记列表"""
-        # 清空现有内容
-        for item in self.note_tree.get_children():
-            self.note_tree.delete(item)
+        """刷新笔记列表：只应用上次刷新以来的笔记变化，开销与变化条数有关而与笔记总数无关"""
+        changes, self._note_changes = self._note_changes, []
+        if self._subject_values is None or any(op == "reset" for op, _, _ in changes):
+            self.rebuild_note_list()
+            return
+        if not changes:
+            return
+
+        # 按笔记的key（科目, 内容）合并变化，同一条笔记以最后一次变化为准
+        changed_keys, removed_keys, subjects = set(), set(), set()
+        for op, subject, content in changes:
+            key = (subject, content)
+            subjects.add(subject)
+            if op == "remove":
+                removed_keys.add(key)
+                changed_keys.discard(key)
+            else:
+                changed_keys.add(key)
+                removed_keys.discard(key)
+        self._update_subject_values(subjects)
+
+        # 筛选某个科目时，其他科目的变化不影响列表
+        if self.current_filter_subject != "全部" and self.current_filter_subject not in subjects:
+            return
+        self.filtered_notes = self._filter_notes_by_subject()
+        self.note_list.update_rows(self.filtered_notes, changed_keys, removed_keys)
+
+    def rebuild_note_list(self):
+        """整体重建笔记列表和筛选科目下拉菜单（启动、重新加载和切换筛选科目时）"""
+        self._note_changes = []
+        self._subject_values = self.note_store.subjects()
+        self.filter_combobox['values'] = ["全部"] + self._subject_values
 
-        # 获取所有笔记
-        self.all_notes = get_note_list(g_config["data_file"])
-        
-        # 更新筛选科目下拉菜单
-        subjects = sorted(list(set([note['subject'] for note in self.all_notes])))
-        subjects = ["全部"] + subjects
-        self.filter_combobox['values'] = subjects
-        
         # 根据筛选条件过滤笔记
-        filtered_notes = self._filter_notes_by_subject(self.all_notes)
-        
-        # 插入到列表中
-        for note in filtered_notes:
-            # 使用新的时间格式化函数
-            time_str = format_time(note['timestamp'], '%Y-%m-%d %H:%M')
-            self.note_tree.insert("", tk.END, values=(note['subject'], note['content'], time_str))
-
-    def _filter_notes_by_subject(self, notes):
-        """根据当前筛选科目过滤笔记"""
+        self.filtered_notes = self._filter_notes_by_subject()
+
+        # 交给虚拟列表，只有可见窗口内的行会被创建和格式化
+        self.note_list.set_rows(self.filtered_notes)
+
+    def _update_subject_values(self, subjects):
+        """只检查发生变化的科目：新出现的科目插入下拉菜单，不再有笔记的科目移除"""
+        values = self._subject_values
+        modified = False
+        for subject in subjects:
+            index = bisect_left(values, subject)
+            present = index < len(values) and values[index] == subject
+            if self.note_stats.subject_count(subject) > 0:
+                if not present:
+                    values.insert(index, subject)
+                    modified = True
+            elif present:
+                del values[index]
+                modified = True
+        if modified:
+            self.filter_combobox['values'] = ["全部"] + values
+
+    def _filter_notes_by_subject(self):
+        """根据当前筛选科目获取笔记（筛选由存储层完成）"""
         if self.current_filter_subject != "全部":
-            return [note for note in notes if note['subject'] == self.current_filter_subject]
-        return notes
+            return self.note_store.notes_by_subject(self.current_filter_subject)
+        return self.note_store.get_note_list()
     
     def update_status_bar(self):
-        """更新状态栏信息"""
-        # 使用缓存的笔记列表，避免重复读取
-        notes = getattr(self, 'all_notes', get_note_list(g_config["data_file"]))
-        note_count = len(notes)
-        
-        # 获取当日复习笔记数
+        """更新状态栏信息（计数由 NoteStats 增量维护，只读取计数器，不遍历笔记）"""
         current_time = time.time()
-        today_notes = filter_notes(notes, current_time, g_config['target_days'])
-        today_count = len(today_notes)
-        
-        # 获取筛选后的笔记数（复用过滤函数）
-        filtered_notes = self._filter_notes_by_subject(notes)
+        self._status_day = day_number(current_time)
+        note_count = self.note_stats.total
+        # 换日或复习间隔改变时 NoteStats 会自动重算
+        today_count = self.note_stats.due_today(current_time)
+
         if self.current_filter_subject != "全部":
-            filter_info = f" | 筛选科目：{self.current_filter_subject} ({len(filtered_notes)}条)"
+            subject_count = self.note_stats.subject_count(self.current_filter_subject)
+            filter_info = f" | 筛选科目：{self.current_filter_subject} ({subject_count}条)"
         else:
             filter_info = ""
 
-        # 使用新的时间格式化函数
         self.status_var.set(
-            f"当前时间：{format_time()} | 总笔记数：{note_count} | 今日需复习：{today_count}{filter_info} | 笔记根目录：{g_config['root_dir']}"
+            f"总笔记数：{note_count} | 今日需复习：{today_count}{filter_info} | 笔记根目录：{g_config['root_dir']}"
         )
 
+    def _tick_status_bar(self):
+        """每秒刷新状态栏的时钟；换日时才重新计算今日需复习数"""
+        current_time = time.time()
+        self.clock_var.set(f"当前时间：{format_time(current_time)}")
+        if day_number(current_time) != self._status_day:
+            self.update_status_bar()
+        self._clock_after_id = self.root.after(STATUS_CLOCK_INTERVAL_MS, self._tick_status_bar)
+
+    def process_background_errors(self):
+        """在主线程中显示后台线程报告的错误"""
+        try:
+            while True:
+                show_message(*self.background_errors.get_nowait())
+        except queue.Empty:
+            pass
+        self.root.after(BACKGROUND_ERROR_POLL_INTERVAL_MS, self.process_background_errors)
+
+    def process_watcher_changes(self):
+        """在主线程中应用文件监视器检测到的变化，并刷新界面"""
+        modified = False
+        try:
+            while True:
+                if apply_note_changes_operation(self.watcher_changes.get_nowait()):
+                    modified = True
+        except queue.Empty:
+            pass
+        if modified:
+            self.refresh_note_list()
+            self.update_status_bar()
+        self.root.after(WATCHER_POLL_INTERVAL_MS, self.process_watcher_changes)
+
     def on_closing(self):
         """窗口关闭事件处理"""
+        # 执行计划中的导出，并将修改日志压缩回data.json（检查未推送的修改前需要写入磁盘）；
+        # 文件监视和笔记存储保持可用，用户取消推送时窗口继续使用
+        export_scheduler.flush_if_pending()
+        self.note_store.compact()
+
+        if self.git_manager is None:
+            self._shutdown()
+            return
+
+        # 有进行中的推送时等待其结束再关闭，不再发起新的推送
+        if self.git_manager.is_pushing():
+            self.status_var.set("正在等待Git推送完成，完成后将自动关闭…")
+            self.git_manager.wait_for_push(lambda success: self._shutdown())
+            return
+
         # 检查是否有未推送的修改
         if self.git_manager.has_unpushed_changes():
             if ask_yes_no("未推送的修改", "检测到有未推送到Git的修改，是否现在推送？"):
-                # 用户选择推送
-                success = self.git_manager.show_push_dialog()
-                if not success:
-                    # 推送失败，阻止关闭
-                    return
-            else:
-                # 用户选择不推送
-                self.root.destroy()
-        
-        # 没有未推送的修改或已成功推送，允许关闭
+                # 用户选择推送，推送成功后关闭；失败或取消则阻止关闭
+                self.git_manager.show_push_dialog(
+                    on_done=lambda success: self._shutdown() if success else None
+                )
+                return
+
+        # 没有未推送的修改或用户选择不推送，允许关闭
+        self._shutdown()
+
+    def _shutdown(self):
+        """停止时钟和文件监视，写回并关闭笔记存储，保存搜索索引，然后关闭窗口"""
+        if self._clock_after_id is not None:
+            self.root.after_cancel(self._clock_after_id)
+            self._clock_after_id = None
+        if self.watcher:
+            self.watcher.stop()
+        export_scheduler.flush_if_pending()
+        self.note_store.close()
+        self.search_index.save()
         self.root.destroy()
 
 
@@ -0,0 +1,154 @@
+"""笔记文件监视模块
+
+监视笔记根目录下 <科目>/<内容>.md 的新增、修改和删除，包括在应用外直接用编辑器做的修改。
+安装了 watchdog 时使用系统文件通知（Linux为inotify，Windows为ReadDirectoryChangesW），
+收到通知后才重新扫描；否则按固定间隔轮询 mtime 快照。
+检测到的变化按批次交给回调处理。watchdog 在启动监视时才导入。
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+from config import g_config
+
+# 收到第一个变化后等待的时间（秒），让编辑器的连续写入合并为一批
+CHANGE_SETTLE_SECONDS = 0.3
+
+NoteKey = Tuple[str, str]
+
+
+def configured_ignored_dirs() -> Set[str]:
+    """不属于笔记的顶层目录：配置的HTML输出目录与分片导出目录"""
+    return {g_config["html_dir"].name, g_config["export_shard_dir"].name}
+
+
+@dataclass
+class NoteChanges:
+    """一批笔记文件变化（值为文件的mtime，单位秒）"""
+    created: Dict[NoteKey, float] = field(default_factory=dict)
+    changed: Dict[NoteKey, float] = field(default_factory=dict)
+    deleted: Set[NoteKey] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.changed or self.deleted)
+
+
+def scan_notes(root_dir: Path, ignored_dirs: Optional[Set[str]] = None) -> Dict[NoteKey, int]:
+    """扫描笔记根目录，返回 (科目, 内容) -> mtime_ns 快照（ignored_dirs为None时按配置忽略目录）"""
+    if ignored_dirs is None:
+        ignored_dirs = configured_ignored_dirs()
+    snapshot = {}
+    try:
+        subject_entries = list(os.scandir(root_dir))
+    except OSError:
+        return snapshot
+    for subject_entry in subject_entries:
+        if not subject_entry.is_dir() or subject_entry.name in ignored_dirs or subject_entry.name.startswith('.'):
+            continue
+        try:
+            note_entries = list(os.scandir(subject_entry.path))
+        except OSError:
+            continue
+        for note_entry in note_entries:
+            if note_entry.name.endswith('.md') and note_entry.is_file():
+                try:
+                    mtime_ns = note_entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+                snapshot[(subject_entry.name, note_entry.name[:-3])] = mtime_ns
+    return snapshot
+
+
+def _load_observer():
+    """导入watchdog的Observer，未安装时返回None"""
+    try:
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+    return Observer
+
+
+class _WakeHandler:
+    """watchdog事件处理：只负责唤醒扫描线程"""
+    def __init__(self, wake: threading.Event):
+        self.wake = wake
+
+    def dispatch(self, event):
+        if not event.is_directory or event.event_type == "deleted":
+            self.wake.set()
+
+
+class NoteWatcher:
+    """笔记文件监视类"""
+    def __init__(self, root_dir: Path, on_changes: Callable[[NoteChanges], None],
+                 poll_interval: float = 1.0, ignored_dirs: Optional[Set[str]] = None):
+        self.root_dir = root_dir
+        self.on_changes = on_changes
+        self.poll_interval = poll_interval
+        self.ignored_dirs = configured_ignored_dirs() if ignored_dirs is None else ignored_dirs
+        self._snapshot: Dict[NoteKey, int] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    @property
+    def uses_notifications(self) -> bool:
+        """是否使用系统文件通知（否则为轮询）"""
+        return self._observer is not None
+
+    def start(self) -> None:
+        """记录初始快照并启动监视线程"""
+        self._snapshot = scan_notes(self.root_dir, self.ignored_dirs)
+        Observer = _load_observer()
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WakeHandler(self._wake), str(self.root_dir), recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception:
+                self._observer = None
+        self._thread = threading.Thread(target=self._loop, name="note-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止监视"""
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def rescan(self) -> NoteChanges:
+        """与上次快照比较，返回变化并更新快照"""
+        snapshot = scan_notes(self.root_dir, self.ignored_dirs)
+        changes = NoteChanges()
+        for key, mtime_ns in snapshot.items():
+            old_mtime_ns = self._snapshot.get(key)
+            if old_mtime_ns is None:
+                changes.created[key] = mtime_ns / 1e9
+            elif old_mtime_ns != mtime_ns:
+                changes.changed[key] = mtime_ns / 1e9
+        changes.deleted = set(self._snapshot) - set(snapshot)
+        self._snapshot = snapshot
+        return changes
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if self.uses_notifications:
+                self._wake.wait()
+            else:
+                self._wake.wait(self.poll_interval)
+            if self._stop.is_set():
+                break
+            if self._wake.is_set():
+                # 等待编辑器的连续写入结束
+                self._stop.wait(CHANGE_SETTLE_SECONDS)
+                self._wake.clear()
+            changes = self.rescan()
+            if changes:
+                self.on_changes(changes)
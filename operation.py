@@ -1,9 +1,20 @@
-from typing import Dict, List
+from typing import Dict, List, Set, Tuple
+import hashlib
+import json
 import time
+from pathlib import Path
 from math import floor
 from config import g_config
 from utils import *
-
+from note_store import get_note_store
+from search_index import get_search_index
+from export_scheduler import ExportScheduler
+from note_watcher import NoteChanges
+from tracing import traced
+from pending_changes import record_changes
+from note_table import iter_note_fields
+
+@traced()
 def create_file_operation(subject: str, content: str) -> tuple[bool, str]:
     """创建笔记文件"""
     # 验证输入
@@ -27,20 +38,18 @@ def create_file_operation(subject: str, content: str) -> tuple[bool, str]:
         # 创建md文件
         with open(file_path, 'w', encoding='utf-8') as file:
             file.write(f"## {content}\n")
+        record_changes([file_path])
 
         # 更新data.json
-        notes = get_note_list(g_config["data_file"])
-        notes.append({
-            "content": content,
-            "subject": subject,
-            "timestamp": floor(time.time())
-        })
-        update_note_list(g_config["data_file"], notes)
-
-        # 使用封装的函数打开文件
-        success, msg = open_file_with_editor(file_path, wait=True)
+        get_note_store().add_note(subject, content, floor(time.time()))
+
+        # 使用封装的函数打开文件（启用文件监视时不等待编辑器关闭，后续修改由监视器处理）
+        success, msg = open_file_with_editor(file_path, wait=not g_config["watcher_enabled"])
         if not success:
             return False, msg
+
+        # 更新全文搜索索引
+        get_search_index().update_note(subject, content)
         
         # 重新导出文件
         after_modify_operation(False)
@@ -50,6 +59,7 @@ def create_file_operation(subject: str, content: str) -> tuple[bool, str]:
         return False, f"创建失败：{error}"
 
 
+@traced()
 def write_notelist_operation(notes: List[Dict], file_path: Path, title: str = "") -> None:
     """将笔记列表写入文件"""
     with open(file_path, "w", encoding="utf-8") as file:
@@ -59,13 +69,147 @@ def write_notelist_operation(notes: List[Dict], file_path: Path, title: str = ""
             file.write(f"## {title}\n")
 
         last_subject = ""
-        for note in notes:
-            content, subject = note['content'], note['subject']
+        for subject, content, _ in iter_note_fields(notes):
             if last_subject != subject:
                 file.write(f"### [{subject}]({subject})\n")
                 last_subject = subject
             file.write(f"- [{content}]({subject}/{content}.md)\n")
 
+
+# ==================== 分片导出 ====================
+
+# 分片目录中记录本导出器写入的分片文件名，清理时只删除其中列出的文件
+SHARD_MANIFEST_NAME = ".shards.json"
+
+# 已写入的导出页面：路径 -> (mtime_ns, 内容摘要)，mtime未变时不必重新读取比较
+_export_page_digests: Dict[Path, Tuple[int, str]] = {}
+
+
+def _write_page_if_changed(file_path: Path, text: str) -> bool:
+    """内容与磁盘上的不同时才写入，返回是否写入"""
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    try:
+        mtime_ns = file_path.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    if mtime_ns is not None:
+        cached = _export_page_digests.get(file_path)
+        if cached is None or cached[0] != mtime_ns:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+                cached = (mtime_ns, hashlib.sha1(file.read().encode("utf-8")).hexdigest())
+            _export_page_digests[file_path] = cached
+        if cached[1] == digest:
+            return False
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    _export_page_digests[file_path] = (file_path.stat().st_mtime_ns, digest)
+    return True
+
+
+def _remove_export_page(file_path: Path) -> None:
+    file_path.unlink()
+    _export_page_digests.pop(file_path, None)
+
+
+def _load_shard_manifest(shard_dir: Path) -> Set[str]:
+    """上次分片导出写入的分片文件名（清单不存在或损坏时为空）"""
+    try:
+        with open(shard_dir / SHARD_MANIFEST_NAME, "r", encoding="utf-8") as file:
+            return set(json.load(file).get("shards", []))
+    except (OSError, ValueError, AttributeError):
+        return set()
+
+
+def export_index_page_path(page: int) -> Path:
+    """索引第page页的路径：第1页为allExport.md，其余为allExport-<页码>.md"""
+    all_export_file = g_config["all_export_file"]
+    if page == 1:
+        return all_export_file
+    return all_export_file.with_name(f"{all_export_file.stem}-{page}{all_export_file.suffix}")
+
+
+@traced()
+def write_sharded_notelist_operation(notes: List[Dict]) -> List[Path]:
+    """分片导出全部笔记：每个科目一个 allExport/<科目>.md，外加分页的科目索引
+
+    只写入内容有变化的分片和索引页，并删除已没有笔记的科目分片与多余的索引页。
+    分片目录中的 .shards.json 记录写入过的分片，清理时只删除其中列出的文件。
+
+    Returns:
+        写入或删除的文件路径列表
+
+    Raises:
+        ValueError: 分片目录与某个科目目录相同
+    """
+    root_dir = g_config["root_dir"]
+    shard_dir = g_config["export_shard_dir"]
+    page_size = max(1, g_config["export_index_page_size"])
+    shard_rel = shard_dir.relative_to(root_dir).as_posix()
+    # 分片到根目录的相对前缀
+    up = "../" * len(shard_dir.relative_to(root_dir).parts)
+
+    by_subject: Dict[str, List[str]] = {}
+    for subject, content, _ in iter_note_fields(notes):
+        by_subject.setdefault(subject, []).append(content)
+    subjects = list(by_subject)
+    if shard_dir.parent == root_dir and shard_dir.name in by_subject:
+        raise ValueError(f"分片导出目录 {shard_dir} 与科目目录同名，请修改 config.ini 中 [Export] 的 shard_dir")
+    page_count = max(1, (len(subjects) + page_size - 1) // page_size)
+    changed_paths = []
+
+    # 科目分片
+    for index, subject in enumerate(subjects):
+        contents = by_subject[subject]
+        index_page = export_index_page_path(index // page_size + 1).name
+        lines = [f"## {subject}（{len(contents)} 条）", "", f"[返回索引]({up}{index_page})", ""]
+        lines.extend(f"- [{content}]({up}{subject}/{content}.md)" for content in contents)
+        shard_path = shard_dir / f"{subject}.md"
+        if _write_page_if_changed(shard_path, "\n".join(lines) + "\n"):
+            changed_paths.append(shard_path)
+
+    # 分页索引
+    for page in range(1, page_count + 1):
+        page_subjects = subjects[(page - 1) * page_size:page * page_size]
+        # 不写总条数，增删笔记时只需重写该科目所在的一页
+        lines = [f"## 全部（第 {page}/{page_count} 页）", ""]
+        lines.extend(f"- [{subject}]({shard_rel}/{subject}.md)（{len(by_subject[subject])} 条）"
+                     for subject in page_subjects)
+        nav = []
+        if page > 1:
+            nav.append(f"[上一页]({export_index_page_path(page - 1).name})")
+        if page < page_count:
+            nav.append(f"[下一页]({export_index_page_path(page + 1).name})")
+        if nav:
+            lines.extend(["", " | ".join(nav)])
+        page_path = export_index_page_path(page)
+        if _write_page_if_changed(page_path, "\n".join(lines) + "\n"):
+            changed_paths.append(page_path)
+
+    # 删除已没有笔记的科目分片（只删除清单中记录的、由本导出器写入的文件）
+    current = {f"{subject}.md" for subject in subjects}
+    for name in sorted(_load_shard_manifest(shard_dir) - current):
+        shard_path = shard_dir / name
+        if shard_path.parent == shard_dir and shard_path.suffix == ".md" and shard_path.exists():
+            _remove_export_page(shard_path)
+            changed_paths.append(shard_path)
+    manifest_path = shard_dir / SHARD_MANIFEST_NAME
+    manifest_text = json.dumps({"shards": sorted(current)}, ensure_ascii=False, indent=1) + "\n"
+    if _write_page_if_changed(manifest_path, manifest_text):
+        changed_paths.append(manifest_path)
+
+    # 删除多余的索引页
+    all_export_file = g_config["all_export_file"]
+    for page_path in all_export_file.parent.glob(f"{all_export_file.stem}-*{all_export_file.suffix}"):
+        suffix = page_path.stem[len(all_export_file.stem) + 1:]
+        if suffix.isdigit() and int(suffix) > page_count:
+            _remove_export_page(page_path)
+            changed_paths.append(page_path)
+    return changed_paths
+
+
+@traced()
 def modify_note_operation(subject: str, content: str) -> tuple[bool, str]:
     """修改笔记"""
     file_path = build_note_path(g_config['root_dir'], subject, content)
@@ -74,6 +218,13 @@ def modify_note_operation(subject: str, content: str) -> tuple[bool, str]:
     if not file_path.exists():
         return False, "笔记文件不存在"
 
+    # 启用文件监视时只打开编辑器，保存后由监视器更新时间戳和导出文件
+    if g_config["watcher_enabled"]:
+        success, msg = open_file_with_editor(file_path, wait=False)
+        if not success:
+            return False, msg
+        return True, "已在编辑器中打开，保存后将自动更新时间戳！"
+
     try:
         # 记录原始修改时间
         original_mtime = file_path.stat().st_mtime
@@ -87,22 +238,15 @@ def modify_note_operation(subject: str, content: str) -> tuple[bool, str]:
         new_mtime = file_path.stat().st_mtime
         if new_mtime == original_mtime:
             return False, "文件未修改，操作取消"
+        record_changes([file_path])
 
-        # 更新JSON时间戳
-        notes = get_note_list(g_config["data_file"])
-        found = False
-        for note in notes:
-            if note.get('subject') == subject and note.get('content') == content:
-                note['timestamp'] = floor(time.time())
-                found = True
-                break
+        # 更新全文搜索索引
+        get_search_index().update_note(subject, content)
 
-        if not found:
+        # 更新JSON时间戳（同时写回data.json）
+        if not get_note_store().touch_note(subject, content, floor(time.time())):
             return True, "笔记修改成功，但未在data.json中找到对应条目！"
 
-        # 保存更新后的笔记列表
-        update_note_list(g_config["data_file"], notes)
-
         # 重新导出文件
         after_modify_operation(False)
         return True, "笔记修改成功，时间戳已更新！"
@@ -110,6 +254,7 @@ def modify_note_operation(subject: str, content: str) -> tuple[bool, str]:
     except Exception as e:
         return False, f"修改失败：{str(e)}"
 
+@traced()
 def delete_note_operation(subject: str, content: str) -> tuple[bool, str]:
     """删除笔记"""
     # 拼接笔记文件完整路径
@@ -122,26 +267,16 @@ def delete_note_operation(subject: str, content: str) -> tuple[bool, str]:
     try:
         # 删除笔记和空目录
         file_path.unlink()
+        record_changes([file_path])
         subject_dir = g_config['root_dir'] / subject
         if subject_dir.exists() and len(list(subject_dir.iterdir())) == 0:
             subject_dir.rmdir()
+        get_search_index().remove_note(subject, content)
 
-        # 更新data.json
-        notes = get_note_list(g_config["data_file"])
-        original_count = len(notes)
-        
-        updated_data = [
-            note for note in notes
-            if not (note['subject'] == subject and note['content'] == content)
-        ]
-
-        # 判断是否成功移除数据
-        if len(updated_data) >= original_count:
+        # 更新data.json，判断是否成功移除数据
+        if not get_note_store().remove_note(subject, content):
             return True, "笔记文件已删除，但未在data.json中找到对应条目！"
 
-        # 保存更新后的笔记列表
-        update_note_list(g_config["data_file"], updated_data)
-
         # 执行修改后导出操作
         after_modify_operation(False)
         return True, "笔记删除成功！"
@@ -149,15 +284,157 @@ def delete_note_operation(subject: str, content: str) -> tuple[bool, str]:
     except Exception as e:
         return False, f"删除笔记失败：{str(e)}"
 
-def after_modify_operation(specialized_export: bool) -> None:
-    """更新导出文件"""
+@traced()
+def apply_note_changes_operation(changes: NoteChanges) -> bool:
+    """将文件监视器检测到的一批变化写入data.json，并合并为一次导出
+
+    新增的笔记文件加入列表；文件mtime晚于记录的时间戳时更新时间戳
+    （应用自身写入的文件mtime不晚于记录，不会被重复更新）；删除的文件从列表移除。
+
+    Returns:
+        是否有笔记数据发生变化
+    """
+    store = get_note_store()
+    search_index = get_search_index()
+    modified = False
+    record_changes(build_note_path(g_config['root_dir'], subject, content)
+                   for subject, content in (*changes.created, *changes.changed, *changes.deleted))
+
+    with store.batch():
+        for (subject, content), mtime in {**changes.created, **changes.changed}.items():
+            search_index.update_note(subject, content)
+            note = store.find_note(subject, content)
+            if note is None:
+                store.add_note(subject, content, floor(mtime))
+                modified = True
+            elif floor(mtime) > note['timestamp']:
+                store.touch_note(subject, content, floor(mtime))
+                modified = True
+        for subject, content in changes.deleted:
+            search_index.remove_note(subject, content)
+            if store.remove_note(subject, content):
+                modified = True
+
+    if modified:
+        after_modify_operation(False)
+    return modified
+
+
+def _format_batch_result(action: str, done_count: int, failures: List[Tuple[str, str, str]]) -> str:
+    """生成批量操作的结果报告"""
+    msg = f"成功{action} {done_count} 条笔记"
+    if failures:
+        msg += f"，{len(failures)} 条失败：\n" + "\n".join(
+            f"- {subject}/{content}：{reason}" for subject, content, reason in failures
+        )
+    return msg
+
+
+@traced()
+def batch_delete_notes_operation(notes: List[Tuple[str, str]]) -> tuple[bool, str]:
+    """批量删除笔记：逐个删除文件，data.json和导出文件只各写一次"""
+    if not notes:
+        return False, "未选中任何笔记！"
+
+    store = get_note_store()
+    search_index = get_search_index()
+    failures = []
+    done_count = 0
+    subject_dirs = set()
+
+    with store.batch():
+        for subject, content in notes:
+            file_path = build_note_path(g_config['root_dir'], subject, content)
+            if not file_path.exists():
+                failures.append((subject, content, "笔记文件不存在"))
+                continue
+            try:
+                file_path.unlink()
+            except OSError as e:
+                failures.append((subject, content, f"删除失败：{e}"))
+                continue
+            record_changes([file_path])
+            subject_dirs.add(file_path.parent)
+            search_index.remove_note(subject, content)
+            if not store.remove_note(subject, content):
+                failures.append((subject, content, "笔记文件已删除，但未在data.json中找到对应条目"))
+                continue
+            done_count += 1
+
+    # 删除变空的科目目录
+    for subject_dir in subject_dirs:
+        if subject_dir.exists() and not any(subject_dir.iterdir()):
+            subject_dir.rmdir()
+
+    # 所有笔记处理完后只导出一次
+    if done_count:
+        after_modify_operation(False)
+    return done_count > 0, _format_batch_result("删除", done_count, failures)
+
+
+@traced()
+def batch_touch_notes_operation(notes: List[Tuple[str, str]]) -> tuple[bool, str]:
+    """批量标记笔记为已复习（更新时间戳），data.json和导出文件只各写一次"""
+    if not notes:
+        return False, "未选中任何笔记！"
+
+    store = get_note_store()
+    timestamp = floor(time.time())
+    failures = []
+    done_count = 0
+
+    with store.batch():
+        for subject, content in notes:
+            file_path = build_note_path(g_config['root_dir'], subject, content)
+            if not file_path.exists():
+                failures.append((subject, content, "笔记文件不存在"))
+                continue
+            if not store.touch_note(subject, content, timestamp):
+                failures.append((subject, content, "未在data.json中找到对应条目"))
+                continue
+            done_count += 1
+
+    if done_count:
+        after_modify_operation(False)
+    return done_count > 0, _format_batch_result("标记", done_count, failures)
+
+@traced()
+def export_notelists_operation() -> None:
+    """重新生成export.md和allExport.md（分片导出时为各科目分片及分页索引）"""
     target_days=g_config['target_days']
-    all_notes = get_note_list(g_config["data_file"])
+    store = get_note_store()
+    all_notes = store.get_note_list()
     current_time = time.time()
-    filtered_notes = filter_notes(all_notes, current_time, target_days)
+    filtered_notes = store.due_notes(current_time, target_days)
 
     write_notelist_operation(filtered_notes, g_config["export_file"])
-    write_notelist_operation(all_notes, g_config["all_export_file"], "全部")
+    if g_config["sharded_export"]:
+        changed_paths = write_sharded_notelist_operation(all_notes)
+    else:
+        write_notelist_operation(all_notes, g_config["all_export_file"], "全部")
+        changed_paths = [g_config["all_export_file"]]
+    record_changes([g_config["export_file"], *changed_paths])
+
+
+# 进程内共享的导出调度器：短时间内的多次修改只导出一次
+export_scheduler = ExportScheduler(export_notelists_operation)
+
+
+def flush_export_operation() -> None:
+    """立即同步导出（取消计划中的导出），保证导出文件是最新的"""
+    export_scheduler.flush()
+
+
+@traced()
+def after_modify_operation(specialized_export: bool) -> None:
+    """更新导出文件
 
+    Args:
+        specialized_export: 为True时立即同步导出并打开export.md；
+            否则只提交导出请求，由调度器合并后在后台执行
+    """
     if specialized_export:
+        flush_export_operation()
         open_file_with_editor(g_config["export_file"], wait=True)
+    else:
+        export_scheduler.request()
@@ -0,0 +1,181 @@
+"""待推送修改记录模块
+
+记录自上次成功推送以来被修改过的路径（相对于笔记根目录），保存在 .cache/pending_push.json。
+笔记操作、导出、HTML构建和数据存储在写入文件时登记路径，
+关闭窗口时据此直接判断是否有未推送的修改，不必运行 git status。
+
+每个路径带有修改序号：推送前取快照，推送成功后只移除序号未变的路径，
+推送过程中再次修改的路径会保留到下一次推送。
+记录文件不存在或无法读取时状态为"未知"，由调用方回退到Git检查。
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from config import g_config
+
+# 记录格式变化时递增，使旧记录失效
+PENDING_RECORD_VERSION = 1
+
+
+class PendingChanges:
+    """待推送修改记录类"""
+    def __init__(self, record_file: Path, root_dir: Path):
+        self.record_file = record_file
+        self.root_dir = root_dir
+        self._loaded = False
+        # 记录是否可信（记录文件存在且完整，或已与Git状态核对过）
+        self._known = False
+        # 相对路径 -> 修改序号
+        self._paths: Dict[str, int] = {}
+        self._seq = 0
+        # 是否有已提交但未推送的提交
+        self._unpushed_commits = False
+        self._lock = threading.RLock()
+
+    # ==================== 加载与保存 ====================
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def load(self) -> None:
+        """从磁盘加载记录，不存在或版本不符时状态为未知"""
+        with self._lock:
+            self._paths = {}
+            self._known = False
+            self._unpushed_commits = False
+            try:
+                with open(self.record_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == PENDING_RECORD_VERSION:
+                    self._paths = {path: 0 for path in data.get("paths", [])}
+                    self._unpushed_commits = bool(data.get("unpushed_commits"))
+                    self._known = True
+            except (OSError, ValueError):
+                pass
+            self._loaded = True
+
+    def save(self) -> None:
+        """原子写入记录文件（状态未知时不写入，避免把不完整的记录当作可信）"""
+        with self._lock:
+            if not self._known:
+                return
+            data = {
+                "version": PENDING_RECORD_VERSION,
+                "paths": sorted(self._paths),
+                "unpushed_commits": self._unpushed_commits
+            }
+            try:
+                self.record_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.record_file.with_name(self.record_file.name + ".tmp")
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_file, self.record_file)
+            except OSError:
+                pass
+
+    # ==================== 登记与查询 ====================
+
+    def _relative(self, path: Path) -> Optional[str]:
+        try:
+            return Path(path).relative_to(self.root_dir).as_posix()
+        except ValueError:
+            return None
+
+    def record(self, paths: Iterable[Path]) -> None:
+        """登记被修改（新增、修改或删除）的路径，根目录以外的路径忽略"""
+        self._ensure_loaded()
+        with self._lock:
+            added = False
+            for path in paths:
+                relative = self._relative(path)
+                if relative is None:
+                    continue
+                self._seq += 1
+                if relative not in self._paths:
+                    added = True
+                self._paths[relative] = self._seq
+            # 只有新增路径时才需要写盘（序号只用于本进程内的推送快照）
+            if added:
+                self.save()
+
+    def has_changes(self) -> Optional[bool]:
+        """是否有未推送的修改；记录不可信时返回None"""
+        self._ensure_loaded()
+        with self._lock:
+            if not self._known:
+                return None
+            return bool(self._paths) or self._unpushed_commits
+
+    def paths(self) -> List[str]:
+        """已登记的相对路径（已排序）"""
+        self._ensure_loaded()
+        with self._lock:
+            return sorted(self._paths)
+
+    def snapshot(self) -> Dict[str, int]:
+        """当前记录的快照，用于推送成功后只清除快照中未再修改的路径"""
+        self._ensure_loaded()
+        with self._lock:
+            return dict(self._paths)
+
+    # ==================== 推送与核对 ====================
+
+    def mark_pushed(self, snapshot: Dict[str, int]) -> None:
+        """推送成功：移除快照中此后未再修改的路径"""
+        self._ensure_loaded()
+        with self._lock:
+            for path, seq in snapshot.items():
+                if self._paths.get(path) == seq:
+                    del self._paths[path]
+            self._unpushed_commits = False
+            self._known = True
+            self.save()
+
+    def apply_git_state(self, snapshot: Dict[str, int], git_paths: Iterable[str], unpushed_commits: bool) -> None:
+        """用Git检查的结果核对记录
+
+        Args:
+            snapshot: 运行Git检查前取的快照
+            git_paths: git status 报告的相对路径
+            unpushed_commits: 是否有未推送的提交
+        """
+        self._ensure_loaded()
+        with self._lock:
+            git_paths = set(git_paths)
+            # Git报告工作区干净的路径：检查期间未再修改的从记录中移除
+            for path, seq in snapshot.items():
+                if path not in git_paths and self._paths.get(path) == seq:
+                    del self._paths[path]
+            for path in git_paths:
+                if path not in self._paths:
+                    self._seq += 1
+                    self._paths[path] = self._seq
+            self._unpushed_commits = unpushed_commits
+            self._known = True
+            self.save()
+
+
+# 进程内共享的记录实例（按记录文件区分）
+_records: Dict[Path, PendingChanges] = {}
+_records_lock = threading.Lock()
+
+
+def get_pending_changes() -> PendingChanges:
+    """获取当前配置对应的待推送修改记录"""
+    record_file = g_config["pending_push_file"]
+    with _records_lock:
+        record = _records.get(record_file)
+        if record is None:
+            record = _records[record_file] = PendingChanges(record_file, g_config["root_dir"])
+        return record
+
+
+def record_changes(paths: Iterable[Path]) -> None:
+    """登记被修改的路径（便捷函数）"""
+    get_pending_changes().record(paths)
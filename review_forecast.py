@@ -0,0 +1,108 @@
+"""复习负荷预测模块
+
+计算从某天起未来N天每天需要复习的笔记数。第d天的复习数等于
+Σ 第(d - 间隔)天创建/更新的笔记数（间隔取 target_days），
+即按天统计的笔记数直方图与复习间隔的卷积，一次计算出所有天的结果，
+不必每天调用一次 filter_notes。
+安装了 numpy 时向量化计算，否则使用纯Python实现（结果一致）。numpy 在首次预测时才导入。
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+from review_index import day_number
+from note_table import iter_note_fields
+
+# 默认预测天数
+DEFAULT_FORECAST_DAYS = 30
+
+_numpy = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    """导入numpy，未安装时返回None"""
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+        _numpy_checked = True
+    return _numpy
+
+
+def numpy_available() -> bool:
+    return _load_numpy() is not None
+
+
+def note_days(notes: Iterable[Dict]) -> List[int]:
+    """笔记列表 -> 每条笔记时间戳的天数编号"""
+    return [day_number(timestamp) for _, _, timestamp in iter_note_fields(notes)]
+
+
+def forecast_due_counts(days: Sequence[int], start_day: int, forecast_days: int, target_days: List[int],
+                        weights: Optional[Sequence[int]] = None, use_numpy: bool = None) -> List[int]:
+    """计算从start_day起forecast_days天内每天需要复习的笔记数
+
+    Args:
+        days: 天数编号序列（每条笔记一个；或配合weights为去重后的天数编号）
+        start_day: 第一天的天数编号（timestamp // 86400）
+        forecast_days: 预测天数
+        target_days: 复习间隔（天）
+        weights: 每个天数编号对应的笔记数，None表示每项为1
+        use_numpy: 是否使用numpy，None表示已安装时使用
+
+    Returns:
+        长度为forecast_days的列表，第i项为第start_day+i天需要复习的笔记数
+    """
+    offsets = sorted(set(offset for offset in target_days if offset >= 0))
+    if forecast_days <= 0:
+        return []
+    if not offsets or not len(days):
+        return [0] * forecast_days
+
+    np = _load_numpy() if use_numpy is not False else None
+    if np is not None:
+        return _forecast_numpy(np, days, start_day, forecast_days, offsets, weights)
+    return _forecast_python(days, start_day, forecast_days, offsets, weights)
+
+
+def _forecast_numpy(np, days, start_day: int, forecast_days: int, offsets: List[int], weights) -> List[int]:
+    # 只有 [start_day - 最大间隔, 最后一天] 范围内的天数会影响结果
+    low = start_day - offsets[-1]
+    size = start_day + forecast_days - low
+    day_array = np.asarray(days, dtype=np.int64) - low
+    mask = (day_array >= 0) & (day_array < size)
+    weight_array = None if weights is None else np.asarray(weights, dtype=np.int64)[mask]
+    histogram = np.bincount(day_array[mask], weights=weight_array, minlength=size)
+
+    kernel = np.zeros(offsets[-1] + 1, dtype=histogram.dtype)
+    kernel[offsets] = 1
+    # convolved[n] = Σ histogram[n - 间隔]
+    convolved = np.convolve(histogram, kernel)
+    first = start_day - low
+    return convolved[first:first + forecast_days].astype(np.int64).tolist()
+
+
+def _forecast_python(days, start_day: int, forecast_days: int, offsets: List[int], weights) -> List[int]:
+    low = start_day - offsets[-1]
+    high = start_day + forecast_days
+    histogram: Dict[int, int] = {}
+    if weights is None:
+        for day in days:
+            if low <= day < high:
+                histogram[day] = histogram.get(day, 0) + 1
+    else:
+        for day, weight in zip(days, weights):
+            if low <= day < high:
+                histogram[day] = histogram.get(day, 0) + weight
+    return [
+        sum(histogram.get(day - offset, 0) for offset in offsets)
+        for day in range(start_day, high)
+    ]
+
+
+def forecast_store(store, start_day: int, forecast_days: int, target_days: List[int]) -> List[int]:
+    """根据笔记存储按天统计的笔记数预测复习负荷"""
+    counts = store.day_counts()
+    return forecast_due_counts(list(counts), start_day, forecast_days, target_days, weights=list(counts.values()))
@@ -0,0 +1,92 @@
+"""复习索引模块
+
+按笔记时间戳所在的天数编号（timestamp // 86400）把笔记表的行号分桶，
+"第D天需复习" 只需查询 len(target_days) 个桶，无需遍历全部笔记。
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Set
+
+if TYPE_CHECKING:
+    from note_table import NoteTable, NoteView
+
+SECONDS_PER_DAY = 86400
+
+
+def day_number(timestamp: float) -> int:
+    """时间戳所在的天数编号（与 days_difference 的计算方式一致）"""
+    return int(timestamp // SECONDS_PER_DAY)
+
+
+class ReviewIndex:
+    """复习索引类：天数编号 -> 当天创建/更新的笔记行号
+
+    行的天数编号直接从笔记表的时间戳列计算，修改时间戳前由调用方先调用 move/remove。
+    """
+    def __init__(self, table: "NoteTable"):
+        self._table = table
+        self._buckets: Dict[int, Set[int]] = {}
+        self._count = 0
+        self.rebuild(table)
+
+    def rebuild(self, table: "NoteTable" = None) -> None:
+        """按笔记表重建索引（表压缩、行号变化后需要重建）"""
+        if table is not None:
+            self._table = table
+        self._buckets.clear()
+        self._count = 0
+        for row in self._table.live_rows():
+            self.add(row)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, row: int) -> None:
+        """加入一行"""
+        self._buckets.setdefault(day_number(self._table.timestamps[row]), set()).add(row)
+        self._count += 1
+
+    def move(self, row: int, old_timestamp: int) -> None:
+        """行的时间戳已改变：从原来的桶移到新的桶"""
+        old_day = day_number(old_timestamp)
+        day = day_number(self._table.timestamps[row])
+        if day != old_day:
+            self._discard_from_bucket(old_day, row)
+            self._buckets.setdefault(day, set()).add(row)
+
+    def remove(self, row: int) -> None:
+        """移除一行（在笔记表删除该行之前调用）"""
+        if self._discard_from_bucket(day_number(self._table.timestamps[row]), row):
+            self._count -= 1
+
+    def _discard_from_bucket(self, day: int, row: int) -> bool:
+        bucket = self._buckets.get(day)
+        if bucket is None or row not in bucket:
+            return False
+        bucket.discard(row)
+        if not bucket:
+            del self._buckets[day]
+        return True
+
+    def day_counts(self) -> Dict[int, int]:
+        """每天创建/更新的笔记数（天数编号 -> 笔记数）"""
+        return {day: len(bucket) for day, bucket in self._buckets.items()}
+
+    def due_rows(self, day: int, target_days: List[int]) -> array:
+        """第day天需要复习的行号，按科目排序（同科目保持加入顺序）"""
+        rows = []
+        for offset in set(target_days):
+            bucket = self._buckets.get(day - offset)
+            if bucket:
+                rows.extend(bucket)
+        subject_names, subject_col = self._table.subject_names, self._table.subject_col
+        rows.sort(key=lambda row: (subject_names[subject_col[row]], row))
+        return array('q', rows)
+
+    def due_on(self, day: int, target_days: List[int]) -> "NoteView":
+        """第day天需要复习的笔记"""
+        return self._table.view(self.due_rows(day, target_days))
+
+    def due_at(self, target_timestamp: float, target_days: List[int]) -> "NoteView":
+        """目标时间戳当天需要复习的笔记（与 filter_notes 结果一致）"""
+        return self.due_on(day_number(target_timestamp), target_days)
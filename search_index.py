@@ -0,0 +1,265 @@
+"""全文搜索模块
+
+基于倒排索引的笔记全文搜索。中文（CJK）按相邻两字切分为二元词，
+英文和数字按单词切分。索引保存在磁盘上，按文件的 mtime/大小 增量更新，
+查询时只访问内存中的倒排表，不再重新扫描笔记文件。
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import g_config
+from html_render import read_md_content
+from note_table import iter_note_fields
+
+# CJK字符（中日韩统一表意文字及扩展A、兼容表意文字）
+CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+# 文本切分：CJK连续片段或英文单词
+TOKEN_RUN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+")
+
+# 索引格式变化时递增，使旧索引失效并重建
+SEARCH_INDEX_VERSION = 1
+# 摘要在命中位置前后保留的字符数
+SNIPPET_RADIUS = 30
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 标题命中的额外权重
+TITLE_BOOST = 2.0
+
+
+def tokenize(text: str) -> List[str]:
+    """切分文本：CJK片段取相邻二元词（单字片段保留单字），英文数字取整词"""
+    tokens = []
+    for run in TOKEN_RUN_PATTERN.findall(text.lower()):
+        if CJK_PATTERN.fullmatch(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+@dataclass
+class SearchResult:
+    """搜索结果"""
+    subject: str
+    content: str
+    score: float
+    snippet: str
+
+
+def _doc_key(subject: str, content: str) -> str:
+    return f"{subject}/{content}"
+
+
+class SearchIndex:
+    """笔记全文搜索索引类"""
+    def __init__(self, index_file: Path, root_dir: Path):
+        self.index_file = index_file
+        self.root_dir = root_dir
+        self.dirty = False
+        self._loaded = False
+        # 文档信息：key -> {"subject", "content", "mtime_ns", "size", "text", "terms": {term: tf}, "length"}
+        self._docs: Dict[str, Dict] = {}
+        # 倒排表：term -> {key: tf}（加载时由文档信息重建，不单独保存）
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    # ==================== 加载与保存 ====================
+
+    def _ensure_loaded(self) -> None:
+        """首次访问时加载索引"""
+        if not self._loaded:
+            # 启动时的后台同步与主线程搜索可能同时首次访问，加锁后再次检查
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def load(self) -> None:
+        """从磁盘加载索引，不存在或版本不符时从空索引开始"""
+        with self._lock:
+            docs = {}
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == SEARCH_INDEX_VERSION:
+                    docs = data.get("docs", {})
+            except (OSError, ValueError):
+                pass
+            self._docs = {}
+            self._postings = {}
+            self._total_length = 0
+            for key, doc in docs.items():
+                self._add_doc(key, doc)
+            self._loaded = True
+            self.dirty = False
+
+    def save(self) -> None:
+        """有修改时原子写入索引文件"""
+        with self._lock:
+            if not self.dirty:
+                return
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"version": SEARCH_INDEX_VERSION, "docs": self._docs}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+            self.dirty = False
+
+    # ==================== 增量更新 ====================
+
+    def _add_doc(self, key: str, doc: Dict) -> None:
+        self._docs[key] = doc
+        self._total_length += doc["length"]
+        for term, tf in doc["terms"].items():
+            self._postings.setdefault(term, {})[key] = tf
+
+    def _remove_doc(self, key: str) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[term]
+
+    def update_note(self, subject: str, content: str, force: bool = False) -> bool:
+        """笔记文件新增或修改后更新索引（mtime和大小未变时跳过），返回是否重新索引"""
+        self._ensure_loaded()
+        file_path = self.root_dir / subject / f"{content}.md"
+        key = _doc_key(subject, content)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            self.remove_note(subject, content)
+            return False
+
+        with self._lock:
+            doc = self._docs.get(key)
+            if (not force and doc and doc["mtime_ns"] == stat.st_mtime_ns
+                    and doc["size"] == stat.st_size):
+                return False
+
+            text, _ = read_md_content(file_path)
+            terms = Counter(tokenize(text))
+            for term in set(tokenize(content)):
+                terms[term] += 1
+            self._remove_doc(key)
+            self._add_doc(key, {
+                "subject": subject,
+                "content": content,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "text": text,
+                "terms": dict(terms),
+                "length": sum(terms.values())
+            })
+            self.dirty = True
+            return True
+
+    def remove_note(self, subject: str, content: str) -> None:
+        """笔记删除后从索引移除"""
+        self._ensure_loaded()
+        with self._lock:
+            key = _doc_key(subject, content)
+            if key in self._docs:
+                self._remove_doc(key)
+                self.dirty = True
+
+    def refresh(self, notes: List[Dict]) -> int:
+        """按笔记列表同步索引：只重新读取 mtime/大小 变化的文件，移除已不存在的笔记
+
+        逐条笔记在 update_note 中加锁，后台同步期间主线程的搜索只需等待单个文件的读取；
+        只有移除过期笔记和写入索引文件时持锁。
+
+        Returns:
+            重新索引的笔记数
+        """
+        self._ensure_loaded()
+        keys = set()
+        updated = 0
+        for subject, content, _ in iter_note_fields(notes):
+            keys.add(_doc_key(subject, content))
+            if self.update_note(subject, content):
+                updated += 1
+        with self._lock:
+            for key in [key for key in self._docs if key not in keys]:
+                self._remove_doc(key)
+                self.dirty = True
+            self.save()
+        return updated
+
+    # ==================== 查询 ====================
+
+    def search(self, query: str, limit: int = 50) -> List[SearchResult]:
+        """按BM25对命中任一查询词的笔记排序，返回带摘要的结果"""
+        self._ensure_loaded()
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1
+
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for key, tf in posting.items():
+                    length = self._docs[key]["length"]
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            results = []
+            lowered_query = query.strip().lower()
+            for key, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit * 2]:
+                doc = self._docs[key]
+                if lowered_query and lowered_query in doc["content"].lower():
+                    score *= TITLE_BOOST
+                results.append(SearchResult(doc["subject"], doc["content"], score,
+                                            self._snippet(doc["text"], lowered_query, query_terms)))
+        results.sort(key=lambda result: result.score, reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _snippet(text: str, lowered_query: str, query_terms: List[str]) -> str:
+        """截取第一个命中位置前后的文本作为摘要"""
+        lowered = text.lower()
+        position = lowered.find(lowered_query) if lowered_query else -1
+        if position < 0:
+            positions = [p for p in (lowered.find(term) for term in query_terms) if p >= 0]
+            position = min(positions) if positions else 0
+        start = max(0, position - SNIPPET_RADIUS)
+        end = min(len(text), position + SNIPPET_RADIUS + len(lowered_query))
+        snippet = " ".join(text[start:end].split())
+        return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+# 进程内共享的搜索索引
+_search_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> SearchIndex:
+    """获取进程内共享的搜索索引实例"""
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex(g_config["search_index_file"], g_config["root_dir"])
+    return _search_index
@@ -0,0 +1,311 @@
+"""SQLite笔记存储模块
+
+与 NoteStore 接口一致的SQLite存储后端（config.ini 中 [Storage] backend = sqlite 启用）。
+排序列表、按科目筛选和"今日需复习"查询都在SQL中完成，无需把全部笔记载入Python。
+
+一次性迁移：
+    python sqlite_store.py import   # data.json（含修改日志）-> SQLite
+    python sqlite_store.py export   # SQLite -> data.json
+"""
+
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from error_handler import show_error
+from pending_changes import record_changes
+
+SECONDS_PER_DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notes_subject_content ON notes(subject, content);
+CREATE INDEX IF NOT EXISTS idx_notes_timestamp ON notes(timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row_to_note(row: sqlite3.Row) -> Dict:
+    return {"content": row["content"], "subject": row["subject"], "timestamp": row["timestamp"]}
+
+
+class SqliteNoteStore:
+    """SQLite笔记存储类（接口与 NoteStore 一致）"""
+    def __init__(self, db_file: Path):
+        self.db_file = db_file
+        # 是否有尚未提交的事务
+        self.dirty = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+
+    # ==================== 连接与事务 ====================
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            # 推送等后台线程也会读取笔记，统一由self._lock串行化访问
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def reload(self) -> None:
+        """SQLite始终读取最新数据，这里只提交未完成的事务"""
+        self.flush()
+        self._notify("reset")
+
+    def flush(self) -> bool:
+        """提交未完成的事务"""
+        with self._lock:
+            if not self.dirty:
+                return True
+            try:
+                self.conn.commit()
+            except sqlite3.Error as e:
+                show_error("保存失败", f"写入SQLite数据库失败：{e}")
+                return False
+            self.dirty = False
+            return True
+
+    def compact(self) -> bool:
+        """与 NoteStore 接口保持一致：提交事务即可"""
+        return self.flush()
+
+    def close(self) -> bool:
+        """退出前提交事务并关闭连接"""
+        with self._lock:
+            success = self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            return success
+
+    def persisted_paths(self) -> List[Path]:
+        """保存笔记数据的文件（修改后需要推送）"""
+        return [self.db_file]
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """执行写操作，非批量模式下立即提交"""
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            self.dirty = True
+            record_changes(self.persisted_paths())
+            if not self._batch_depth:
+                self.flush()
+            return cursor
+
+    def _persisted(self) -> bool:
+        """写操作是否已持久化（批量模式中视为成功，退出时统一提交）"""
+        return self._batch_depth > 0 or not self.dirty
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # ==================== 变化通知 ====================
+
+    def add_listener(self, listener: Callable[[str, Optional[str], Optional[str]], None]) -> None:
+        """注册笔记变化监听函数（与 NoteStore.add_listener 一致）"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, op: str, subject: str = None, content: str = None) -> None:
+        for listener in list(self._listeners):
+            listener(op, subject, content)
+
+    @contextmanager
+    def batch(self):
+        """批量修改上下文：期间的所有修改在同一事务中，退出时提交一次"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                outermost = not self._batch_depth
+            if outermost:
+                self.flush()
+
+    # ==================== 笔记读取 ====================
+
+    def get_note_list(self) -> List[Dict]:
+        """获取按科目排序的笔记列表（同科目保持插入顺序）"""
+        rows = self._query("SELECT subject, content, timestamp FROM notes ORDER BY subject, id")
+        return [_row_to_note(row) for row in rows]
+
+    def notes_by_subject(self, subject: str) -> List[Dict]:
+        """获取指定科目的笔记"""
+        rows = self._query(
+            "SELECT subject, content, timestamp FROM notes WHERE subject = ? ORDER BY id", (subject,))
+        return [_row_to_note(row) for row in rows]
+
+    def subjects(self) -> List[str]:
+        """获取所有科目（已排序）"""
+        return [row["subject"] for row in self._query("SELECT DISTINCT subject FROM notes ORDER BY subject")]
+
+    def count_notes(self, subject: str = None) -> int:
+        """笔记总数（指定科目时为该科目的笔记数）"""
+        if subject is None:
+            return self._query("SELECT COUNT(*) AS n FROM notes")[0]["n"]
+        return self._query("SELECT COUNT(*) AS n FROM notes WHERE subject = ?", (subject,))[0]["n"]
+
+    def subject_counts(self) -> Dict[str, int]:
+        """各科目的笔记数"""
+        return {row["subject"]: row["n"]
+                for row in self._query("SELECT subject, COUNT(*) AS n FROM notes GROUP BY subject")}
+
+    def find_note(self, subject: str, content: str) -> Optional[Dict]:
+        """按科目和内容查找笔记"""
+        rows = self._query(
+            "SELECT subject, content, timestamp FROM notes WHERE subject = ? AND content = ?", (subject, content))
+        return _row_to_note(rows[0]) if rows else None
+
+    def due_notes(self, target_timestamp: float, target_days: List[int]) -> List[Dict]:
+        """目标时间戳当天需要复习的笔记"""
+        return self.notes_due_on(int(target_timestamp // SECONDS_PER_DAY), target_days)
+
+    def notes_due_on(self, day: int, target_days: List[int]) -> List[Dict]:
+        """第day天需要复习的笔记：每个复习间隔对应一段时间戳范围，走timestamp索引"""
+        offsets = sorted(set(target_days))
+        if not offsets:
+            return []
+        conditions = " OR ".join(["(timestamp >= ? AND timestamp < ?)"] * len(offsets))
+        params = []
+        for offset in offsets:
+            start = (day - offset) * SECONDS_PER_DAY
+            params.extend((start, start + SECONDS_PER_DAY))
+        rows = self._query(
+            f"SELECT subject, content, timestamp FROM notes WHERE {conditions} ORDER BY subject, id", tuple(params))
+        return [_row_to_note(row) for row in rows]
+
+    def day_counts(self) -> Dict[int, int]:
+        """每天（timestamp // 86400）创建/更新的笔记数，用于复习负荷预测"""
+        rows = self._query(
+            "SELECT CAST(timestamp AS INTEGER) / ? AS day, COUNT(*) AS n FROM notes GROUP BY day", (SECONDS_PER_DAY,))
+        return {row["day"]: row["n"] for row in rows}
+
+    # ==================== 笔记修改 ====================
+
+    def update_note_list(self, notes: List[Dict]) -> bool:
+        """整体替换笔记列表"""
+        with self.batch():
+            self._execute("DELETE FROM notes")
+            with self._lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO notes (subject, content, timestamp) VALUES (?, ?, ?)",
+                    [(note["subject"], note["content"], note["timestamp"]) for note in notes])
+        self._notify("reset")
+        return self._persisted()
+
+    def add_note(self, subject: str, content: str, timestamp: int = None) -> Dict:
+        """新增笔记条目，已存在时返回原条目"""
+        note = self.find_note(subject, content)
+        if note is not None:
+            return note
+        timestamp = floor(time.time()) if timestamp is None else timestamp
+        self._execute("INSERT INTO notes (subject, content, timestamp) VALUES (?, ?, ?)",
+                      (subject, content, timestamp))
+        self._notify("add", subject, content)
+        return {"content": content, "subject": subject, "timestamp": timestamp}
+
+    def touch_note(self, subject: str, content: str, timestamp: int = None) -> bool:
+        """更新笔记时间戳，未找到条目时返回False"""
+        timestamp = floor(time.time()) if timestamp is None else timestamp
+        cursor = self._execute("UPDATE notes SET timestamp = ? WHERE subject = ? AND content = ?",
+                               (timestamp, subject, content))
+        if cursor.rowcount <= 0:
+            return False
+        self._notify("touch", subject, content)
+        return True
+
+    def remove_note(self, subject: str, content: str) -> bool:
+        """删除笔记条目，未找到条目时返回False"""
+        cursor = self._execute("DELETE FROM notes WHERE subject = ? AND content = ?", (subject, content))
+        if cursor.rowcount <= 0:
+            return False
+        self._notify("remove", subject, content)
+        return True
+
+    # ==================== 上次科目 ====================
+
+    def get_last_subject(self) -> str:
+        """获取上次使用的科目"""
+        rows = self._query("SELECT value FROM meta WHERE key = 'last_subject'")
+        return rows[0]["value"] if rows else ""
+
+    def set_last_subject(self, subject: str) -> bool:
+        """设置上次使用的科目"""
+        self._execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_subject', ?)", (subject,))
+        return self._persisted()
+
+
+# ==================== 数据迁移 ====================
+
+def import_from_json(data_file: Path, db_file: Path) -> int:
+    """将data.json（含未压缩的修改日志）导入SQLite，返回导入的笔记数"""
+    from note_store import NoteStore
+    json_store = NoteStore(data_file)
+    notes = json_store.get_note_list()
+    db_store = SqliteNoteStore(db_file)
+    with db_store.batch():
+        db_store.update_note_list(notes)
+        db_store.set_last_subject(json_store.get_last_subject())
+    db_store.close()
+    return len(notes)
+
+
+def export_to_json(db_file: Path, data_file: Path) -> int:
+    """将SQLite中的笔记导出为data.json，返回导出的笔记数"""
+    from note_store import journal_path_for
+    from utils import save_data_json
+    db_store = SqliteNoteStore(db_file)
+    notes = db_store.get_note_list()
+    data = {"last_subject": db_store.get_last_subject(), "note_list": notes}
+    db_store.close()
+    if not save_data_json(data_file, data):
+        raise OSError(f"写入 {data_file} 失败")
+    # 导出的快照已是完整数据，旧的修改日志不再适用
+    journal_file = journal_path_for(data_file)
+    if journal_file.exists():
+        journal_file.unlink()
+    return len(notes)
+
+
+def main(argv: List[str] = None) -> int:
+    """迁移命令入口"""
+    from config import g_config
+    parser = argparse.ArgumentParser(description="data.json 与 SQLite 之间的一次性迁移")
+    parser.add_argument("direction", choices=["import", "export"], help="import: JSON->SQLite；export: SQLite->JSON")
+    args = parser.parse_args(argv)
+
+    if args.direction == "import":
+        count = import_from_json(g_config["data_file"], g_config["sqlite_file"])
+        print(f"已导入 {count} 条笔记到 {g_config['sqlite_file']}")
+    else:
+        count = export_to_json(g_config["sqlite_file"], g_config["data_file"])
+        print(f"已导出 {count} 条笔记到 {g_config['data_file']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import subprocess
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+import chem_render
+from chem_render import CHEM_MANIFEST_NAME, COMBINED_ENV, render_combined, render_equations
+
+STANDALONE_SOURCE = """\\documentclass[border=1pt]{standalone}
+\\usepackage[version=4]{mhchem}
+\\begin{document}
+\\ce{%s}
+\\end{document}
+"""
+
+
+class StubRender:
+    """不需要TeX环境的渲染命令：把源文件内容写入同名PNG，并记录渲染过的文件"""
+    def __init__(self, fail=(), no_output=()):
+        self.fail = set(fail)
+        self.no_output = set(no_output)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, tex_path: Path) -> None:
+        with self._lock:
+            self.calls.append(tex_path.name)
+        if tex_path.name in self.fail:
+            raise subprocess.CalledProcessError(1, ["texpng", tex_path.name], stderr="! Undefined control sequence.")
+        if tex_path.name not in self.no_output:
+            tex_path.with_suffix(".png").write_bytes(tex_path.read_bytes())
+
+
+class StubCompile:
+    """合并渲染的编译命令替身：把合并文档复制为同名PDF（fail为True时编译失败）"""
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, tex_path: Path) -> None:
+        self.calls += 1
+        if self.fail:
+            raise subprocess.CalledProcessError(1, ["xelatex", tex_path.name], stderr="! LaTeX Error.")
+        tex_path.with_suffix(".pdf").write_bytes(tex_path.read_bytes())
+
+
+def stub_split(pdf_path: Path, out_prefix: Path, drop_pages: int = 0) -> None:
+    """拆页命令替身：每个方程式环境输出一页，内容为该页的正文；像 pdftoppm 一样按总页数补零"""
+    text = pdf_path.read_text(encoding="utf-8")
+    bodies = [part.split(f"\\end{{{COMBINED_ENV}}}")[0].strip()
+              for part in text.split(f"\\begin{{{COMBINED_ENV}}}")[1:]]
+    width = len(str(len(bodies)))
+    for page, body in enumerate(bodies[:len(bodies) - drop_pages], start=1):
+        out_prefix.with_name(f"{out_prefix.name}-{page:0{width}d}.png").write_text(body, encoding="utf-8")
+
+
+class ChemRenderTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.assets_dir = Path(self._tmp.name)
+        # 不登记待推送路径（测试不依赖配置文件）
+        patcher = mock.patch.object(chem_render, "record_changes")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_tex(self, name: str, equation: str) -> Path:
+        tex_path = self.assets_dir / name
+        tex_path.write_text(STANDALONE_SOURCE % equation, encoding="utf-8")
+        return tex_path
+
+
+class RenderEquationsTest(ChemRenderTestCase):
+    """逐个渲染：按源文件哈希跳过、错误收集与取消"""
+    def test_skips_files_matching_manifest(self):
+        self.write_tex("eq1.tex", "H2 + O2 -> H2O")
+        self.write_tex("eq2.tex", "NaCl")
+        first = StubRender()
+        result = render_equations(self.assets_dir, first, workers=2)
+        self.assertEqual(sorted(result.rendered), ["eq1.tex", "eq2.tex"])
+        self.assertTrue((self.assets_dir / CHEM_MANIFEST_NAME).exists())
+
+        second = StubRender()
+        result = render_equations(self.assets_dir, second, workers=2)
+        self.assertEqual(second.calls, [])
+        self.assertEqual(result.rendered, [])
+        self.assertEqual(result.skipped, 2)
+
+    def test_rerenders_after_source_change(self):
+        tex_path = self.write_tex("eq1.tex", "H2 + O2 -> H2O")
+        self.write_tex("eq2.tex", "NaCl")
+        render_equations(self.assets_dir, StubRender(), workers=1)
+
+        tex_path.write_text(STANDALONE_SOURCE % "2H2 + O2 -> 2H2O", encoding="utf-8")
+        stub = StubRender()
+        result = render_equations(self.assets_dir, stub, workers=1)
+        self.assertEqual(stub.calls, ["eq1.tex"])
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(tex_path.with_suffix(".png").read_bytes(), tex_path.read_bytes())
+
+    def test_rerenders_when_png_missing(self):
+        tex_path = self.write_tex("eq1.tex", "NaCl")
+        render_equations(self.assets_dir, StubRender(), workers=1)
+        tex_path.with_suffix(".png").unlink()
+
+        stub = StubRender()
+        render_equations(self.assets_dir, stub, workers=1)
+        self.assertEqual(stub.calls, ["eq1.tex"])
+
+    def test_errors_are_collected_per_file(self):
+        self.write_tex("bad.tex", "\\oops")
+        self.write_tex("empty.tex", "NaCl")
+        self.write_tex("good.tex", "H2O")
+        stub = StubRender(fail={"bad.tex"}, no_output={"empty.tex"})
+        result = render_equations(self.assets_dir, stub, workers=3)
+
+        self.assertEqual(result.rendered, ["good.tex"])
+        self.assertEqual(sorted(result.errors), ["bad.tex", "empty.tex"])
+        self.assertIn("Undefined control sequence", result.errors["bad.tex"])
+        self.assertIn("empty.png", result.errors["empty.tex"])
+
+        # 失败的文件没有记入清单，下次仍会渲染
+        retry = StubRender()
+        render_equations(self.assets_dir, retry, workers=1)
+        self.assertEqual(sorted(retry.calls), ["bad.tex", "empty.tex"])
+
+    def test_cancel_stops_starting_new_renders(self):
+        for i in range(4):
+            self.write_tex(f"eq{i}.tex", f"H{i}")
+        cancel_event = threading.Event()
+        stub = StubRender()
+
+        def render_then_cancel(tex_path: Path) -> None:
+            stub(tex_path)
+            cancel_event.set()
+
+        result = render_equations(self.assets_dir, render_then_cancel, workers=1, cancel_event=cancel_event)
+        self.assertTrue(result.cancelled)
+        self.assertEqual(len(stub.calls), 1)
+        self.assertEqual(result.rendered, stub.calls)
+        self.assertEqual(result.errors, {})
+
+        # 取消后未渲染的文件下次继续渲染
+        rest = StubRender()
+        result = render_equations(self.assets_dir, rest, workers=1)
+        self.assertEqual(len(rest.calls), 3)
+        self.assertEqual(result.skipped, 1)
+
+
+class CombinedRenderTest(ChemRenderTestCase):
+    """合并渲染：按页码写回PNG，页数不符或编译失败时回退到逐个渲染"""
+    def test_pages_map_to_files(self):
+        # 12页时 pdftoppm 输出 page-01.png … page-12.png
+        equations = {f"eq{i:02d}.tex": f"H{i}O" for i in range(12)}
+        for name, equation in equations.items():
+            self.write_tex(name, equation)
+        stub = StubRender()
+        compile_stub = StubCompile()
+        result = render_equations(self.assets_dir, stub, combined=True,
+                                  compile_command=compile_stub, split_command=stub_split)
+
+        self.assertEqual(compile_stub.calls, 1)
+        self.assertEqual(stub.calls, [])
+        self.assertEqual(result.combined, 12)
+        self.assertEqual(result.errors, {})
+        for name, equation in equations.items():
+            png_text = (self.assets_dir / name).with_suffix(".png").read_text(encoding="utf-8")
+            self.assertEqual(png_text, f"\\ce{{{equation}}}")
+
+        # 合并渲染的文件同样记入清单
+        result = render_equations(self.assets_dir, stub, combined=True,
+                                  compile_command=compile_stub, split_command=stub_split)
+        self.assertEqual(result.skipped, 12)
+        self.assertEqual(compile_stub.calls, 1)
+
+    def test_page_count_mismatch_raises(self):
+        tex_paths = [self.write_tex(f"eq{i}.tex", f"H{i}") for i in range(3)]
+        with self.assertRaises(RuntimeError):
+            render_combined(tex_paths, "\\documentclass{standalone}", ["a", "b", "c"],
+                            StubCompile(), lambda pdf, prefix: stub_split(pdf, prefix, drop_pages=1))
+        # 页数不符时不写入任何PNG
+        self.assertEqual(list(self.assets_dir.glob("*.png")), [])
+
+    def test_page_count_mismatch_falls_back(self):
+        for i in range(3):
+            self.write_tex(f"eq{i}.tex", f"H{i}")
+        stub = StubRender()
+        result = render_equations(self.assets_dir, stub, workers=1, combined=True, compile_command=StubCompile(),
+                                  split_command=lambda pdf, prefix: stub_split(pdf, prefix, drop_pages=1))
+        self.assertEqual(result.combined, 0)
+        self.assertEqual(sorted(stub.calls), ["eq0.tex", "eq1.tex", "eq2.tex"])
+        self.assertEqual(sorted(result.rendered), ["eq0.tex", "eq1.tex", "eq2.tex"])
+
+    def test_failed_compile_falls_back_to_single_renders(self):
+        for i in range(3):
+            self.write_tex(f"eq{i}.tex", f"H{i}")
+        stub = StubRender(fail={"eq1.tex"})
+        result = render_equations(self.assets_dir, stub, workers=1, combined=True,
+                                  compile_command=StubCompile(fail=True), split_command=stub_split)
+        self.assertEqual(result.combined, 0)
+        self.assertEqual(sorted(result.rendered), ["eq0.tex", "eq2.tex"])
+        # 逐个渲染报告具体是哪个文件失败
+        self.assertEqual(list(result.errors), ["eq1.tex"])
+
+    def test_unreadable_source_rendered_singly(self):
+        self.write_tex("eq0.tex", "H2O")
+        self.write_tex("eq1.tex", "NaCl")
+        (self.assets_dir / "gbk.tex").write_bytes("\\ce{氯化钠}".encode("gbk"))
+        stub = StubRender()
+        result = render_equations(self.assets_dir, stub, workers=1, combined=True,
+                                  compile_command=StubCompile(), split_command=stub_split)
+        self.assertEqual(result.combined, 2)
+        self.assertEqual(stub.calls, ["gbk.tex"])
+        self.assertEqual(result.errors, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+import note_store
+from error_handler import collect_messages
+from note_store import NoteStore, journal_path_for
+
+SECONDS_PER_DAY = 86400
+
+
+class ReloadJournalTest(unittest.TestCase):
+    """启动时加载data.json快照并重放修改日志"""
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_file = Path(self._tmp.name) / "data.json"
+        notes = [{"subject": "化学", "content": f"笔记{i}", "timestamp": i * SECONDS_PER_DAY} for i in range(3)]
+        self.data_file.write_text(json.dumps({"last_subject": "化学", "note_list": notes}, ensure_ascii=False),
+                                  encoding="utf-8")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_journal(self, records):
+        with open(journal_path_for(self.data_file), "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def test_reload_replays_journal(self):
+        self.write_journal([
+            {"op": "add", "subject": "物理", "content": "新笔记", "timestamp": 10 * SECONDS_PER_DAY},
+            {"op": "touch", "subject": "化学", "content": "笔记0", "timestamp": 10 * SECONDS_PER_DAY},
+            {"op": "remove", "subject": "化学", "content": "笔记1"},
+        ])
+        store = NoteStore(self.data_file)
+        store.reload()
+
+        self.assertEqual(store.count_notes(), 3)
+        self.assertEqual([(note["subject"], note["content"]) for note in store.get_note_list()],
+                         [("化学", "笔记0"), ("化学", "笔记2"), ("物理", "新笔记")])
+        # 复习索引与重放后的数据一致
+        due = store.notes_due_on(10, [0])
+        self.assertEqual(sorted(note["content"] for note in due), ["新笔记", "笔记0"])
+        self.assertEqual(len(store.notes_due_on(1, [0])), 0)
+        self.assertEqual(store.day_counts(), {10: 2, 2: 1})
+
+    def test_reload_twice_with_journal(self):
+        self.write_journal([{"op": "add", "subject": "物理", "content": f"新笔记{i}", "timestamp": 100 + i}
+                            for i in range(10)])
+        store = NoteStore(self.data_file)
+        store.reload()
+        store.reload()
+        self.assertEqual(store.count_notes(), 13)
+        self.assertEqual(len(store.notes_due_on(0, [0])), 11)
+
+    def test_torn_last_line_is_dropped(self):
+        journal_file = journal_path_for(self.data_file)
+        self.write_journal([{"op": "add", "subject": "物理", "content": "新笔记", "timestamp": 100}])
+        with open(journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "add", "subject": "物')
+        store = NoteStore(self.data_file)
+        with collect_messages() as messages:
+            store.reload()
+        self.assertEqual(messages, [])
+        self.assertEqual(store.count_notes(), 4)
+
+        # 截掉不完整的行后，新追加的记录从新行开始
+        with mock.patch.object(note_store, "record_changes"):
+            store.add_note("物理", "又一条", 200)
+            store.flush()
+        reloaded = NoteStore(self.data_file)
+        with collect_messages() as messages:
+            reloaded.reload()
+        self.assertEqual(messages, [])
+        self.assertEqual(reloaded.count_notes(), 5)
+
+    def test_damaged_middle_line_blocks_compaction(self):
+        journal_file = journal_path_for(self.data_file)
+        good = json.dumps({"op": "add", "subject": "物理", "content": "新笔记", "timestamp": 100}, ensure_ascii=False)
+        journal_file.write_text(f"{good}\n{{broken\n{good.replace('新笔记', '后一条')}\n", encoding="utf-8")
+        journal_text = journal_file.read_text(encoding="utf-8")
+        data_text = self.data_file.read_text(encoding="utf-8")
+
+        store = NoteStore(self.data_file)
+        with collect_messages() as messages:
+            store.reload()
+        self.assertEqual([level for level, _, _ in messages], ["error"])
+        self.assertIn("第 2 行", messages[0][2])
+        # 损坏行前后的记录照常重放
+        self.assertEqual(store.count_notes(), 5)
+
+        # 不压缩：data.json与日志保持原样
+        self.assertTrue(store.compact())
+        self.assertEqual(journal_file.read_text(encoding="utf-8"), journal_text)
+        self.assertEqual(self.data_file.read_text(encoding="utf-8"), data_text)
+
+
+
+class CompactTest(unittest.TestCase):
+    """压缩日志：写data.json时不持有存储锁，写入期间追加的记录不会丢失"""
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_file = Path(self._tmp.name) / "data.json"
+        self.store = NoteStore(self.data_file)
+        # 不登记待推送路径（测试不依赖配置文件）
+        patcher = mock.patch.object(note_store, "record_changes")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_compact_keeps_records_appended_while_writing(self):
+        self.store.add_note("化学", "笔记0", 0)
+        save = note_store.save_data_json
+
+        def save_and_modify(data_file, data):
+            # 在另一个线程中修改：写文件期间存储不能被锁住
+            writer = threading.Thread(target=self.store.add_note, args=("化学", "笔记1", 0))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            return save(data_file, data)
+
+        with mock.patch.object(note_store, "save_data_json", side_effect=save_and_modify):
+            self.assertTrue(self.store.compact())
+        self.assertTrue(journal_path_for(self.data_file).read_text(encoding="utf-8"))
+
+        reloaded = NoteStore(self.data_file)
+        self.assertEqual(sorted(note["content"] for note in reloaded.get_note_list()), ["笔记0", "笔记1"])
+
+        # 再次压缩后日志被清空
+        self.assertTrue(self.store.compact())
+        self.assertEqual(journal_path_for(self.data_file).read_text(encoding="utf-8"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import utils
+from benchmarks.synthetic import generate_notebook
+from config import g_config
+from utils import PARALLEL_RENDER_MIN_FILES, convert_md_to_html
+
+# 生成的笔记数（需达到并行渲染的最少文件数）
+NOTE_COUNT = 40
+
+
+class ParallelRenderTest(unittest.TestCase):
+    """并行渲染与逐个渲染输出的HTML逐字节相同"""
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        work_dir = Path(self._tmp.name)
+        self.serial_root = work_dir / "serial"
+        self.parallel_root = work_dir / "parallel"
+        generate_notebook(self.serial_root, NOTE_COUNT)
+        shutil.copytree(self.serial_root, self.parallel_root)
+        patchers = [
+            mock.patch.dict(g_config, {"html_dir": Path("html"), "sharded_export": False}),
+            # 不登记待推送路径（测试不依赖笔记根目录）
+            mock.patch.object(utils, "record_changes"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def html_files(self, root_dir: Path) -> dict:
+        html_root = root_dir / "html"
+        return {path.relative_to(html_root): path.read_bytes()
+                for path in sorted(html_root.rglob("*")) if path.is_file()}
+
+    def test_parallel_output_matches_serial(self):
+        serial_written = convert_md_to_html(self.serial_root, full_rebuild=True, workers=1)
+        parallel_written = convert_md_to_html(self.parallel_root, full_rebuild=True, workers=4)
+        self.assertGreaterEqual(len(serial_written), PARALLEL_RENDER_MIN_FILES)
+        self.assertEqual(sorted(path.relative_to(self.serial_root) for path in serial_written),
+                         sorted(path.relative_to(self.parallel_root) for path in parallel_written))
+
+        serial = self.html_files(self.serial_root)
+        parallel = self.html_files(self.parallel_root)
+        self.assertEqual(sorted(serial), sorted(parallel))
+        for relative_path, content in serial.items():
+            self.assertEqual(content, parallel[relative_path], relative_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
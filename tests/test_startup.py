@@ -0,0 +1,22 @@
+import unittest
+from benchmarks.startup import IMPORT_BUDGET_SECONDS, LAZY_MODULES, check_import
+
+# 取中位数的导入次数
+IMPORT_REPEAT = 3
+
+
+class StartupImportTest(unittest.TestCase):
+    """在新的解释器进程中导入 note_tkinter（不创建窗口，无图形环境也能运行）"""
+    @classmethod
+    def setUpClass(cls):
+        cls.result = check_import(IMPORT_REPEAT)
+
+    def test_lazy_modules_not_loaded(self):
+        self.assertEqual(self.result["loaded"], [], f"应延迟加载的模块：{LAZY_MODULES}")
+
+    def test_import_within_budget(self):
+        self.assertLessEqual(self.result["median_s"], IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
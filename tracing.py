@@ -0,0 +1,202 @@
+"""性能追踪模块
+
+提供轻量的耗时追踪：span() 上下文管理器、traced() 装饰器以及带计时的子进程调用。
+在 config.ini 的 [Tracing] 中开启后，每个span结束时向滚动的JSONL日志写入一条记录：
+名称、开始时间、墙钟耗时、其中子进程的耗时、父span及出错信息。
+未开启时span只做一次配置判断，不计时也不写日志。
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, Iterator, List, Optional
+from config import g_config
+
+if TYPE_CHECKING:
+    import logging
+    import subprocess
+
+# 记录类型：普通span与子进程调用
+SPAN_KIND = "span"
+SUBPROCESS_KIND = "subprocess"
+
+_local = threading.local()
+_logger: Optional["logging.Logger"] = None
+_logger_file: Optional[Path] = None
+_logger_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    """是否开启了性能追踪"""
+    return bool(g_config.get("tracing_enabled"))
+
+
+def _get_logger() -> "logging.Logger":
+    """获取写入追踪日志的logger（日志文件配置变化时重新创建）"""
+    global _logger, _logger_file
+    # logging只在开启追踪后导入
+    import logging
+    from logging.handlers import RotatingFileHandler
+    log_file = g_config["trace_log_file"]
+    with _logger_lock:
+        if _logger is None or _logger_file != log_file:
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            logger = logging.getLogger("note_trace")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            handler = RotatingFileHandler(log_file, maxBytes=g_config["trace_max_bytes"],
+                                          backupCount=g_config["trace_backup_count"], encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger, _logger_file = logger, log_file
+        return _logger
+
+
+def _span_stack() -> List[Dict]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+# ==================== 记录span ====================
+
+@contextmanager
+def span(name: str, kind: str = SPAN_KIND, **attrs) -> Iterator[Optional[Dict]]:
+    """记录一段代码的耗时
+
+    Args:
+        name: span名称（统计时按名称汇总）
+        kind: 记录类型，子进程调用为 "subprocess"
+        attrs: 附加到记录中的字段（需可JSON序列化）
+
+    Yields:
+        记录字典（未开启追踪时为None），可在块内补充字段
+    """
+    if not tracing_enabled():
+        yield None
+        return
+
+    stack = _span_stack()
+    record = {
+        "name": name,
+        "kind": kind,
+        "start": time.time(),
+        "thread": threading.current_thread().name,
+        "parent": stack[-1]["name"] if stack else None,
+        "subprocess_ms": 0.0,
+    }
+    record.update(attrs)
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        stack.pop()
+        record["duration_ms"] = round(duration_ms, 3)
+        record["subprocess_ms"] = round(record["subprocess_ms"], 3)
+        # 子进程耗时计入所有外层span
+        if kind == SUBPROCESS_KIND:
+            for outer in stack:
+                outer["subprocess_ms"] += duration_ms
+        try:
+            _get_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+        except OSError:
+            pass
+
+
+def traced(name: str = None) -> Callable:
+    """装饰器：把函数的每次调用记录为一个span（默认名称为 模块.函数）"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracing_enabled():
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def subprocess_span(cmd) -> ContextManager[Optional[Dict]]:
+    """子进程调用的span（名称取命令的前两段，例如 "git add"）"""
+    if isinstance(cmd, str):
+        parts = cmd.split()
+    else:
+        parts = [Path(str(part)).name if i == 0 else str(part) for i, part in enumerate(cmd)]
+    return span(" ".join(parts[:2]), kind=SUBPROCESS_KIND, cmd=" ".join(parts))
+
+
+def run_subprocess(cmd, **kwargs) -> "subprocess.CompletedProcess":
+    """带计时的 subprocess.run"""
+    import subprocess
+    with subprocess_span(cmd) as record:
+        result = subprocess.run(cmd, **kwargs)
+        if record is not None:
+            record["returncode"] = result.returncode
+        return result
+
+
+# ==================== 统计 ====================
+
+def read_trace_log() -> List[Dict]:
+    """读取追踪日志（包括滚动后的旧文件，按时间从旧到新）"""
+    log_file = g_config["trace_log_file"]
+    files = [log_file.with_name(f"{log_file.name}.{i}") for i in range(g_config["trace_backup_count"], 0, -1)]
+    files.append(log_file)
+    records = []
+    for file in files:
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return records
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """最近秩法百分位数"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(records: List[Dict]) -> List[Dict]:
+    """按名称汇总：调用次数、p50/p95/最大耗时、平均子进程耗时、出错次数（按总耗时降序）"""
+    groups: Dict[str, List[Dict]] = {}
+    for record in records:
+        if "duration_ms" in record:
+            groups.setdefault(record["name"], []).append(record)
+
+    summary = []
+    for name, group in groups.items():
+        durations = sorted(record["duration_ms"] for record in group)
+        summary.append({
+            "name": name,
+            "kind": group[0].get("kind", SPAN_KIND),
+            "count": len(group),
+            "p50_ms": _percentile(durations, 50),
+            "p95_ms": _percentile(durations, 95),
+            "max_ms": durations[-1],
+            "total_ms": sum(durations),
+            "subprocess_ms": sum(record.get("subprocess_ms", 0.0) for record in group) / len(group),
+            "errors": sum(1 for record in group if "error" in record),
+        })
+    summary.sort(key=lambda item: item["total_ms"], reverse=True)
+    return summary
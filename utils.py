@@ -1,12 +1,16 @@
+import hashlib
 import json
 import shutil
-import markdown
 import os
 from pathlib import Path
-from typing import Dict, List
-from subprocess import run
+from typing import Callable, Dict, List, Optional, Set
 import time
+from config import g_config
 from error_handler import show_warning, show_error
+from html_render import init_worker, render_md_file
+from tracing import traced, run_subprocess
+from pending_changes import record_changes
+from note_table import NoteView
 
 def check_config(root_dir: Path, target_days: List[int]) -> bool:
     """检查配置有效性"""
@@ -18,92 +22,197 @@ def check_config(root_dir: Path, target_days: List[int]) -> bool:
 
     return True
 
-def convert_md_to_html(root_dir: Path) -> None:
-    """将MD文件转换为HTML文件并保持目录结构"""
-    html_root = root_dir / "html"
+# HTML增量构建清单（记录每个源文件的mtime/大小/哈希及输出路径）
+HTML_MANIFEST_NAME = ".manifest.json"
+# 页面模板变化时递增，使旧清单失效并触发全量重建
+HTML_MANIFEST_VERSION = 2
+# 待渲染文件数不少于该值时才启用进程池（避免为少量文件付出进程启动开销）
+PARALLEL_RENDER_MIN_FILES = 8
 
-    # 清空或创建HTML目录
-    if html_root.exists():
-        shutil.rmtree(html_root)
+
+def file_digest(file_path: Path) -> str:
+    """计算文件内容的SHA-1摘要"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_html_manifest(html_root: Path) -> Optional[Dict]:
+    """加载HTML构建清单，不存在或版本不符时返回None"""
+    manifest_path = html_root / HTML_MANIFEST_NAME
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != HTML_MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_html_manifest(html_root: Path, manifest: Dict) -> None:
+    """原子写入HTML构建清单"""
+    manifest_path = html_root / HTML_MANIFEST_NAME
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _remove_empty_dirs(start_dir: Path, stop_dir: Path) -> None:
+    """自下而上删除空目录，直到stop_dir为止"""
+    current = start_dir
+    while current != stop_dir and stop_dir in current.parents:
+        try:
+            current.rmdir()
+        except OSError:
+            break
+        current = current.parent
+
+
+@traced()
+def render_md_files(jobs: List[tuple[Path, Path, bool]], workers: int = 1,
+                    on_warning: Optional[Callable[[str], None]] = None) -> None:
+    """渲染一批MD文件，workers大于1且文件足够多时使用进程池并行渲染
+
+    Args:
+        jobs: (源MD文件, 输出HTML文件, 是否为导出的笔记列表页) 列表
+        workers: 并行进程数，0表示使用CPU核数
+        on_warning: 处理读取失败提示的函数，None表示直接弹出提示（只能在主线程中使用）
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    if workers > 1 and len(jobs) >= PARALLEL_RENDER_MIN_FILES:
+        # 进程池（及multiprocessing）只在需要并行渲染时导入
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            warnings = list(executor.map(render_md_file, *zip(*jobs), chunksize=chunksize))
+    else:
+        warnings = [render_md_file(src_path, out_path, listing) for src_path, out_path, listing in jobs]
+
+    for warning in warnings:
+        if not warning:
+            continue
+        if on_warning is None:
+            show_warning("读取失败", warning)
+        else:
+            on_warning(warning)
+
+
+def export_listing_dirs(root_dir: Path) -> Set[Path]:
+    """存放导出的笔记列表页的目录（相对于根目录）：根目录本身，以及分片导出的分片目录"""
+    listing_dirs = {Path(".")}
+    if g_config.get("sharded_export"):
+        try:
+            listing_dirs.add(g_config["export_shard_dir"].relative_to(root_dir))
+        except ValueError:
+            pass
+    return listing_dirs
+
+
+@traced()
+def convert_md_to_html(root_dir: Path, full_rebuild: bool = False, workers: int = 1,
+                       on_warning: Optional[Callable[[str], None]] = None) -> List[Path]:
+    """将MD文件转换为HTML文件并保持目录结构
+
+    根据 html/.manifest.json 增量构建：只重新渲染新增或修改过的MD文件、
+    复制新增或修改过的PNG文件，并删除源文件已不存在的输出。
+    导出的笔记列表页（export.md、allExport.md及分片导出的分片和索引页）中的链接改指向HTML。
+
+    Args:
+        root_dir: 笔记根目录
+        full_rebuild: 是否清空HTML目录后全量重建
+        workers: 渲染进程数，1为串行，0表示使用CPU核数
+        on_warning: 处理读取失败提示的函数（在工作线程中构建时传入），None表示直接弹出提示
+
+    Returns:
+        本次写入或删除的输出文件路径列表
+    """
+    # HTML输出目录是笔记根目录下的顶层目录
+    html_root = root_dir / g_config["html_dir"].name
+
+    manifest = None if full_rebuild else load_html_manifest(html_root)
+    if manifest is None:
+        # 无有效清单：清空或创建HTML目录后全量构建
+        if html_root.exists():
+            shutil.rmtree(html_root)
+        manifest = {"version": HTML_MANIFEST_VERSION, "files": {}}
     html_root.mkdir(parents=True, exist_ok=True)
 
-    # 复制目录结构
+    listing_dirs = export_listing_dirs(root_dir)
+    old_entries = manifest["files"]
+    new_entries = {}
+    changed_paths = []
+    render_jobs = []
+
     for root, dirs, files in os.walk(root_dir):
         # 转换为Path对象
         root_path = Path(root)
         # 跳过HTML目录本身
-        if "html" in str(root_path):
-            continue
+        if root_path == root_dir and html_root.name in dirs:
+            dirs.remove(html_root.name)
 
-        # 创建对应的HTML目录
         relative_path = root_path.relative_to(root_dir)
         html_dir_path = html_root / relative_path
-        html_dir_path.mkdir(parents=True, exist_ok=True)
 
-        # 转换MD文件为HTML
         for file in files:
+            if not (file.endswith('.png') or file.endswith('.md')):
+                continue
+            src_path = root_path / file
+            out_path = html_dir_path / (file.replace('.md', '.html') if file.endswith('.md') else file)
+            src_rel = (relative_path / file).as_posix()
+            out_rel = out_path.relative_to(html_root).as_posix()
+
+            stat = src_path.stat()
+            entry = old_entries.get(src_rel)
+            if (entry and entry["output"] == out_rel and out_path.exists()
+                    and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size):
+                new_entries[src_rel] = entry
+                continue
+
+            # mtime或大小变化时再比较内容哈希，内容未变则只更新记录
+            src_hash = file_digest(src_path)
+            new_entries[src_rel] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": src_hash,
+                "output": out_rel
+            }
+            if entry and entry["hash"] == src_hash and entry["output"] == out_rel and out_path.exists():
+                continue
+
+            html_dir_path.mkdir(parents=True, exist_ok=True)
             if file.endswith('.png'):
-                md_png_file_path = root_path / file
-                html_png_file_path = html_dir_path / file
-                shutil.copy(md_png_file_path, html_png_file_path)
-            if file.endswith('.md'):
-                md_file_path = root_path / file
-                html_file_path = html_dir_path / file.replace('.md', '.html')
-
-                # 尝试不同编码读取文件
-                encodings = ['utf-8', 'gbk', 'latin1', 'iso-8859-1']
-                md_content = None
-
-                for encoding in encodings:
-                    try:
-                        with open(md_file_path, 'r', encoding=encoding) as md_file:
-                            md_content = md_file.read()
-                        break  # 成功读取则跳出循环
-                    except UnicodeDecodeError:
-                        continue  # 尝试下一个编码
-                    except Exception as e:
-                        show_warning("读取失败", f"无法读取文件 {md_file_path}：{e}")
-                        md_content = None
-                        break
-
-                # 如果所有编码都失败，使用替代内容
-                if md_content is None:
-                    md_content = f"无法读取文件：{md_file_path}"
-
-                # 转换为HTML
-                html_content = markdown.markdown(md_content, extensions=[
-                        'markdown.extensions.tables',
-                        'markdown.extensions.attr_list'
-                ])
-                with open(html_file_path, 'w', encoding='utf-8') as html_file:
-                    if(file=="export.md"):
-                        html_content = html_content.replace(".md\">",".html\">")
-                    else:
-                        html_content = html_content+f"<a href=\"javascript:history.back(-1)\">返回</a>"
-                    html_file.write(f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{Path(file).stem}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 20px; }}
-        h1, h2, h3, h4, h5, h6 {{ color: #333; }}
-        a {{ color: #0366d6; text-decoration: none; font-size: 20px;}}
-        img {{ margin:0; padding: 0; transform: translateY(-15px); text-align: center;}}
-        a:hover {{ text-decoration: underline; }}
-        ul, ol {{ padding-left: 20px; }}
-        code {{ background-color: #f6f8fa; padding: 2px 4px; border-radius: 3px; }}
-        pre {{ background-color: #f6f8fa; padding: 10px; border-radius: 3px; overflow: auto; }}
-        pre code {{ background-color: transparent; padding: 0; }}
-        table,th,td {{text-align: left; border: #333 1px solid; padding: 5px;}}
-        table {{border-collapse: collapse;}}
-    </style>
-</head>
-<body>
-{html_content}
-</body>
-</html>""")
+                shutil.copy(src_path, out_path)
+            else:
+                render_jobs.append((src_path, out_path, relative_path in listing_dirs))
+            changed_paths.append(out_path)
+
+    # 渲染新增或修改过的MD文件
+    if render_jobs:
+        render_md_files(render_jobs, workers, on_warning)
+
+    # 删除源文件已不存在的输出
+    for src_rel, entry in old_entries.items():
+        if src_rel in new_entries:
+            continue
+        out_path = html_root / entry["output"]
+        if out_path.exists():
+            out_path.unlink()
+            changed_paths.append(out_path)
+            _remove_empty_dirs(out_path.parent, html_root)
+
+    if new_entries != old_entries:
+        manifest["files"] = new_entries
+        save_html_manifest(html_root, manifest)
+        changed_paths.append(html_root / HTML_MANIFEST_NAME)
+    record_changes(changed_paths)
+    return changed_paths
     
 def days_difference(later_timestamp: int, earlier_timestamp: int) -> int:
     """计算两个时间戳之间的天数差"""
@@ -118,16 +227,21 @@ def is_valid_filename(name: str) -> bool:
 
 
 def filter_notes(notes: List[Dict], target_timestamp: int, target_days: List[int]) -> List[Dict]:
-    """根据目标天数筛选笔记"""
+    """根据目标天数筛选笔记（笔记表视图直接比较时间戳列）"""
+    target_day = target_timestamp // 86400
+    if isinstance(notes, NoteView):
+        return notes.filter_due(target_day, target_days)
+    offsets = set(target_days)
     filtered_notes = [
         note for note in notes
-        if days_difference(target_timestamp, note['timestamp']) in target_days
+        if int(target_day - note['timestamp'] // 86400) in offsets
     ]
     return filtered_notes
 
 
 # ==================== 统一数据访问函数 ====================
 
+@traced()
 def load_data_json(data_file: Path) -> Dict:
     """加载data.json文件，如果不存在则返回默认结构"""
     if not data_file.exists():
@@ -140,11 +254,16 @@ def load_data_json(data_file: Path) -> Dict:
         return {"note_list": [], "last_subject": ""}
 
 
+@traced()
 def save_data_json(data_file: Path, data: Dict) -> bool:
-    """保存数据到data.json文件"""
+    """保存数据到data.json文件（先写临时文件再原子替换，避免写入中途崩溃损坏文件）"""
+    tmp_file = data_file.with_name(data_file.name + ".tmp")
     try:
-        with open(data_file, 'w', encoding='utf-8') as f:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, data_file)
         return True
     except Exception as e:
         show_error("保存失败", f"保存data.json失败：{e}")
@@ -152,31 +271,27 @@ def save_data_json(data_file: Path, data: Dict) -> bool:
 
 
 def get_note_list(data_file: Path) -> List[Dict]:
-    """获取笔记列表"""
-    data = load_data_json(data_file)
-    notes = data.get('note_list', [])
-    notes.sort(key=lambda x: x["subject"])
-    return notes
+    """获取笔记列表（经由进程内缓存的NoteStore）"""
+    from note_store import get_note_store
+    return get_note_store(data_file).get_note_list()
 
 
 def update_note_list(data_file: Path, notes: List[Dict]) -> bool:
     """更新笔记列表"""
-    data = load_data_json(data_file)
-    data['note_list'] = notes
-    return save_data_json(data_file, data)
+    from note_store import get_note_store
+    return get_note_store(data_file).update_note_list(notes)
 
 
 def get_last_subject(data_file: Path) -> str:
     """获取上次使用的科目"""
-    data = load_data_json(data_file)
-    return data.get('last_subject', "")
+    from note_store import get_note_store
+    return get_note_store(data_file).get_last_subject()
 
 
 def set_last_subject(data_file: Path, subject: str) -> bool:
     """设置上次使用的科目"""
-    data = load_data_json(data_file)
-    data['last_subject'] = subject
-    return save_data_json(data_file, data)
+    from note_store import get_note_store
+    return get_note_store(data_file).set_last_subject(subject)
 
 
 # ==================== 文件路径工具函数 ====================
@@ -217,9 +332,9 @@ def open_file_with_editor(file_path: Path, wait: bool = True) -> tuple[bool, str
     """
     try:
         if wait:
-            run(f'start /wait "" "{file_path}"', shell=True, check=True, capture_output=True)
+            run_subprocess(f'start /wait "" "{file_path}"', shell=True, check=True, capture_output=True)
         else:
-            run(f'start "" "{file_path}"', shell=True, check=True, capture_output=True)
+            run_subprocess(f'start "" "{file_path}"', shell=True, check=True, capture_output=True)
         return True, ""
     except Exception as e:
         return False, f"打开文件失败：{e}"
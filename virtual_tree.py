@@ -0,0 +1,200 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Sequence
+
+# Windows下鼠标滚轮每格的delta
+WHEEL_DELTA = 120
+# 每次滚轮滚动的行数
+WHEEL_ROWS = 3
+
+
+class VirtualTreeview(ttk.Frame):
+    """虚拟化的Treeview
+
+    只为可见窗口内的行（加少量缓冲行）创建Treeview条目，滚动时复用这些条目并更新其内容，
+    因此刷新和滚动的开销与笔记总数无关。选中状态按行的key保存，滚出可见区域后仍然保留。
+    数据增删改时用 update_rows 增量更新：保持滚动位置和选中状态，只重绘内容有变化的条目。
+    """
+    def __init__(self, master=None, columns: Sequence[str] = (),
+                 format_row: Callable[[Any], tuple] = tuple,
+                 row_key: Callable[[Any], Hashable] = id,
+                 buffer_rows: int = 5, **kwargs):
+        super().__init__(master, **kwargs)
+        self.format_row = format_row
+        self.row_key = row_key
+        self.buffer_rows = buffer_rows
+
+        self._rows: List[Any] = []
+        self._offset = 0
+        self._page_size = 1
+        self._selected = set()
+        # 每个可见条目当前显示的行的key
+        self._slot_keys: List[Hashable] = []
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, expand=False)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_rows(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_rows(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda event: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda event: self._scroll_rows(-self._page_size))
+        self.tree.bind("<Next>", lambda event: self._scroll_rows(self._page_size))
+
+    # ==================== 数据与选择 ====================
+
+    def set_rows(self, rows: List[Any]) -> None:
+        """替换全部行数据（保留仍然存在的行的选中状态）"""
+        self._rows = rows
+        if self._selected:
+            self._selected &= {self.row_key(row) for row in rows}
+        self._render()
+
+    def update_rows(self, rows: Sequence[Any], changed_keys: Iterable[Hashable] = (),
+                    removed_keys: Iterable[Hashable] = ()) -> None:
+        """增量更新行数据：rows 为变化后的全部行，changed_keys/removed_keys 为新增或修改/删除的行的key
+
+        首个可见行仍然存在时保持它在窗口顶部（其上方增删行不会使列表跳动），
+        只重绘显示的行或内容有变化的条目。定位首个可见行使用 rows.index，
+        rows 支持快速定位（如 NoteView）时开销与总行数无关。
+        """
+        anchor = self._rows[self._offset] if 0 < self._offset < len(self._rows) else None
+        self._rows = rows
+        self._selected.difference_update(removed_keys)
+        if anchor is not None:
+            try:
+                self._offset = rows.index(anchor)
+            except ValueError:
+                pass
+        self._render(changed_keys)
+
+    def selected_rows(self) -> List[Any]:
+        """按显示顺序返回所有选中的行"""
+        if not self._selected:
+            return []
+        return [row for row in self._rows if self.row_key(row) in self._selected]
+
+    def clear_selection(self) -> None:
+        """取消全部选中"""
+        self._selected.clear()
+        self.tree.selection_remove(self.tree.selection())
+
+    # ==================== 渲染 ====================
+
+    def _max_offset(self) -> int:
+        return max(0, len(self._rows) - self._page_size)
+
+    def _render(self, changed_keys: Iterable[Hashable] = None) -> None:
+        """按当前偏移量更新可见窗口内的条目
+
+        changed_keys 为 None 时重绘全部条目；否则只重绘显示的行变了或行的key在其中的条目。
+        """
+        self._offset = min(self._offset, self._max_offset())
+        slot_count = min(self._page_size + self.buffer_rows, len(self._rows) - self._offset)
+        changed = None if changed_keys is None else set(changed_keys)
+
+        existing = self.tree.get_children()
+        for slot in existing[slot_count:]:
+            self.tree.delete(slot)
+        old_keys = self._slot_keys
+
+        selected_slots = []
+        slot_keys = []
+        for slot in range(slot_count):
+            row = self._rows[self._offset + slot]
+            key = self.row_key(row)
+            iid = str(slot)
+            if slot >= len(existing):
+                self.tree.insert("", tk.END, iid=iid, values=self.format_row(row))
+            elif changed is None or key in changed or slot >= len(old_keys) or old_keys[slot] != key:
+                self.tree.item(iid, values=self.format_row(row))
+            slot_keys.append(key)
+            if key in self._selected:
+                selected_slots.append(iid)
+        self._slot_keys = slot_keys
+
+        self.tree.selection_set(selected_slots)
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self) -> None:
+        total = len(self._rows)
+        if total <= self._page_size:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / total, (self._offset + self._page_size) / total)
+
+    def _row_at_slot(self, iid: str) -> Optional[Any]:
+        index = self._offset + int(iid)
+        return self._rows[index] if index < len(self._rows) else None
+
+    # ==================== 滚动 ====================
+
+    def _scroll_to(self, offset: int) -> None:
+        offset = max(0, min(offset, self._max_offset()))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _scroll_rows(self, delta: int) -> str:
+        self._scroll_to(self._offset + delta)
+        return "break"
+
+    def _on_scrollbar(self, *args) -> None:
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self._rows)))
+        elif args[0] == "scroll":
+            step = self._page_size if args[2] == "pages" else 1
+            self._scroll_rows(int(args[1]) * step)
+
+    def _on_mousewheel(self, event) -> str:
+        notches = -event.delta // WHEEL_DELTA if abs(event.delta) >= WHEEL_DELTA else -event.delta
+        return self._scroll_rows(notches * WHEEL_ROWS)
+
+    def _on_arrow(self, delta: int) -> Optional[str]:
+        """在可见窗口边缘按方向键时滚动一行"""
+        focus = self.tree.focus()
+        if not focus:
+            return None
+        slot = int(focus)
+        if (delta < 0 and slot == 0) or (delta > 0 and slot >= self._page_size - 1):
+            self._scroll_rows(delta)
+            return "break"
+        return None
+
+    def _on_configure(self, event) -> None:
+        """窗口大小变化时重新计算可见行数"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        heading_height = 25
+        page_size = max(1, (event.height - heading_height) // row_height)
+        if page_size != self._page_size:
+            self._page_size = page_size
+            self._render()
+
+    # ==================== 选择同步 ====================
+
+    def _on_click(self, event) -> None:
+        """点击空白区域取消全部选中；不带Ctrl/Shift的点击先清空不可见行的选中"""
+        if not self.tree.identify_row(event.y):
+            self.clear_selection()
+        elif not event.state & 0x0005:
+            self._selected.clear()
+
+    def _on_select(self, event) -> None:
+        """将可见条目的选中状态同步到按key保存的选中集合"""
+        selection = set(self.tree.selection())
+        for iid in self.tree.get_children():
+            row = self._row_at_slot(iid)
+            if row is None:
+                continue
+            key = self.row_key(row)
+            if iid in selection:
+                self._selected.add(key)
+            else:
+                self._selected.discard(key)